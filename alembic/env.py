@@ -1,4 +1,5 @@
 from logging.config import fileConfig
+import re
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
@@ -23,6 +24,31 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# monthly and default partitions of the partitioned tables are created by migrations and
+# celery_app.partition_maintenance, not by the models. autogenerate would drop them with their indexes and
+# foreign keys, so they are skipped together with the schema detached partitions are archived in
+PARTITIONED_TABLES = [
+    table.name for table in target_metadata.tables.values()
+    if table.dialect_options["postgresql"].get("partition_by")
+]
+PARTITION_NAME = re.compile(rf"^({'|'.join(PARTITIONED_TABLES)})_(y[0-9]{{4}}m[0-9]{{2}}|default)$")
+ARCHIVE_SCHEMA = "archive"
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "schema":
+        return name != ARCHIVE_SCHEMA
+    if type_ == "table":
+        return not PARTITION_NAME.match(name)
+    return True
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    table = object if type_ == "table" else getattr(object, "table", None)
+    if reflected and table is not None and PARTITION_NAME.match(table.name):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -45,6 +71,8 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +96,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,55 @@
+"""added query pattern indexes
+
+Revision ID: 0b7e2d94f613
+Revises: e5b3f0a7c912
+Create Date: 2026-10-18 13:02:44.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e2d94f613'
+down_revision: Union[str, Sequence[str], None] = 'e5b3f0a7c912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_doctors_user_id'), 'doctors', ['user_id'], unique=False)
+    op.create_index(op.f('ix_patients_user_id'), 'patients', ['user_id'], unique=False)
+    op.create_index(op.f('ix_prescriptions_patient_id'), 'prescriptions', ['patient_id'], unique=False)
+    op.create_index(
+        'ix_attendances_open_user',
+        'attendances',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('time_out IS NULL')
+    )
+    # indexes on the partitioned parents are created on every partition
+    op.create_index(
+        'ix_doctor_slots_doctor_free',
+        'doctor_slots',
+        ['doctor_id', 'start_time'],
+        unique=False,
+        postgresql_where=sa.text('is_booked = false')
+    )
+    op.create_index('ix_appointments_patient_slot_start_time', 'appointments', ['patient_id', 'slot_start_time'], unique=False)
+    op.create_index('ix_appointments_doctor_slot_start_time', 'appointments', ['doctor_id', 'slot_start_time'], unique=False)
+    op.create_index('ix_appointments_slot', 'appointments', ['slot_id', 'slot_start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_slot', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_slot_start_time', table_name='appointments')
+    op.drop_index('ix_appointments_patient_slot_start_time', table_name='appointments')
+    op.drop_index('ix_doctor_slots_doctor_free', table_name='doctor_slots')
+    op.drop_index('ix_attendances_open_user', table_name='attendances')
+    op.drop_index(op.f('ix_prescriptions_patient_id'), table_name='prescriptions')
+    op.drop_index(op.f('ix_patients_user_id'), table_name='patients')
+    op.drop_index(op.f('ix_doctors_user_id'), table_name='doctors')
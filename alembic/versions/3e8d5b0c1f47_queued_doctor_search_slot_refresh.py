@@ -0,0 +1,93 @@
+"""queued doctor search slot refresh
+
+Revision ID: 3e8d5b0c1f47
+Revises: f7a4c2d81e56
+Create Date: 2026-10-18 17:05:33.418290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8d5b0c1f47'
+down_revision: Union[str, Sequence[str], None] = 'f7a4c2d81e56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# slot triggers only queue the doctors, updates queue them only when is_booked, start_time or doctor_id changed.
+# column lists can not be combined with transition tables, so the old and new rows are compared instead
+QUEUE_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION doctor_search_slots_inserted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO doctor_search_queue (doctor_id)
+    SELECT DISTINCT doctor_id FROM new_slots WHERE doctor_id IS NOT NULL;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_search_slots_updated() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO doctor_search_queue (doctor_id)
+    SELECT DISTINCT changed.doctor_id
+    FROM new_slots
+    JOIN old_slots ON old_slots.id = new_slots.id
+    CROSS JOIN LATERAL (VALUES (new_slots.doctor_id), (old_slots.doctor_id)) AS changed(doctor_id)
+    WHERE changed.doctor_id IS NOT NULL AND (
+        new_slots.is_booked IS DISTINCT FROM old_slots.is_booked
+        OR new_slots.start_time IS DISTINCT FROM old_slots.start_time
+        OR new_slots.doctor_id IS DISTINCT FROM old_slots.doctor_id
+    );
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_search_slots_deleted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO doctor_search_queue (doctor_id)
+    SELECT DISTINCT doctor_id FROM old_slots WHERE doctor_id IS NOT NULL;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+# bodies of a31f5c7e9b28, refresh inside the writing transaction
+REFRESH_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION doctor_search_slots_inserted() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(SELECT DISTINCT doctor_id FROM new_slots WHERE doctor_id IS NOT NULL));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_search_slots_updated() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(
+        SELECT doctor_id FROM new_slots WHERE doctor_id IS NOT NULL
+        UNION SELECT doctor_id FROM old_slots WHERE doctor_id IS NOT NULL
+    ));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_search_slots_deleted() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(SELECT DISTINCT doctor_id FROM old_slots WHERE doctor_id IS NOT NULL));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('doctor_search_queue',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('doctor_id', sa.UUID(), nullable=False),
+    sa.Column('queued_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(QUEUE_FUNCTIONS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(REFRESH_FUNCTIONS)
+    op.execute("SELECT refresh_doctor_search(ARRAY(SELECT DISTINCT doctor_id FROM doctor_search_queue))")
+    op.drop_table('doctor_search_queue')
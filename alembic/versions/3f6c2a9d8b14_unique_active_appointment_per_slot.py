@@ -0,0 +1,35 @@
+"""unique active appointment per slot
+
+Revision ID: 3f6c2a9d8b14
+Revises: 19cf9e50213d
+Create Date: 2026-10-18 10:12:41.512093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a9d8b14'
+down_revision: Union[str, Sequence[str], None] = '19cf9e50213d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # fails if a slot already has more than one active appointment, those have to be cancelled first
+    op.create_index(
+        'uq_appointments_active_slot',
+        'appointments',
+        ['slot_id'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_appointments_active_slot', table_name='appointments')
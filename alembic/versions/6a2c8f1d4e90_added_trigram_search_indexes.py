@@ -0,0 +1,41 @@
+"""added trigram search indexes
+
+Revision ID: 6a2c8f1d4e90
+Revises: 0b7e2d94f613
+Create Date: 2026-10-18 13:41:09.307754
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2c8f1d4e90'
+down_revision: Union[str, Sequence[str], None] = '0b7e2d94f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_SEARCH_COLUMNS = ['username', 'first_name', 'last_name', 'email', 'phone']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_doctors_speciality_trgm', 'doctors', ['speciality'],
+        postgresql_using='gin', postgresql_ops={'speciality': 'gin_trgm_ops'}
+    )
+    for column in USER_SEARCH_COLUMNS:
+        op.create_index(
+            f'ix_users_{column}_trgm', 'users', [column],
+            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in USER_SEARCH_COLUMNS:
+        op.drop_index(f'ix_users_{column}_trgm', table_name='users')
+    op.drop_index('ix_doctors_speciality_trgm', table_name='doctors')
@@ -0,0 +1,39 @@
+"""unique doctor slot start time
+
+Revision ID: 8d1e4b7c2a05
+Revises: 3f6c2a9d8b14
+Create Date: 2026-10-18 11:03:19.204817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1e4b7c2a05'
+down_revision: Union[str, Sequence[str], None] = '3f6c2a9d8b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # removes duplicate unbooked slots left by the old per slot generation, keeps booked ones
+    op.execute("""
+        DELETE FROM doctor_slots AS duplicate
+        USING doctor_slots AS kept
+        WHERE duplicate.doctor_id = kept.doctor_id
+        AND duplicate.start_time = kept.start_time
+        AND duplicate.id <> kept.id
+        AND duplicate.is_booked IS NOT TRUE
+        AND NOT EXISTS (SELECT 1 FROM appointments WHERE appointments.slot_id = duplicate.id)
+        AND (kept.is_booked IS TRUE OR duplicate.id > kept.id)
+    """)
+    op.create_unique_constraint('uq_doctor_slots_doctor_start_time', 'doctor_slots', ['doctor_id', 'start_time'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_doctor_slots_doctor_start_time', 'doctor_slots', type_='unique')
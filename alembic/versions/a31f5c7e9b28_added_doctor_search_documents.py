@@ -0,0 +1,144 @@
+"""added doctor search documents
+
+Revision ID: a31f5c7e9b28
+Revises: 6a2c8f1d4e90
+Create Date: 2026-10-18 14:12:51.860413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a31f5c7e9b28'
+down_revision: Union[str, Sequence[str], None] = '6a2c8f1d4e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rebuilds the documents of doctor_ids, NULL rebuilds every doctor
+REFRESH_FUNCTION = """
+CREATE FUNCTION refresh_doctor_search(doctor_ids uuid[]) RETURNS void AS $$
+    INSERT INTO doctor_search (doctor_id, name, speciality, document, next_free_slot, free_slots_week, refreshed_at)
+    SELECT doctors.id,
+        trim(coalesce(users.first_name, '') || ' ' || coalesce(users.last_name, '')),
+        doctors.speciality,
+        lower(concat_ws(' ', users.first_name, users.last_name, doctors.speciality, users.username, users.email, users.phone)),
+        free.next_free_slot,
+        coalesce(free.free_slots_week, 0),
+        now()
+    FROM doctors
+    LEFT JOIN users ON users.id = doctors.user_id
+    LEFT JOIN LATERAL (
+        SELECT min(start_time) AS next_free_slot,
+            count(*) FILTER (
+                WHERE start_time < (date_trunc('week', now() AT TIME ZONE 'Asia/Kolkata') + interval '1 week') AT TIME ZONE 'Asia/Kolkata'
+            ) AS free_slots_week
+        FROM doctor_slots
+        WHERE doctor_slots.doctor_id = doctors.id AND doctor_slots.is_booked = false AND doctor_slots.start_time > now()
+    ) AS free ON true
+    WHERE doctor_ids IS NULL OR doctors.id = ANY(doctor_ids)
+    ON CONFLICT (doctor_id) DO UPDATE SET
+        name = excluded.name,
+        speciality = excluded.speciality,
+        document = excluded.document,
+        next_free_slot = excluded.next_free_slot,
+        free_slots_week = excluded.free_slots_week,
+        refreshed_at = excluded.refreshed_at
+$$ LANGUAGE sql
+"""
+
+TRIGGER_FUNCTIONS = """
+CREATE FUNCTION doctor_search_doctors_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY[NEW.id]);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION doctor_search_users_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(SELECT id FROM doctors WHERE user_id = NEW.id));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION doctor_search_slots_inserted() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(SELECT DISTINCT doctor_id FROM new_slots WHERE doctor_id IS NOT NULL));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION doctor_search_slots_updated() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(
+        SELECT doctor_id FROM new_slots WHERE doctor_id IS NOT NULL
+        UNION SELECT doctor_id FROM old_slots WHERE doctor_id IS NOT NULL
+    ));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION doctor_search_slots_deleted() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_doctor_search(ARRAY(SELECT DISTINCT doctor_id FROM old_slots WHERE doctor_id IS NOT NULL));
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+"""
+
+# slot triggers are statement level so a set based slot generation refreshes every doctor once
+TRIGGERS = """
+CREATE TRIGGER doctor_search_doctors AFTER INSERT OR UPDATE OF user_id, speciality ON doctors
+    FOR EACH ROW EXECUTE FUNCTION doctor_search_doctors_changed();
+
+CREATE TRIGGER doctor_search_users AFTER UPDATE OF first_name, last_name, username, email, phone ON users
+    FOR EACH ROW EXECUTE FUNCTION doctor_search_users_changed();
+
+CREATE TRIGGER doctor_search_slots_insert AFTER INSERT ON doctor_slots
+    REFERENCING NEW TABLE AS new_slots
+    FOR EACH STATEMENT EXECUTE FUNCTION doctor_search_slots_inserted();
+
+CREATE TRIGGER doctor_search_slots_update AFTER UPDATE ON doctor_slots
+    REFERENCING OLD TABLE AS old_slots NEW TABLE AS new_slots
+    FOR EACH STATEMENT EXECUTE FUNCTION doctor_search_slots_updated();
+
+CREATE TRIGGER doctor_search_slots_delete AFTER DELETE ON doctor_slots
+    REFERENCING OLD TABLE AS old_slots
+    FOR EACH STATEMENT EXECUTE FUNCTION doctor_search_slots_deleted();
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('doctor_search',
+    sa.Column('doctor_id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('speciality', sa.String(), nullable=True),
+    sa.Column('document', sa.String(), nullable=False),
+    sa.Column('next_free_slot', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('free_slots_week', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id')
+    )
+    op.create_index(
+        'ix_doctor_search_document_trgm', 'doctor_search', ['document'],
+        postgresql_using='gin', postgresql_ops={'document': 'gin_trgm_ops'}
+    )
+    op.execute(REFRESH_FUNCTION)
+    op.execute(TRIGGER_FUNCTIONS)
+    op.execute(TRIGGERS)
+    op.execute("SELECT refresh_doctor_search(NULL)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER doctor_search_slots_delete ON doctor_slots")
+    op.execute("DROP TRIGGER doctor_search_slots_update ON doctor_slots")
+    op.execute("DROP TRIGGER doctor_search_slots_insert ON doctor_slots")
+    op.execute("DROP TRIGGER doctor_search_users ON users")
+    op.execute("DROP TRIGGER doctor_search_doctors ON doctors")
+    for function in ['doctor_search_slots_deleted', 'doctor_search_slots_updated', 'doctor_search_slots_inserted',
+                     'doctor_search_users_changed', 'doctor_search_doctors_changed']:
+        op.execute(f"DROP FUNCTION {function}()")
+    op.execute("DROP FUNCTION refresh_doctor_search(uuid[])")
+    op.drop_index('ix_doctor_search_document_trgm', table_name='doctor_search')
+    op.drop_table('doctor_search')
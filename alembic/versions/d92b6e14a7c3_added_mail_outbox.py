@@ -0,0 +1,49 @@
+"""added mail outbox
+
+Revision ID: d92b6e14a7c3
+Revises: a31f5c7e9b28
+Create Date: 2026-10-18 14:48:30.114962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd92b6e14a7c3'
+down_revision: Union[str, Sequence[str], None] = 'a31f5c7e9b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('mail_outbox',
+    sa.Column('appointment_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('modified_at', sa.DateTime(), nullable=True),
+    sa.Column('modified_by', sa.UUID(), nullable=True),
+    sa.ForeignKeyConstraint(['modified_by'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_mail_outbox_appointment_id'), 'mail_outbox', ['appointment_id'], unique=False)
+    op.create_index(
+        'ix_mail_outbox_pending', 'mail_outbox', ['next_attempt_at'],
+        unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_mail_outbox_pending', table_name='mail_outbox')
+    op.drop_index(op.f('ix_mail_outbox_appointment_id'), table_name='mail_outbox')
+    op.drop_table('mail_outbox')
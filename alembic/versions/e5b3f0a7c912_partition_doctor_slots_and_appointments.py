@@ -0,0 +1,177 @@
+"""partition doctor_slots and appointments by month
+
+Revision ID: e5b3f0a7c912
+Revises: c47a91e3d6f2
+Create Date: 2026-10-18 12:26:07.615342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b3f0a7c912'
+down_revision: Union[str, Sequence[str], None] = 'c47a91e3d6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# months ahead of the current month that get a partition, celery_app.partition_maintenance keeps this up
+MONTHS_AHEAD = 3
+
+# creates one partition per month from the first row of column up to MONTHS_AHEAD, named <table>_yYYYYmMM
+# partitions are IST months, bounds carry the +05:30 offset so they do not depend on the session time zone
+CREATE_MONTH_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc('month', coalesce((SELECT min({column}) FROM {source}), now()) AT TIME ZONE 'Asia/Kolkata')::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'Asia/Kolkata') + interval '{months_ahead} months')::date;
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+            '{table}_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            to_char(month, 'YYYY-MM-DD') || ' 00:00+05:30',
+            to_char(month + interval '1 month', 'YYYY-MM-DD') || ' 00:00+05:30'
+        );
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # prescriptions can not reference appointments once its primary key includes slot_start_time
+    op.drop_constraint('prescriptions_appointment_id_fkey', 'prescriptions', type_='foreignkey')
+    op.create_index(op.f('ix_prescriptions_appointment_id'), 'prescriptions', ['appointment_id'], unique=False)
+
+    op.rename_table('appointments', 'appointments_old')
+    op.rename_table('doctor_slots', 'doctor_slots_old')
+    # index names are not renamed with the tables and would clash with the new primary keys
+    op.execute("ALTER INDEX appointments_pkey RENAME TO appointments_old_pkey")
+    op.execute("ALTER INDEX doctor_slots_pkey RENAME TO doctor_slots_old_pkey")
+
+    op.execute("""
+        CREATE TABLE doctor_slots (
+            id uuid NOT NULL,
+            doctor_id uuid REFERENCES doctors (id),
+            start_time timestamp with time zone NOT NULL,
+            end_time timestamp with time zone NOT NULL,
+            is_booked boolean,
+            notes varchar,
+            created_at timestamp without time zone,
+            modified_at timestamp without time zone,
+            modified_by uuid REFERENCES users (id) ON DELETE CASCADE,
+            PRIMARY KEY (id, start_time),
+            CONSTRAINT uq_doctor_slots_doctor_start_time_new UNIQUE (doctor_id, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute(CREATE_MONTH_PARTITIONS.format(table='doctor_slots', source='doctor_slots_old', column='start_time', months_ahead=MONTHS_AHEAD))
+    op.execute("CREATE TABLE doctor_slots_default PARTITION OF doctor_slots DEFAULT")
+    op.execute("""
+        INSERT INTO doctor_slots (id, doctor_id, start_time, end_time, is_booked, notes, created_at, modified_at, modified_by)
+        SELECT id, doctor_id, start_time, end_time, is_booked, notes, created_at, modified_at, modified_by
+        FROM doctor_slots_old
+    """)
+
+    op.execute("""
+        CREATE TABLE appointments (
+            id uuid NOT NULL,
+            doctor_id uuid REFERENCES doctors (id) ON DELETE CASCADE,
+            patient_id uuid REFERENCES patients (id) ON DELETE CASCADE,
+            slot_id uuid,
+            slot_start_time timestamp with time zone NOT NULL,
+            status varchar NOT NULL,
+            is_mail_sent boolean,
+            created_by uuid REFERENCES users (id) ON DELETE CASCADE,
+            created_at timestamp without time zone,
+            modified_at timestamp without time zone,
+            modified_by uuid REFERENCES users (id) ON DELETE CASCADE,
+            PRIMARY KEY (id, slot_start_time),
+            FOREIGN KEY (slot_id, slot_start_time) REFERENCES doctor_slots (id, start_time) ON DELETE CASCADE
+        ) PARTITION BY RANGE (slot_start_time)
+    """)
+    op.execute(CREATE_MONTH_PARTITIONS.format(table='appointments', source='doctor_slots_old', column='start_time', months_ahead=MONTHS_AHEAD))
+    op.execute("CREATE TABLE appointments_default PARTITION OF appointments DEFAULT")
+    # appointments without a slot keep their creation time as partition key
+    op.execute("""
+        INSERT INTO appointments (id, doctor_id, patient_id, slot_id, slot_start_time, status, is_mail_sent, created_by, created_at, modified_at, modified_by)
+        SELECT appointments_old.id, appointments_old.doctor_id, appointments_old.patient_id, appointments_old.slot_id,
+            coalesce(doctor_slots_old.start_time, appointments_old.created_at), appointments_old.status, appointments_old.is_mail_sent,
+            appointments_old.created_by, appointments_old.created_at, appointments_old.modified_at, appointments_old.modified_by
+        FROM appointments_old
+        LEFT JOIN doctor_slots_old ON doctor_slots_old.id = appointments_old.slot_id
+    """)
+
+    op.drop_table('appointments_old')
+    op.drop_table('doctor_slots_old')
+    op.execute("ALTER TABLE doctor_slots RENAME CONSTRAINT uq_doctor_slots_doctor_start_time_new TO uq_doctor_slots_doctor_start_time")
+
+    op.create_index(
+        'uq_appointments_active_slot',
+        'appointments',
+        ['slot_id', 'slot_start_time'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('appointments', 'appointments_partitioned')
+    op.rename_table('doctor_slots', 'doctor_slots_partitioned')
+    op.execute("ALTER INDEX appointments_pkey RENAME TO appointments_partitioned_pkey")
+    op.execute("ALTER INDEX doctor_slots_pkey RENAME TO doctor_slots_partitioned_pkey")
+    op.execute("ALTER TABLE doctor_slots_partitioned RENAME CONSTRAINT uq_doctor_slots_doctor_start_time TO uq_doctor_slots_partitioned_doctor_start_time")
+    op.drop_index('uq_appointments_active_slot', table_name='appointments_partitioned')
+
+    op.execute("""
+        CREATE TABLE doctor_slots (
+            id uuid PRIMARY KEY,
+            doctor_id uuid REFERENCES doctors (id),
+            start_time timestamp with time zone NOT NULL,
+            end_time timestamp with time zone NOT NULL,
+            is_booked boolean,
+            notes varchar,
+            created_at timestamp without time zone,
+            modified_at timestamp without time zone,
+            modified_by uuid REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("INSERT INTO doctor_slots SELECT id, doctor_id, start_time, end_time, is_booked, notes, created_at, modified_at, modified_by FROM doctor_slots_partitioned")
+
+    op.execute("""
+        CREATE TABLE appointments (
+            id uuid PRIMARY KEY,
+            doctor_id uuid REFERENCES doctors (id) ON DELETE CASCADE,
+            patient_id uuid REFERENCES patients (id) ON DELETE CASCADE,
+            slot_id uuid REFERENCES doctor_slots (id) ON DELETE CASCADE,
+            status varchar NOT NULL,
+            is_mail_sent boolean,
+            created_by uuid REFERENCES users (id) ON DELETE CASCADE,
+            created_at timestamp without time zone,
+            modified_at timestamp without time zone,
+            modified_by uuid REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("""
+        INSERT INTO appointments SELECT id, doctor_id, patient_id, slot_id, status, is_mail_sent, created_by, created_at, modified_at, modified_by
+        FROM appointments_partitioned
+    """)
+
+    op.drop_table('appointments_partitioned')
+    op.drop_table('doctor_slots_partitioned')
+
+    op.create_unique_constraint('uq_doctor_slots_doctor_start_time', 'doctor_slots', ['doctor_id', 'start_time'])
+    op.create_index(
+        'uq_appointments_active_slot',
+        'appointments',
+        ['slot_id'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'")
+    )
+
+    op.drop_index(op.f('ix_prescriptions_appointment_id'), table_name='prescriptions')
+    op.create_foreign_key('prescriptions_appointment_id_fkey', 'prescriptions', 'appointments', ['appointment_id'], ['id'], ondelete='CASCADE')
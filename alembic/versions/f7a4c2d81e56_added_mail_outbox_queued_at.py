@@ -0,0 +1,29 @@
+"""added mail outbox queued_at
+
+Revision ID: f7a4c2d81e56
+Revises: d92b6e14a7c3
+Create Date: 2026-10-18 15:20:12.640197
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a4c2d81e56'
+down_revision: Union[str, Sequence[str], None] = 'd92b6e14a7c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('mail_outbox', sa.Column('queued_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.alter_column('mail_outbox', 'queued_at', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('mail_outbox', 'queued_at')
@@ -0,0 +1,26 @@
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+from jwt.exceptions import InvalidTokenError
+from app.schemas.token import Principal
+from app.utils.helper import get_principal
+from app.utils.logging import Logging
+from typing import Annotated
+
+
+logger = Logging(__name__).get_logger()
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+def get_current_principal(request: Request, token: Annotated[str, Depends(oauth2_scheme)]) -> Principal:
+    '''
+    returns the principal verified by RBAC middleware for this request,
+    verifies the token itself when the middleware check was bypassed
+    '''
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        try:
+            principal = get_principal(token)
+        except InvalidTokenError as e:
+            logger.error(f"Invalid token encountered: {e}")
+            raise HTTPException(401, f"{e}")
+    return principal
@@ -7,6 +7,7 @@ from app.api.v1.doctors import Doctor
 from app.api.v1.appointments import Appointment
 from app.api.v1.prescriptions import Prescription
 from app.api.v1.attendances import Attendance
+from app.api.v1.metrics import Metrics
 
 router = APIRouter()
 
@@ -19,4 +20,5 @@ def get_all_router():
     router.include_router(Appointment.router)
     router.include_router(Prescription.router)
     router.include_router(Attendance.router)
+    router.include_router(Metrics.router)
     return router
\ No newline at end of file
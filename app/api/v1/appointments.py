@@ -8,6 +8,9 @@ from app.models.appointments import Appointment as AppointmentModel
 from app.schemas.appointments import AppointmentResponseSchema
 from app.schemas.api_response import APIResponse
 from app.db.session import get_db
+from app.api.dependencies import get_current_principal
+from app.config.loading_profiles import loading_profiles
+from app.schemas.token import Principal
 from typing import Annotated
 from uuid import UUID
 
@@ -20,15 +23,15 @@ class Appointment():
     router = APIRouter(prefix="/appointments", tags=["Appointment"])
 
     @router.post("/book", response_model=APIResponse[AppointmentResponseSchema])
-    async def book_appointment(
+    def book_appointment(
         slot_id: UUID,
-        token: Annotated[str, Depends(oauth2_scheme)],
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db)
     ):
         logger.info(f"POST/appointments/book API accessed")
 
         obj = AppointmentServices(db, AppointmentModel)
-        record = obj.book_patient_appointment(token, slot_id)
+        record = obj.book_patient_appointment(principal, slot_id, loading_profiles['appointment'])
 
         logger.debug(f"appointment booked, appointment: {record}")
 
@@ -40,15 +43,15 @@ class Appointment():
         )
 
     @router.post("/{appointment_id}/cancel", response_model=APIResponse[AppointmentResponseSchema])
-    async def cancel_appointment(
+    def cancel_appointment(
         appointment_id: UUID,
-        token: Annotated[str, Depends(oauth2_scheme)],
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db)
     ):
         logger.info(f"Post /appointments/{appointment_id}/cancel API accessed")
 
         obj = AppointmentServices(db, AppointmentModel)
-        record = obj.cancel_patient_appointment(token, appointment_id)
+        record = obj.cancel_patient_appointment(principal, appointment_id, loading_profiles['appointment'])
 
         return APIResponse[AppointmentResponseSchema](
             success=True,
@@ -58,58 +61,66 @@ class Appointment():
         )
 
     @router.get("/me/history", response_model=APIResponse[list[AppointmentResponseSchema]])
-    async def get_user_appointments_history(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def get_user_appointments_history(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db),
         filters: str = None,
         sort_by: str = None,
         sort_order: str = 'asc',
         page: int = 1,
         limit: int = 5,
+        cursor: str = None,
+        count: str = None,
     ):
         logger.info(f"Get /appointments/me/history API accessed")
 
         allowed_fields = ['doctor_id', 'patient_id', 'slot_id', 'status']
         obj = AppointmentServices(db, AppointmentModel)
-        records, total_records = obj.fetch_user_appointments_history(token, filters, sort_by, sort_order, page, limit, allowed_fields)
+        records, page_info = obj.fetch_user_appointments_history(principal, filters, sort_by, sort_order, page, limit, allowed_fields, cursor=cursor, count=count, options=loading_profiles['appointment'])
 
         return APIResponse[list[AppointmentResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message=f"Appointment history of current logged in user fetched",
             data=records,
-            total_records=total_records,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
 
     @router.get("/me/upcoming", response_model=APIResponse[list[AppointmentResponseSchema]])
-    async def get_user_appointments_upcoming(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def get_user_appointments_upcoming(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db),
         filters: str = None,
         sort_by: str = None,
         sort_order: str = 'asc',
         page: int = 1,
         limit: int = 5,
+        cursor: str = None,
+        count: str = None,
     ):
         logger.info(f"Get /appointments/me/upcoming API accessed")
 
         allowed_fields = ['doctor_id', 'patient_id', 'slot_id', 'status']
         obj = AppointmentServices(db, AppointmentModel)
-        records, total_records = obj.fetch_user_appointments_upcoming(token, filters, sort_by, sort_order, page, limit, allowed_fields)
+        records, page_info = obj.fetch_user_appointments_upcoming(principal, filters, sort_by, sort_order, page, limit, allowed_fields, cursor=cursor, count=count, options=loading_profiles['appointment'])
 
         return APIResponse[list[AppointmentResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message=f"Upcoming appointments of current logged in user fetched",
             data=records,
-            total_records=total_records,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
 
     @router.patch("/{id}", response_model=APIResponse[AppointmentResponseSchema])
-    async def update_appointment_status(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def update_appointment_status(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         appointment_id: UUID,
         updated_status: str,
         db: Session = Depends(get_db)
@@ -117,7 +128,7 @@ class Appointment():
         logger.info(f"Patch/appointments/id API accessed")
 
         obj = AppointmentServices(db, AppointmentModel)
-        record = obj.update_user_appointment_status(token, appointment_id, updated_status)
+        record = obj.update_user_appointment_status(principal, appointment_id, updated_status, loading_profiles['appointment'])
 
         return APIResponse[AppointmentResponseSchema](
             success=True,
@@ -127,7 +138,7 @@ class Appointment():
         )
 
     @router.get("/", response_model=APIResponse[list[AppointmentResponseSchema]])
-    async def get_all_appointments(
+    def get_all_appointments(
         db: Session = Depends(get_db),
         search: str = None,
         filters: str = None,
@@ -135,19 +146,23 @@ class Appointment():
         sort_order: str = 'asc',
         page: int = 1,
         limit: int = 5,
+        cursor: str = None,
+        count: str = None,
     ):
         logger.info(f"Get /appointments/ API accessed")
 
         allowed_fields = ['doctor_id', 'patient_id', 'slot_id', 'status']
         obj = AppointmentServices(db, AppointmentModel)
-        records, total_recores = obj.fetch_all_appointments(filters, sort_by, sort_order, page, limit, allowed_fields, search)
+        records, page_info = obj.fetch_all_appointments(filters, sort_by, sort_order, page, limit, allowed_fields, search, cursor=cursor, count=count, options=loading_profiles['appointment'])
 
         return APIResponse[list[AppointmentResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message=f"All appointments fetched",
             data=records,
-            total_records=total_recores,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
         
\ No newline at end of file
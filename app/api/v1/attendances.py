@@ -7,6 +7,8 @@ from app.schemas.attendances import AttendanceResponseSchema
 from app.services.attendance_services import AttendanceServices
 from app.schemas.api_response import APIResponse
 from app.db.session import get_db
+from app.api.dependencies import get_current_principal
+from app.schemas.token import Principal
 from typing import Annotated
 from uuid import UUID
 
@@ -19,8 +21,8 @@ class Attendance():
     router = APIRouter(prefix="/attendances", tags=["Attendance"])
 
     @router.post("/time_in", response_model=APIResponse[AttendanceResponseSchema])
-    async def user_attendance_time_in(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def user_attendance_time_in(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db)
     ):
         '''
@@ -30,7 +32,7 @@ class Attendance():
         logger.info(f"POST/attendances/time_in API accessed")
 
         obj = AttendanceServices(db, AttendanceModel)
-        record = obj.generate_user_attendance(token)
+        record = obj.generate_user_attendance(principal)
 
         return APIResponse[AttendanceResponseSchema](
             success=True,
@@ -40,8 +42,8 @@ class Attendance():
         )
 
     @router.post("/time_out", response_model=APIResponse[AttendanceResponseSchema])
-    async def user_attendance_time_out(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def user_attendance_time_out(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session =Depends(get_db)
     ):
         '''
@@ -51,7 +53,7 @@ class Attendance():
         logger.info(f"Post/ attendances/time_out API accessed")
 
         obj = AttendanceServices(db, AttendanceModel)
-        record = obj.update_user_timeout(token)
+        record = obj.update_user_timeout(principal)
 
         return APIResponse[AttendanceResponseSchema](
             success=True,
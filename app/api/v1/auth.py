@@ -2,12 +2,12 @@
 from fastapi import APIRouter, Depends, status
 from app.schemas.token import Token
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.users import User
 from app.utils.logging import Logging
 from app.services.auth_service import AuthServices
 from app.schemas.api_response import APIResponse
-from app.db.session import get_db
+from app.db.session import get_async_db
 from typing import Annotated
 
 
@@ -18,7 +18,7 @@ class Authorization():
     router = APIRouter(prefix="/auth", tags=["Authorization"])
 
     @router.post("/login", response_model=APIResponse[Token])
-    async def login(form_data: OAuth2PasswordRequestForm = Depends(), db:Session = Depends(get_db)):
+    async def login(form_data: OAuth2PasswordRequestForm = Depends(), db:AsyncSession = Depends(get_async_db)):
         '''
         Authenticates user and returns access and refresh token and saves refresh token in db.
         Requires: username and password
@@ -26,7 +26,7 @@ class Authorization():
         '''
         logger.info("POST/auth/login called")
         obj = AuthServices(db)
-        record = obj.user_login(form_data)
+        record = await obj.user_login(form_data)
         return APIResponse[Token](
             success=True,
             status_code=status.HTTP_200_OK,
@@ -35,7 +35,7 @@ class Authorization():
         )
 
     @router.post("/logout", response_model=APIResponse[dict])
-    async def logout(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+    async def logout(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_async_db)):
         '''
         Authenticates refresh token and invalidates it by removing it from the db
         Requires: Valid refresh token
@@ -43,7 +43,7 @@ class Authorization():
         '''
         logger.info(f"POST/auth/logout called")
         obj = AuthServices(db, User)
-        record = obj.revoke_user_tokens(token)
+        record = await obj.revoke_user_tokens(token)
         return APIResponse[dict](
             success=True,
             status_code=status.HTTP_200_OK,
@@ -52,7 +52,7 @@ class Authorization():
         )
 
     @router.post("/refresh-token", response_model=APIResponse[Token])
-    async def refresh_token(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+    async def refresh_token(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_async_db)):
         '''
         Authenticates refresh token and returns new access and refresh token and saves refresh token in db
         Requires: Valid refresh token
@@ -60,7 +60,7 @@ class Authorization():
         '''
         logger.info(f"POST/auth/refresh-token called")
         obj = AuthServices(db, User)
-        record = obj.refresh_user_token(token)
+        record = await obj.refresh_user_token(token)
         return APIResponse[Token](
             success=True,
             status_code=status.HTTP_200_OK,
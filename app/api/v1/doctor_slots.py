@@ -1,12 +1,16 @@
 
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, status
 from app.utils.logging import Logging
 from app.services.doctor_slots_services import DoctorSlotServices
 from app.schemas.api_response import APIResponse
 from app.schemas.slots import AvailableSlotResponseSchema, SlotUpdateSchema
+from app.schemas.doctor_schedule import DoctorScheduleSchema, ScheduleWindowResponseSchema
 from app.models.doctor_slots import DoctorSlot
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
+from app.api.dependencies import get_current_principal
+from app.schemas.token import Principal
 from uuid import UUID
 from typing import Annotated
 from fastapi.security import OAuth2PasswordBearer
@@ -22,18 +26,18 @@ class DoctorSlots():
 
     @router.get("/me", response_model=APIResponse[list[AvailableSlotResponseSchema]])
     async def get_current_doctor_available_slots (
-        token: Annotated[str, Depends(oauth2_scheme)],
-        db: Session = Depends(get_db)
+        principal: Annotated[Principal, Depends(get_current_principal)],
+        db: AsyncSession = Depends(get_async_db)
     ):
         '''
         returns available slots records for current logged in user
         role: 'doctor'
         '''
         logger.info(f"GET/doctor_slots/me API accessed")
-        logger.debug(f"Token: {token}")
+        logger.debug(f"Principal: {principal}")
 
         obj = DoctorSlotServices(db, DoctorSlot)
-        records = obj.get_doctor_available_slots(token)
+        records = await obj.get_doctor_available_slots(principal)
 
         logger.info(f"available slots fetched from database")
         logger.debug(f"Slots: {records}")
@@ -46,8 +50,8 @@ class DoctorSlots():
         )
 
     @router.patch("/me", response_model=APIResponse[AvailableSlotResponseSchema])
-    async def update_current_doctor_available_slots (
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def update_current_doctor_available_slots (
+        principal: Annotated[Principal, Depends(get_current_principal)],
         slot_id: UUID,
         slot_update: SlotUpdateSchema,
         db: Session = Depends(get_db)
@@ -58,10 +62,10 @@ class DoctorSlots():
         role: 'doctor'
         '''
         logger.info(f"Patch/doctor_slots/me API accessed")
-        logger.debug(f"Token: {token}")
+        logger.debug(f"Principal: {principal}")
 
         obj = DoctorSlotServices(db, DoctorSlot)
-        record = obj.update_doctor_slot(token, slot_id, slot_update)
+        record = obj.update_doctor_slot(principal, slot_id, slot_update)
 
         return APIResponse[AvailableSlotResponseSchema](
             success=True,
@@ -70,4 +74,46 @@ class DoctorSlots():
             data=record
         )
 
-        
\ No newline at end of file
+    @router.get("/me/schedule", response_model=APIResponse[list[ScheduleWindowResponseSchema]])
+    def get_current_doctor_schedule(
+        principal: Annotated[Principal, Depends(get_current_principal)],
+        db: Session = Depends(get_db)
+    ):
+        '''
+        returns weekly schedule template of current logged in doctor, empty if default schedule is used
+        role: 'doctor'
+        '''
+        logger.info(f"GET/doctor_slots/me/schedule API accessed")
+
+        obj = DoctorSlotServices(db, DoctorSlot)
+        records = obj.get_doctor_schedule(principal)
+
+        return APIResponse[list[ScheduleWindowResponseSchema]](
+            success=True,
+            status_code=status.HTTP_200_OK,
+            message="Current doctor schedule fetched",
+            data=records
+        )
+
+    @router.put("/me/schedule", response_model=APIResponse[list[ScheduleWindowResponseSchema]])
+    def replace_current_doctor_schedule(
+        principal: Annotated[Principal, Depends(get_current_principal)],
+        schedule: DoctorScheduleSchema,
+        db: Session = Depends(get_db)
+    ):
+        '''
+        replaces weekly schedule template of current logged in doctor and regenerates future unbooked slots
+        requires: working windows with weekday (0 monday), start_time, end_time and slot_minutes
+        role: 'doctor'
+        '''
+        logger.info(f"PUT/doctor_slots/me/schedule API accessed")
+
+        obj = DoctorSlotServices(db, DoctorSlot)
+        records = obj.replace_doctor_schedule(principal, schedule)
+
+        return APIResponse[list[ScheduleWindowResponseSchema]](
+            success=True,
+            status_code=status.HTTP_200_OK,
+            message="Current doctor schedule updated",
+            data=records
+        )
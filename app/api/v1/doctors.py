@@ -10,9 +10,10 @@ from app.schemas.api_response import APIResponse
 from app.schemas.filters import DateFilterSchema
 from app.models.doctor import Doctor as DoctorModel
 from app.models.doctor_slots import DoctorSlot
-from app.db.session import get_db
+from app.db.session import get_async_db
 from typing import Annotated, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.loading_profiles import loading_profiles
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime
 from uuid import UUID
@@ -27,13 +28,15 @@ class Doctor():
 
     @router.get("/slots", response_model=APIResponse[list[AvailableDoctorResponseSchema]])
     async def get_doctors_slots(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         search: str = None,
         filters: str = None,
         sort_by: str = None,
         sort_order: str = 'asc',
         page: int = 1,
-        limit: int = 5
+        limit: int = 5,
+        cursor: str = None,
+        count: str = None
     ):
         '''
         fetches doctors records with slots details and implements search and filters
@@ -41,29 +44,34 @@ class Doctor():
         '''
         logger.info(f"Get/doctors/slots api called")
 
-        allowed_fields = ['speciality', 'id']
+        allowed_fields = ['speciality', 'id', 'next_free_slot', 'free_slots_week']
         obj = DoctorServices(db, DoctorModel)
-        records, total_recores = obj.fetch_doctors(filters, sort_by, sort_order, page, limit, allowed_fields, search)
+        options = loading_profiles['doctor_slots']
+        records, page_info = await obj.fetch_doctors(filters, sort_by, sort_order, page, limit, allowed_fields, search, options, cursor=cursor, count=count)
 
         return APIResponse[list[AvailableDoctorResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message="Doctors with slots fetched",
             data=records,
-            total_records=total_recores,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
 
 
     @router.get("/", response_model=APIResponse[list[DoctorResponseSchema]])
     async def get_all_doctors(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         search: str = None,
         filters: str = None,
         sort_by: str = None,
         sort_order: str = 'asc',
         page: int = 1,
         limit: int = 5,
+        cursor: str = None,
+        count: str = None,
     ):
         '''
         returns all doctors records
@@ -71,17 +79,20 @@ class Doctor():
         '''
         logger.info(f"Get/doctors/ api called")
 
-        allowed_fields = ['speciality', 'id']
+        allowed_fields = ['speciality', 'id', 'next_free_slot', 'free_slots_week']
         obj = DoctorServices(db, DoctorModel)
-        records, total_recores = obj.fetch_doctors(filters, sort_by, sort_order, page, limit, allowed_fields, search)
+        options = loading_profiles['doctor']
+        records, page_info = await obj.fetch_doctors(filters, sort_by, sort_order, page, limit, allowed_fields, search, options, cursor=cursor, count=count)
 
         return APIResponse[list[DoctorResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message="All Doctors fetched",
             data=records,
-            total_records=total_recores,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
 
     @router.get("/{doctor_id}/available_slots", response_model=APIResponse[list[AvailableSlotResponseSchema]])
@@ -89,7 +100,7 @@ class Doctor():
         doctor_id: UUID,
         token: Annotated[str, Depends(oauth2_scheme)],
         date_filter: DateFilterSchema = Depends(),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
     ):
         '''
         returns specified doctor's available slots and facilitates date range filters
@@ -98,7 +109,7 @@ class Doctor():
         logger.info(f"GET/doctors/{doctor_id}/available_slots API accessed")
 
         obj = DoctorSlotServices(db, DoctorSlot)
-        records = obj.fetch_doctor_available_slots(token, doctor_id, date_filter)
+        records = await obj.fetch_doctor_available_slots(token, doctor_id, date_filter)
 
         logger.debug(f"Records fetched: {records}")
         return APIResponse[list[AvailableSlotResponseSchema]](
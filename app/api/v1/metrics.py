@@ -0,0 +1,27 @@
+from fastapi import APIRouter, status
+from app.utils.logging import Logging
+from app.utils.metrics import metrics, metrics_publisher
+from app.schemas.api_response import APIResponse
+
+
+logger = Logging(__name__).get_logger()
+
+class Metrics():
+
+    router = APIRouter(tags=["Metrics"])
+
+    @router.get("/metrics", response_model=APIResponse[dict])
+    def get_metrics():
+        '''
+        returns in-process metrics of the worker serving the request, such as db pool checkout wait and connections in use,
+        and under 'workers' the snapshots last published by the celery worker processes.
+        admin only, see the /metrics row of load_rbac_constraints.py
+        '''
+        logger.info(f"GET/metrics API accessed")
+
+        return APIResponse[dict](
+            success=True,
+            status_code=status.HTTP_200_OK,
+            message=f"Metrics fetched",
+            data={**metrics.snapshot(), "workers": metrics_publisher.read_all()}
+        )
@@ -1,6 +1,6 @@
 
 from sqlalchemy.orm import Session
-from app.schemas.token import Token
+from app.schemas.token import Token, Principal
 from fastapi import APIRouter, Depends, status
 from app.utils.logging import Logging
 from app.services.auth_service import AuthServices
@@ -9,6 +9,7 @@ from app.schemas.api_response import APIResponse
 from app.schemas.user import UserResponseSchema, UserUpdateSchema
 from app.models.users import User
 from app.db.session import get_db
+from app.api.dependencies import get_current_principal
 from typing import Annotated
 from fastapi.security import OAuth2PasswordBearer
 
@@ -22,8 +23,8 @@ class Patient():
     router = APIRouter(prefix="/patients", tags=["Patient"])
 
     @router.get("/me", response_model=APIResponse[UserResponseSchema])
-    async def get_current_patient_profile(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def get_current_patient_profile(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         db: Session = Depends(get_db)
     ):
         '''
@@ -32,7 +33,7 @@ class Patient():
         '''
         logger.info(f"GET/patients/me API accessed")
         obj = PatientServices(db, User)
-        record = obj.get_current_patient(token)
+        record = obj.get_current_patient(principal)
 
         return APIResponse[UserResponseSchema](
             success=True,
@@ -42,8 +43,8 @@ class Patient():
         )
 
     @router.patch("/me", response_model=APIResponse[UserResponseSchema])
-    async def update_current_patient_profile(
-        token: Annotated[str, Depends(oauth2_scheme)],
+    def update_current_patient_profile(
+        principal: Annotated[Principal, Depends(get_current_principal)],
         user:UserUpdateSchema,
         db: Session = Depends(get_db)
     ):
@@ -53,7 +54,7 @@ class Patient():
         '''
         logger.info(f"PATCH/patients/me API accessed")
         obj = PatientServices(db, User)
-        record = obj.update_current_patient(token, user)
+        record = obj.update_current_patient(principal, user)
 
         return APIResponse[UserResponseSchema](
             success=True,
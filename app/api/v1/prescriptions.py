@@ -8,6 +8,9 @@ from app.services.prescription_services import PrescriptionServices
 from app.schemas.api_response import APIResponse
 from app.schemas.prescriptions import PrescriptionResponseSchema, PrescriptionURLResponseSchema
 from app.db.session import get_db
+from app.api.dependencies import get_current_principal
+from app.config.loading_profiles import loading_profiles
+from app.schemas.token import Principal
 from typing import Annotated
 from uuid import UUID
 
@@ -20,9 +23,9 @@ class Prescription():
     router = APIRouter(prefix="/prescriptions", tags=["Prescription"])
 
     @router.post("/{appointment_id}", response_model=APIResponse[PrescriptionResponseSchema])
-    async def add_patient_prescription(
+    def add_patient_prescription(
         appointment_id: UUID,
-        token: Annotated[str, Depends(oauth2_scheme)],
+        principal: Annotated[Principal, Depends(get_current_principal)],
         prescription: UploadFile = File(...),
         db: Session = Depends(get_db)
     ):
@@ -35,7 +38,7 @@ class Prescription():
         logger.info(f"POST/prescriptions/appointment_id API accessed")
 
         obj = PrescriptionServices(db, PrescriptionModel)
-        record = obj.create_patient_prescription(token, appointment_id, prescription)
+        record = obj.create_patient_prescription(principal, appointment_id, prescription, loading_profiles['prescription'])
 
         return APIResponse[PrescriptionResponseSchema](
             success=True,
@@ -46,7 +49,7 @@ class Prescription():
 
 
     @router.get("/patient/{patient_id}", response_model=APIResponse[list[PrescriptionURLResponseSchema]])
-    async def get_patient_prescriptions(
+    def get_patient_prescriptions(
         patient_id: UUID,
         db: Session = Depends(get_db)
     ):
@@ -59,7 +62,7 @@ class Prescription():
         logger.info(f"Get/prescriptions/patient/patient_id API accessed")
 
         obj = PrescriptionServices(db, PrescriptionModel)
-        records = obj.fetch_patient_prescriptions(patient_id)
+        records = obj.fetch_patient_prescriptions(patient_id, loading_profiles['prescription'])
 
         return APIResponse[list[PrescriptionURLResponseSchema]](
             success=True,
@@ -69,7 +72,7 @@ class Prescription():
         )
 
     @router.get("/{prescription_id}", response_model=APIResponse[PrescriptionURLResponseSchema])
-    async def get_prescription(
+    def get_prescription(
         prescription_id: UUID,
         db: Session = Depends(get_db)
     ):
@@ -80,7 +83,7 @@ class Prescription():
         logger.info(f"Get/prescriptions/prescription_id API accessed")
 
         obj = PrescriptionServices(db, PrescriptionModel)
-        record = obj.fetch_patient_prescription(prescription_id)
+        record = obj.fetch_patient_prescription(prescription_id, loading_profiles['prescription'])
 
         return APIResponse[PrescriptionURLResponseSchema](
             success=True,
@@ -90,7 +93,7 @@ class Prescription():
         )
 
     @router.get("/", response_model=APIResponse[list[PrescriptionURLResponseSchema]])
-    async def get_all_prescription(
+    def get_all_prescription(
         db: Session = Depends(get_db),
         search: str = None,
         filters: str = None,
@@ -98,6 +101,8 @@ class Prescription():
         sort_order: str = 'asc',
         page: int = 1,
         limit: int = 5,
+        cursor: str = None,
+        count: str = None,
     ):
         '''
         fetches all prescriptions
@@ -107,13 +112,15 @@ class Prescription():
 
         allowed_fields = ['doctor_id', 'patient_id', 'appointment_id']
         obj = PrescriptionServices(db, PrescriptionModel)
-        records, total_records = obj.fetch_all_prescriptions(filters, sort_by, sort_order, page, limit, allowed_fields, search)
+        records, page_info = obj.fetch_all_prescriptions(filters, sort_by, sort_order, page, limit, allowed_fields, search, cursor=cursor, count=count, options=loading_profiles['prescription'])
 
         return APIResponse[list[PrescriptionURLResponseSchema]](
             success=True,
             status_code=status.HTTP_200_OK,
             message=f"All prescriptions fetched",
             data=records,
-            total_records=total_records,
-            current_page=page
+            total_records=page_info.total_records,
+            total_records_mode=page_info.total_records_mode,
+            current_page=page,
+            next_cursor=page_info.next_cursor
         )
\ No newline at end of file
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, status
+from starlette.concurrency import run_in_threadpool
 from app.schemas.user import UserDoctorCreateSchema, UserResponseSchema, UserCreateSchema, UserDoctorResponseSchema
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.utils.helper import create_password_hash
+from app.utils.password_pool import password_pool
 from app.services.basic_services import BasicServices
 from app.services.doctor_services import DoctorServices
 from app.services.patient_services import PatientServices
@@ -14,6 +15,7 @@ from app.schemas.api_response import APIResponse
 
 logger = Logging(__name__).get_logger()
 
+#registration routes stay async to await the password pool, the sync profile services run in the threadpool
 class Registration:
     router = APIRouter(tags=["Registration"])
 
@@ -28,11 +30,11 @@ class Registration:
         logger.debug(f"Registering doctor with username: {user.username}")
 
         #generates hash password to store in db
-        hashed_password = create_password_hash(user.hashed_password)
+        hashed_password = await password_pool.hash(user.hashed_password)
         user.hashed_password = hashed_password
 
         obj = DoctorServices(db, UserModel)
-        response = obj.create_doctor_profile(user)
+        response = await run_in_threadpool(obj.create_doctor_profile, user)
 
         logger.info(f"Doctor profile generated: {response.username}, ID: {response.id}")
         return APIResponse[UserDoctorResponseSchema](
@@ -54,11 +56,11 @@ class Registration:
         logger.debug(f"Registering patient with username: {user.username}")
 
         #generates hash password to store in db
-        hashed_password = create_password_hash(user.hashed_password)
+        hashed_password = await password_pool.hash(user.hashed_password)
         user.hashed_password = hashed_password
 
         obj = PatientServices(db, UserModel)
-        response = obj.create_patient_profile(user)
+        response = await run_in_threadpool(obj.create_patient_profile, user)
 
         logger.info(f"Pateint profile generated: {response.username}, ID: {response.id}")
         return APIResponse[UserResponseSchema](
@@ -79,11 +81,11 @@ class Registration:
         logger.debug(f"Registering nurse with username: {user.username}")
 
         #generates hash password to store in db
-        hashed_password = create_password_hash(user.hashed_password)
+        hashed_password = await password_pool.hash(user.hashed_password)
         user.hashed_password = hashed_password
 
         obj = NurseServices(db, UserModel)
-        response = obj.create_nurse_profile(user)
+        response = await run_in_threadpool(obj.create_nurse_profile, user)
 
         logger.info(f"Nurse profile generated: {response.username}, ID: {response.id}")
         return APIResponse[UserResponseSchema](
@@ -1,12 +1,16 @@
 import boto3
-from app.config.config import ACCESS_KEY, SECRET_ACCESS_KEY
+from botocore.config import Config
+from app.config.config import ACCESS_KEY, SECRET_ACCESS_KEY, STORAGE_S3_ENDPOINT_URL, STORAGE_MAX_CONCURRENCY
 
 #boto3 initialization to access aws s3 bucket
+#the connection pool is sized for the multipart upload threads, endpoint_url points to MinIO when set
 s3 = boto3.client(
             "s3",
             aws_access_key_id = ACCESS_KEY,
             aws_secret_access_key = SECRET_ACCESS_KEY,
-            region_name = "eu-north-1"
+            region_name = "eu-north-1",
+            endpoint_url = STORAGE_S3_ENDPOINT_URL,
+            config = Config(max_pool_connections=STORAGE_MAX_CONCURRENCY)
         )
 
 bucket_name = "yash-jogi-prescription-bkt"
\ No newline at end of file
@@ -8,6 +8,29 @@ upload_folder = "uploads"
 
 #db url
 DB_URL = os.getenv("DB_URL")
+#asyncpg url for the API, derived from DB_URL when not set
+ASYNC_DB_URL = os.getenv("ASYNC_DB_URL")
+
+#list count mode 'estimate' reuses counts cached for this long
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", 1000))
+COUNT_CACHE_TTL_SECONDS = int(os.getenv("COUNT_CACHE_TTL_SECONDS", 60))
+#parsed list filters strings kept per worker
+FILTER_SPEC_CACHE_SIZE = int(os.getenv("FILTER_SPEC_CACHE_SIZE", 1000))
+#compiled sql statements cached by sqlalchemy per engine, every filter/sort/search shape is one entry
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 1500))
+
+#db connection pool, applied per process to both sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+#set when connecting through pgbouncer in transaction mode, disables prepared statements
+DB_PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+
+#celery workers publish their metrics snapshot here after every task, GET /metrics returns them under 'workers'
+METRICS_REDIS_URL = os.getenv("METRICS_REDIS_URL", "redis://localhost:6379/2")
+METRICS_PUSH_TTL_SECONDS = int(os.getenv("METRICS_PUSH_TTL_SECONDS", 300))
 
 #JWT constants
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -17,10 +40,89 @@ TOKEN_ALGORITHM = os.getenv("TOKEN_ALGORITHM")
 ACCESS_TOKEN_EXPIRY_MINUTES = 30
 REFRESH_TOKEN_EXPIRY_DAYS = 14
 
+#Max verified tokens kept in memory per worker
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+#bcrypt hashing pool, requests beyond workers + max queue get 503
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", 4))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", 32))
+
+#booking admission in front of POST /appointments/book: 'off', 'memory' (per worker) or 'redis' (shared)
+BOOKING_ADMISSION = os.getenv("BOOKING_ADMISSION", "off")
+BOOKING_ADMISSION_REDIS_URL = os.getenv("BOOKING_ADMISSION_REDIS_URL", "redis://localhost:6379/1")
+BOOKING_CLAIM_TTL_SECONDS = int(os.getenv("BOOKING_CLAIM_TTL_SECONDS", 10))
+#a request finding the slot claimed waits this long for the claim, then books through the database without it
+BOOKING_CLAIM_WAIT_MS = int(os.getenv("BOOKING_CLAIM_WAIT_MS", 200))
+BOOKING_TAKEN_TTL_SECONDS = int(os.getenv("BOOKING_TAKEN_TTL_SECONDS", 60))
+BOOKING_ADMISSION_MAX_SLOTS = int(os.getenv("BOOKING_ADMISSION_MAX_SLOTS", 100000))
+
+#per doctor, per day slot cache of GET /doctors/{doctor_id}/available_slots
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", 50000))
+AVAILABILITY_CACHE_TTL_SECONDS = int(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", 30))
+#days returned without end_date and the longest allowed date range
+AVAILABILITY_DEFAULT_DAYS = int(os.getenv("AVAILABILITY_DEFAULT_DAYS", 7))
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", 31))
+
+#schedule of doctors without a schedule template, every weekday
+DEFAULT_SCHEDULE_START = os.getenv("DEFAULT_SCHEDULE_START", "10:00")
+DEFAULT_SCHEDULE_END = os.getenv("DEFAULT_SCHEDULE_END", "18:00")
+DEFAULT_SLOT_MINUTES = int(os.getenv("DEFAULT_SLOT_MINUTES", 60))
+#days ahead of today for which slots are generated
+SLOT_GENERATION_DAYS = int(os.getenv("SLOT_GENERATION_DAYS", 5))
+#doctors queued by slot changes get their doctor_search row refreshed every this many seconds
+DOCTOR_SEARCH_QUEUE_INTERVAL_SECONDS = int(os.getenv("DOCTOR_SEARCH_QUEUE_INTERVAL_SECONDS", 30))
+
+#monthly partitions of doctor_slots and appointments created ahead, older partitions are moved to the archive schema
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", 24))
+
+#rows fetched per round trip from the server side cursor of the reports, also the row count of a parquet/arrow batch
+REPORT_FETCH_SIZE = int(os.getenv("REPORT_FETCH_SIZE", 1000))
+#reports are built in memory and spill to a temp file above this size, files are removed after upload
+REPORT_SPOOL_MAX_MB = int(os.getenv("REPORT_SPOOL_MAX_MB", 16))
+#comma separated, datasets: appointments, doctors, specialities. formats: pdf, csv, parquet, arrow
+#parquet and arrow need pyarrow from requirements-optional.txt
+REPORT_DATASETS = os.getenv("REPORT_DATASETS", "appointments,doctors,specialities").split(",")
+REPORT_FORMATS = os.getenv("REPORT_FORMATS", "pdf,csv").split(",")
+
 #AWS Credentials
 ACCESS_KEY = os.getenv("ACCESS_KEY")
 SECRET_ACCESS_KEY = os.getenv("SECRET_ACCESS_KEY")
 
+#object storage of prescriptions and reports: 's3' (boto3) or 'local' (files under STORAGE_LOCAL_ROOT)
+#STORAGE_S3_ENDPOINT_URL points the s3 backend to MinIO or another S3 compatible server
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "app/storage")
+#prefix of urls returned by the local backend, file:// urls when not set
+STORAGE_LOCAL_BASE_URL = os.getenv("STORAGE_LOCAL_BASE_URL")
+#files above the threshold are uploaded in parts of STORAGE_MULTIPART_CHUNK_MB by STORAGE_MAX_CONCURRENCY threads
+STORAGE_MULTIPART_THRESHOLD_MB = int(os.getenv("STORAGE_MULTIPART_THRESHOLD_MB", 8))
+STORAGE_MULTIPART_CHUNK_MB = int(os.getenv("STORAGE_MULTIPART_CHUNK_MB", 8))
+STORAGE_MAX_CONCURRENCY = int(os.getenv("STORAGE_MAX_CONCURRENCY", 10))
+
 #send mail on order placement credentials
 EMAIL = os.getenv("EMAIL_ADDRESS")
-PASSWORD = os.getenv("EMAIL_PASSWORD")
\ No newline at end of file
+PASSWORD = os.getenv("EMAIL_PASSWORD")
+
+#mail transport: 'smtp' (smtplib), 'async_smtp' (aiosmtplib from requirements-optional.txt) or 'sink' (in-process, for load tests)
+MAIL_TRANSPORT = os.getenv("MAIL_TRANSPORT", "smtp")
+#delay per message of the sink transport, stands in for the smtp round trip
+MAIL_SINK_DELAY_MS = int(os.getenv("MAIL_SINK_DELAY_MS", 0))
+
+#smtp server of EMAIL_ADDRESS, connections are kept open per celery worker process
+#local sinks (benchmarks/mail_sink.py) need MAIL_SMTP_SSL=false and MAIL_SMTP_LOGIN=false
+MAIL_SMTP_HOST = os.getenv("MAIL_SMTP_HOST", "smtp.gmail.com")
+MAIL_SMTP_PORT = int(os.getenv("MAIL_SMTP_PORT", 465))
+MAIL_SMTP_SSL = os.getenv("MAIL_SMTP_SSL", "true").lower() == "true"
+MAIL_SMTP_LOGIN = os.getenv("MAIL_SMTP_LOGIN", "true").lower() == "true"
+MAIL_SMTP_TIMEOUT_SECONDS = int(os.getenv("MAIL_SMTP_TIMEOUT_SECONDS", 30))
+#a connection is reopened after this many messages or when idle for longer than MAIL_SMTP_IDLE_SECONDS
+MAIL_SMTP_MAX_MESSAGES = int(os.getenv("MAIL_SMTP_MAX_MESSAGES", 500))
+MAIL_SMTP_IDLE_SECONDS = int(os.getenv("MAIL_SMTP_IDLE_SECONDS", 60))
+
+#mail outbox dispatcher: mails per batch, attempts before a mail is marked failed and the retry backoff base
+MAIL_OUTBOX_BATCH_SIZE = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", 100))
+MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", 5))
+MAIL_OUTBOX_RETRY_SECONDS = int(os.getenv("MAIL_OUTBOX_RETRY_SECONDS", 30))
+MAIL_OUTBOX_INTERVAL_SECONDS = int(os.getenv("MAIL_OUTBOX_INTERVAL_SECONDS", 10))
\ No newline at end of file
@@ -0,0 +1,34 @@
+from sqlalchemy.orm import joinedload, selectinload, undefer
+from app.models.appointments import Appointment
+from app.models.doctor import Doctor
+from app.models.patients import Patient
+from app.models.prescriptions import Prescription
+
+#Loader options for every relationship a response schema serializes, endpoints pass the profile of their
+#response schema to FilterPaginationService or get_record_by_id so a page is loaded with a fixed number of queries.
+#many to one relationships are joined into the same query, collections are loaded with one extra selectin query
+loading_profiles = {
+    #AppointmentResponseSchema: doctor.user, patient.user, slot
+    'appointment': (
+        joinedload(Appointment.doctor).joinedload(Doctor.user),
+        joinedload(Appointment.patient).joinedload(Patient.user),
+        joinedload(Appointment.slot),
+    ),
+    #PrescriptionResponseSchema: doctor.user, patient.user
+    'prescription': (
+        joinedload(Prescription.doctor).joinedload(Doctor.user),
+        joinedload(Prescription.patient).joinedload(Patient.user),
+    ),
+    #DoctorResponseSchema: user, next_free_slot, free_slots_week
+    'doctor': (
+        joinedload(Doctor.user),
+        undefer(Doctor.next_free_slot),
+        undefer(Doctor.free_slots_week),
+    ),
+    #AvailableDoctorResponseSchema: available_slots, next_free_slot, free_slots_week
+    'doctor_slots': (
+        selectinload(Doctor.available_slots),
+        undefer(Doctor.next_free_slot),
+        undefer(Doctor.free_slots_week),
+    ),
+}
@@ -22,13 +22,11 @@ search_parameters = {
             'appointment': ['doctor_id', 'patient_id', 'slot_id', 'status']
         }
     },
+    #doctors are searched in their precomputed doctor_search document (name, speciality, username, email, phone)
     Doctor: {
-        'self': ['speciality', 'user_id'],
+        'self': [],
         'relationships': {
-            'appointments': ['doctor_id', 'patient_id', 'slot_id', 'status'],
-            'prescriptions': ['doctor_id', 'patient_id', 'appointment_id'],
-            'available_slots': ['start_time', 'end_time', 'notes', 'is_booked'],
-            'user': ['username', 'first_name', 'last_name', 'email', 'phone']
+            'search_document': ['document']
         }
     },
     Patient: {
@@ -0,0 +1,11 @@
+from sqlalchemy import DateTime, literal_column
+from app.models.doctor import Doctor
+
+#sort fields that can be NULL and the value their NULLs sort as, sorting and keyset cursors compare
+#coalesce(field, value) so rows with NULL stay on cursor pages, after every real value in ascending order
+null_sort_values = {
+    Doctor: {
+        #doctors without free slots
+        'next_free_slot': literal_column("'infinity'::timestamptz", DateTime(timezone=True)),
+    }
+}
@@ -1,5 +1,42 @@
 from sqlalchemy import create_engine
-from app.config.config import DB_URL
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool, register_pool_gauges
+from app.config.config import (
+    DB_URL, ASYNC_DB_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_PGBOUNCER_MODE, DB_QUERY_CACHE_SIZE
+)
+import uuid
 
-engine = create_engine(DB_URL)
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
 
+def async_connect_args():
+    '''asyncpg prepares statements by default, which breaks behind pgbouncer in transaction mode'''
+    if not DB_PGBOUNCER_MODE:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+#sync engine, used by celery tasks and sync services
+engine = create_engine(DB_URL, poolclass=InstrumentedQueuePool, query_cache_size=DB_QUERY_CACHE_SIZE, **pool_options)
+
+#async engine used by the API so queries do not block the event loop
+async_engine = create_async_engine(
+    ASYNC_DB_URL or make_url(DB_URL).set(drivername="postgresql+asyncpg"),
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=async_connect_args(),
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    **pool_options
+)
+
+register_pool_gauges(engine, InstrumentedQueuePool.metrics_name)
+register_pool_gauges(async_engine.sync_engine, InstrumentedAsyncQueuePool.metrics_name)
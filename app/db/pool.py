@@ -0,0 +1,34 @@
+import time
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.utils.metrics import metrics
+
+
+class CheckoutTimingMixin:
+    '''records how long callers wait for a pool connection and how often the wait times out'''
+    metrics_name = "db_pool"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            metrics.increment(f"{self.metrics_name}_checkout_timeouts")
+            raise
+        finally:
+            metrics.observe(f"{self.metrics_name}_checkout_wait_seconds", time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(CheckoutTimingMixin, QueuePool):
+    metrics_name = "db_pool"
+
+
+class InstrumentedAsyncQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    metrics_name = "db_async_pool"
+
+
+def register_pool_gauges(engine, metrics_name):
+    '''exports connections in use and pool size of engine, engine.pool is read on every call so recreated pools are tracked'''
+    metrics.register_gauge(f"{metrics_name}_in_use", lambda: engine.pool.checkedout())
+    metrics.register_gauge(f"{metrics_name}_size", lambda: engine.pool.size())
+    metrics.register_gauge(f"{metrics_name}_overflow", lambda: engine.pool.overflow())
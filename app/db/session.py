@@ -1,11 +1,19 @@
 from sqlalchemy.orm import sessionmaker
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.database import engine, async_engine
 
 local_session = sessionmaker(bind=engine)
 
+#objects stay loaded after commit, expired attributes can not be lazy loaded on async sessions
+async_local_session = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
 def get_db():
     try:
         db = local_session()
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with async_local_session() as db:
+        yield db
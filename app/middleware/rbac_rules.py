@@ -0,0 +1,84 @@
+import asyncio
+import re
+import signal
+from fnmatch import translate
+from threading import Lock
+from app.db.session import local_session
+from app.models.rbac import Endpoint
+from app.utils.logging import Logging
+
+logger = Logging(__name__).get_logger()
+
+class RBACRuleTable:
+    '''
+    in-memory copy of the endpoints table used by the RBAC middleware.
+    rules are grouped by (method, role) and all glob patterns of a group are compiled
+    into a single regex, so a permission check is one dict lookup and one regex match.
+    '''
+    def __init__(self):
+        self.rules = {}
+        self.loaded = False
+        self.lock = Lock()
+
+    def load(self):
+        '''fetches all endpoint rows from database and rebuilds the rule table'''
+        logger.info(f"Loading RBAC rules from endpoints table")
+        session = local_session()
+        try:
+            end_points = session.query(Endpoint).all()
+            rows = [(end_point.endpoint, end_point.methods or [], end_point.roles or []) for end_point in end_points]
+        finally:
+            session.close()
+
+        self.build(rows)
+        logger.info(f"RBAC rules loaded, endpoints: {len(rows)}, rule groups: {len(self.rules)}")
+
+    def build(self, rows):
+        '''
+        compiles rules from (endpoint_pattern, methods, roles) rows
+        patterns keep the fnmatch semantics of the stored endpoint values
+        '''
+        patterns = {}
+        for endpoint, methods, roles in rows:
+            for method in methods:
+                for role in roles:
+                    patterns.setdefault((method, role), []).append(translate(endpoint))
+
+        rules = {
+            key: re.compile("|".join(f"(?:{pattern})" for pattern in group))
+            for key, group in patterns.items()
+        }
+
+        with self.lock:
+            self.rules = rules
+            self.loaded = True
+
+    def is_allowed(self, method, role, path):
+        '''returns true if the role is allowed to call the method on given path'''
+        if not self.loaded:
+            self.load()
+
+        rule = self.rules.get((method, role))
+        return bool(rule and rule.match(path))
+
+    def reload(self):
+        '''reloads rules from database, keeps the current rules if reload fails'''
+        try:
+            self.load()
+        except Exception as e:
+            logger.exception(f"Unable to reload RBAC rules, keeping current rules: {e}")
+
+    def install_reload_signal(self):
+        '''
+        reloads the rules on SIGHUP, eg. after load_rbac_constraints.py updates the endpoints table
+        reload runs in the default executor so the event loop is not blocked by the query
+        '''
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: loop.run_in_executor(None, self.reload))
+            logger.info(f"SIGHUP handler installed for RBAC rules reload")
+        except (NotImplementedError, AttributeError, RuntimeError):
+            logger.warning(f"Signals not supported on this platform, RBAC rules reload on SIGHUP disabled")
+
+
+rbac_rules = RBACRuleTable()
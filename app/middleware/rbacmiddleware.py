@@ -1,17 +1,83 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.concurrency import run_in_threadpool
 from fastapi import Request
 from jwt.exceptions import InvalidTokenError
-from app.db.session import local_session
-from app.models.rbac import Endpoint
-from sqlalchemy import and_
-from app.utils.helper import get_payload
+from app.middleware.rbac_rules import rbac_rules
+from app.utils.helper import get_principal
 from app.utils.logging import Logging
 from app.config.settings import settings
-from fnmatch import fnmatch
 
 logger = Logging(__name__).get_logger()
 
+def check_rbac_access(request_method, request_endpoint, auth_header):
+    '''
+    checks token and RBAC rules for the request
+    returns: (response, principal), response is None if request can proceed, else JSONResponse rejecting the request
+    principal holds the verified token claims, it is None for endpoints that bypass authentication
+    '''
+    logger.info(f"RBAC check initiated: {request_method} {request_endpoint}")
+
+    '''allow docs and authentication API to proceed without authentication'''
+    if request_endpoint in ["/docs", "/openapi.json", "/redoc", "/auth/login", "/auth/refresh-token", "/auth/logout", "/orders/payment-success"]:
+        logger.debug(f"Bypassing RBAC for endpoint: {request_endpoint}")
+        return None, None
+    '''allow registration api to proceed without authentication'''
+    if ((request_endpoint in ["/doctor", "/nurse", "/patient"]) and request_method == "POST"):
+        logger.debug("Bypassing RBAC for registration endpoint")
+        return None, None
+
+    try:
+        if not auth_header:
+            logger.warning("Authorization header missing")
+            return JSONResponse(
+                status_code=401,
+                content="Authorization header missing"
+            ), None
+
+        '''fetch details from token'''
+        token = auth_header.split(" ")[1]
+        principal = get_principal(token)
+        role = principal.role
+        token_type = principal.token_type
+
+        logger.debug(f"Token user role: {role}, token type: {token_type}")
+
+        # Verify only access token proceeds further
+        if token_type != 'access':
+            logger.warning(f"Invalid token type used: {token_type}")
+            return JSONResponse(
+                status_code=401,
+                content=f"Invalid Token Type"
+            ), None
+
+        # Ensure user has access for specific endpoint and method from in-memory RBAC rules
+        if not rbac_rules.is_allowed(request_method, role, request_endpoint):
+            logger.warning(f"Access denied for role '{role}' on {request_method} {request_endpoint}")
+            return JSONResponse(
+                status_code=403,
+                content=f"'{role}' do not have permission to call {request_method} {request_endpoint} API"
+            ), None
+
+        logger.info(f"Access granted for role '{role}' to {request_method} {request_endpoint}")
+        return None, principal
+
+    except InvalidTokenError as e:
+        logger.error("Invalid token encountered", exc_info=True)
+        return JSONResponse(
+            status_code=401,
+            content=f"{e}"
+        ), None
+
+    except Exception as e:
+        logger.exception("Unexpected error in RBAC middleware")
+        return JSONResponse(
+            status_code=500,
+            content="Internal Server Error in RBAC Middleware"
+        ), None
+
+
 class RBACMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
 
@@ -24,80 +90,47 @@ class RBACMiddleware(BaseHTTPMiddleware):
         request_method = request.method.upper()
         request_endpoint = request.url.path
 
-        logger.info(f"RBAC check initiated: {request_method} {request_endpoint}")
-        
-        '''allow docs and authentication API to proceed without authentication'''
-        if request_endpoint in ["/docs", "/openapi.json", "/redoc", "/auth/login", "/auth/refresh-token", "/auth/logout", "/orders/payment-success"]:
-            logger.debug(f"Bypassing RBAC for endpoint: {request_endpoint}")
-            return await call_next(request)
-        '''allow registration api to proceed without authentication'''
-        if ((request_endpoint in ["/doctor", "/nurse", "/patient"]) and request_method == "POST"):
-            logger.debug("Bypassing RBAC for registration endpoint")
-            return await call_next(request)
+        response, principal = check_rbac_access(request_method, request_endpoint, auth_header)
+        if response is not None:
+            return response
 
-        session = local_session()
-        try:
-            if not auth_header:
-                logger.warning("Authorization header missing")
-                return JSONResponse(
-                    status_code=401,
-                    content="Authorization header missing"
-                )
-
-            '''fetch details from token'''
-            token = auth_header.split(" ")[1]
-            payload = get_payload(token)
-            role = payload.get('role')
-            token_type = payload.get('type')
-
-            logger.debug(f"Token user role: {role}, token type: {token_type}")
-
-            # Verify only access token proceeds further
-            if token_type != 'access':
-                logger.warning(f"Invalid token type used: {token_type}")
-                return JSONResponse(
-                    status_code=401,
-                    content=f"Invalid Token Type"
-                )
-
-            # Ensure user has access for specific endpoint and method from RBAC table
-            end_points = session.query(Endpoint).filter(
-                and_(
-                    # (Endpoint.endpoint == request_endpoint),
-                    (Endpoint.methods.any(request_method)),
-                    (Endpoint.roles.any(role))
-                )
-            ).all()
-
-            access_granted = False
-            for end_point in end_points:
-                if fnmatch(request_endpoint, end_point.endpoint):  #To match the endpoint stored pattern
-                    access_granted = True
-
-            if not access_granted:
-                logger.warning(f"Access denied for role '{role}' on {request_method} {request_endpoint}")
-                return JSONResponse(
-                    status_code=403,
-                    content=f"'{role}' do not have permission to call {request_method} {request_endpoint} API"
-                )
-
-            logger.info(f"Access granted for role '{role}' to {request_method} {request_endpoint}")
-        
-        except InvalidTokenError as e:
-            logger.error("Invalid token encountered", exc_info=True)
-            return JSONResponse(
-                status_code=401,
-                content=f"{e}"
-            )
+        request.state.principal = principal
+        return await call_next(request)
 
-        except Exception as e:
-            logger.exception("Unexpected error in RBAC middleware")
-            return JSONResponse(
-                status_code=500,
-                content="Internal Server Error in RBAC Middleware"
-            )
-        finally:
-            session.close()
-            logger.debug("DB session closed for RBACMiddleware")
 
-        return await call_next(request)
+class RBACASGIMiddleware:
+    '''
+    raw ASGI version of RBACMiddleware, rejected requests are answered before the app is called
+    and allowed requests are passed to the app with the original receive and send channels,
+    so responses are streamed through without the extra task and memory stream of BaseHTTPMiddleware
+    '''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if settings.TESTING:
+            logger.info(f"Testing True in settings, bypassing RBAC check")
+            await self.app(scope, receive, send)
+            return
+
+        # rules are normally loaded on startup, first load must not block the event loop
+        if not rbac_rules.loaded:
+            await run_in_threadpool(rbac_rules.load)
+
+        '''fetch details from request scope'''
+        auth_header = Headers(scope=scope).get("Authorization")
+        request_method = scope["method"].upper()
+        request_endpoint = scope["path"]
+
+        response, principal = check_rbac_access(request_method, request_endpoint, auth_header)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        # same storage as request.state.principal
+        scope.setdefault("state", {})["principal"] = principal
+        await self.app(scope, receive, send)
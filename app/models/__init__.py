@@ -3,7 +3,10 @@ from app.models.appointments import Appointment
 from app.models.attendance import Attendance
 from app.models.doctor_slots import DoctorSlot
 from app.models.doctor import Doctor
+from app.models.doctor_schedule import DoctorScheduleTemplate
+from app.models.doctor_search import DoctorSearch, DoctorSearchQueue
 from app.models.patients import Patient
 from app.models.prescriptions import Prescription
 from app.models.users import User
-from app.models.rbac import Endpoint
\ No newline at end of file
+from app.models.rbac import Endpoint
+from app.models.mail_outbox import MailOutbox
\ No newline at end of file
@@ -1,13 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, ForeignKeyConstraint, Float, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base_model import BaseModel
 from sqlalchemy.dialects.postgresql import UUID
 
 class Appointment(BaseModel):
     __tablename__ = "appointments"
+    __table_args__ = (
+        #a slot can have only one appointment that is not cancelled
+        Index("uq_appointments_active_slot", "slot_id", "slot_start_time", unique=True, postgresql_where=text("status <> 'cancelled'")),
+        #history and upcoming appointments of a patient or doctor, slot lookups and the cascade from doctor_slots
+        Index("ix_appointments_patient_slot_start_time", "patient_id", "slot_start_time"),
+        Index("ix_appointments_doctor_slot_start_time", "doctor_id", "slot_start_time"),
+        Index("ix_appointments_slot", "slot_id", "slot_start_time"),
+        ForeignKeyConstraint(
+            ["slot_id", "slot_start_time"], ["doctor_slots.id", "doctor_slots.start_time"], ondelete="CASCADE"
+        ),
+        #monthly partitions on the slot time, partitions are created by celery_app.partition_maintenance
+        {"postgresql_partition_by": "RANGE (slot_start_time)"},
+    )
     doctor_id = Column(UUID, ForeignKey("doctors.id", ondelete="CASCADE"))
     patient_id = Column(UUID, ForeignKey("patients.id", ondelete="CASCADE"))
-    slot_id = Column(UUID, ForeignKey("doctor_slots.id", ondelete="CASCADE"))
+    slot_id = Column(UUID)
+    #copy of slot start_time, partition key of appointments and part of the slot foreign key
+    slot_start_time = Column(DateTime(timezone=True), primary_key=True)
     status = Column(String, nullable=False)
     is_mail_sent = Column(Boolean, default=False)
     created_by = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"))
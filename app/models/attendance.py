@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Date, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base_model import BaseModel
 from sqlalchemy.dialects.postgresql import UUID
@@ -9,6 +9,10 @@ ist = pytz.timezone('Asia/Kolkata')
 
 class Attendance(BaseModel):
     __tablename__ = "attendances"
+    __table_args__ = (
+        #open attendance of a user, time_in and time_out look it up on every call
+        Index("ix_attendances_open_user", "user_id", postgresql_where=text("time_out IS NULL")),
+    )
     user_id = Column(UUID, ForeignKey("users.id"))
     date = Column(Date, default=datetime.now(ist).date())
     time_in = Column(DateTime(timezone=True), default=lambda: datetime.now(ist))
@@ -1,15 +1,33 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index, select, func
+from sqlalchemy.orm import relationship, validates, column_property
 from app.models.base_model import BaseModel
+from app.models.doctor_search import DoctorSearch
 from sqlalchemy.dialects.postgresql import UUID
 
 class Doctor(BaseModel):
     __tablename__ = "doctors"
-    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"))
+    __table_args__ = (
+        #pg_trgm index for ilike search
+        Index("ix_doctors_speciality_trgm", "speciality", postgresql_using="gin", postgresql_ops={"speciality": "gin_trgm_ops"}),
+    )
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     speciality = Column(String)
     
     appointments = relationship("Appointment", back_populates="doctor")
     prescriptions = relationship("Prescription", back_populates="doctor")
     available_slots = relationship("DoctorSlot", back_populates="doctor")
+    schedule = relationship("DoctorScheduleTemplate", back_populates="doctor")
     user = relationship("User", back_populates="doctor", uselist=False, foreign_keys="Doctor.user_id")
+    search_document = relationship("DoctorSearch", back_populates="doctor", uselist=False)
 
+#read from doctor_search so lists can filter and sort on them, deferred as every other doctor query would pay
+#for the subqueries, the 'doctor' and 'doctor_slots' loading profiles undefer them
+Doctor.next_free_slot = column_property(
+    select(DoctorSearch.next_free_slot).where(DoctorSearch.doctor_id == Doctor.id).scalar_subquery(),
+    deferred=True
+)
+#0 until the doctor_search row exists, so the field is never NULL and can be used as cursor sort key
+Doctor.free_slots_week = column_property(
+    func.coalesce(select(DoctorSearch.free_slots_week).where(DoctorSearch.doctor_id == Doctor.id).scalar_subquery(), 0),
+    deferred=True
+)
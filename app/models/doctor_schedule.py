@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Time, ForeignKey
+from sqlalchemy.orm import relationship
+from app.models.base_model import BaseModel
+from sqlalchemy.dialects.postgresql import UUID
+
+class DoctorScheduleTemplate(BaseModel):
+    '''
+    one working window of a doctor's weekly schedule, slots of slot_minutes are generated from start_time to end_time.
+    a day can have several windows (breaks between them), days without windows are days off.
+    doctors without any window get the default schedule from config
+    '''
+    __tablename__ = "doctor_schedule_templates"
+    doctor_id = Column(UUID, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, nullable=False, default=60)
+
+    doctor = relationship("Doctor", back_populates="schedule")
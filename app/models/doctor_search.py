@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index, Identity, text
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+class DoctorSearch(Base):
+    '''
+    one search document per doctor, written only by the refresh_doctor_search() database function.
+    triggers on users and doctors refresh the rows of changed doctors, slot changes are queued in doctor_search_queue.
+    celery_app.doctor_slots.refresh_doctor_search refreshes all rows as slots pass and weeks change
+    '''
+    __tablename__ = "doctor_search"
+    __table_args__ = (
+        #pg_trgm index for ilike search over the whole document
+        Index("ix_doctor_search_document_trgm", "document", postgresql_using="gin", postgresql_ops={"document": "gin_trgm_ops"}),
+    )
+    doctor_id = Column(UUID, ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String)
+    speciality = Column(String)
+    #name, speciality, username, email and phone in one lower case string
+    document = Column(String, nullable=False)
+    next_free_slot = Column(DateTime(timezone=True), nullable=True)
+    #free future slots in the current IST week, monday to sunday
+    free_slots_week = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True))
+
+    doctor = relationship("Doctor", back_populates="search_document", uselist=False)
+
+
+class DoctorSearchQueue(Base):
+    '''
+    doctors whose slots changed, appended by the doctor_slots triggers and drained by
+    celery_app.doctor_slots.refresh_queued_doctor_search. plain inserts without unique key or foreign key,
+    so concurrent bookings of one doctor never wait on each other for the search row
+    '''
+    __tablename__ = "doctor_search_queue"
+    id = Column(BigInteger, Identity(), primary_key=True)
+    doctor_id = Column(UUID, nullable=False)
+    queued_at = Column(DateTime(timezone=True), nullable=False, server_default=text("now()"))
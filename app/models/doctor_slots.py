@@ -1,12 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base_model import BaseModel
 from sqlalchemy.dialects.postgresql import UUID
 
 class DoctorSlot(BaseModel):
     __tablename__ = "doctor_slots"
+    __table_args__ = (
+        #slot generation inserts with ON CONFLICT DO NOTHING against this constraint
+        UniqueConstraint("doctor_id", "start_time", name="uq_doctor_slots_doctor_start_time"),
+        #free slots of a doctor
+        Index("ix_doctor_slots_doctor_free", "doctor_id", "start_time", postgresql_where=text("is_booked = false")),
+        #monthly partitions on start_time, partitions are created by celery_app.partition_maintenance
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
     doctor_id = Column(UUID, ForeignKey("doctors.id"))
-    start_time = Column(DateTime(timezone=True), nullable=False)
+    #part of the primary key as partition key
+    start_time = Column(DateTime(timezone=True), primary_key=True)
     end_time = Column(DateTime(timezone=True), nullable=False)
     is_booked = Column(Boolean, default= False)
     notes = Column(String, nullable=True)
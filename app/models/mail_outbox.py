@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, text
+from app.models.base_model import BaseModel
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import pytz
+
+ist = pytz.timezone('Asia/Kolkata')
+
+class MailOutbox(BaseModel):
+    '''
+    mail waiting to be sent, written in the same transaction as the change it is about
+    and sent by celery_app.mail_outbox.dispatch_mail_outbox.
+    status is 'pending' until sent ('sent') or out of attempts ('failed')
+    '''
+    __tablename__ = "mail_outbox"
+    __table_args__ = (
+        #pending mails due for the dispatcher
+        Index("ix_mail_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+    #no foreign key, appointments is partitioned and its primary key includes slot_start_time
+    appointment_id = Column(UUID, nullable=False, index=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    #delivery latency is measured from here
+    queued_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(ist))
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(ist))
+    last_error = Column(String, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -5,7 +5,7 @@ from sqlalchemy.dialects.postgresql import UUID
 
 class Patient(BaseModel):
     __tablename__ = "patients"
-    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     
     appointments = relationship("Appointment", back_populates="patient")
     prescriptions = relationship("Prescription", back_populates="patient")
@@ -6,8 +6,9 @@ from sqlalchemy.dialects.postgresql import UUID
 class Prescription(BaseModel):
     __tablename__ = "prescriptions"
     doctor_id = Column(UUID, ForeignKey("doctors.id", ondelete="CASCADE"))
-    patient_id = Column(UUID, ForeignKey("patients.id", ondelete="CASCADE"))
-    appointment_id = Column(UUID, ForeignKey("appointments.id", ondelete="CASCADE"))
+    patient_id = Column(UUID, ForeignKey("patients.id", ondelete="CASCADE"), index=True)
+    #no foreign key, appointments is partitioned and its primary key includes slot_start_time
+    appointment_id = Column(UUID, index=True)
     prescription_obj = Column(String)
     stored_on_cloud = Column(Boolean, default=False)
     doctor = relationship("Doctor", back_populates="prescriptions")
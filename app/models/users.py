@@ -1,10 +1,15 @@
 import re
-from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship, declarative_base, validates
 from app.models.base_model import BaseModel
 
 class User(BaseModel):
     __tablename__ = 'users'
+    #pg_trgm indexes for ilike search of doctors and patients by user details
+    __table_args__ = tuple(
+        Index(f"ix_users_{column}_trgm", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+        for column in ["username", "first_name", "last_name", "email", "phone"]
+    )
     username = Column(String(50), unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     first_name = Column(String(50), nullable=False)
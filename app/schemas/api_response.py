@@ -9,5 +9,7 @@ class APIResponse(BaseModel, Generic[T]):
     status_code: int
     message: Optional[str] = None
     total_records: Optional[int] = 1
+    total_records_mode: Optional[str] = None
     current_page: Optional[int] = 1
+    next_cursor: Optional[str] = None
     data: Optional[T] = None
\ No newline at end of file
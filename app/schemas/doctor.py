@@ -1,6 +1,8 @@
 
 from pydantic import BaseModel
 from uuid import UUID
+from datetime import datetime
+from typing import Optional
 
 from app.schemas.doctor_slots import AvailableSlotResponseSchema
 from app.schemas.user import UserResponseSchema
@@ -8,6 +10,8 @@ from app.schemas.user import UserResponseSchema
 class AvailableDoctorResponseSchema(BaseModel):
     user_id: UUID
     speciality: str
+    next_free_slot: Optional[datetime] = None
+    free_slots_week: Optional[int] = None
     available_slots: list[AvailableSlotResponseSchema]
 
     class Config:
@@ -19,6 +23,8 @@ class DoctorResponseSchema(BaseModel):
     id: UUID
     user_id: UUID
     speciality: str
+    next_free_slot: Optional[datetime] = None
+    free_slots_week: Optional[int] = None
     user: UserResponseSchema
 
     class Config:
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from fastapi import HTTPException
+from datetime import time
+from uuid import UUID
+
+
+class ScheduleWindowSchema(BaseModel):
+    weekday: int = Field(ge=0, le=6, examples=[0], description="0 is monday, 6 is sunday")
+    start_time: time = Field(examples=["10:00"])
+    end_time: time = Field(examples=["13:00"])
+    slot_minutes: int = Field(default=60, ge=5, le=480)
+
+    @model_validator(mode="after")
+    def validate_window(self):
+        if self.end_time <= self.start_time:
+            raise HTTPException(422, f"end_time must be after start_time, weekday: {self.weekday}")
+        return self
+
+
+class DoctorScheduleSchema(BaseModel):
+    '''weekly schedule, several windows on one weekday leave breaks between them, weekdays without windows are days off'''
+    windows: list[ScheduleWindowSchema]
+
+    @field_validator("windows")
+    def validate_overlap(windows):
+        windows_by_day = sorted(windows, key=lambda window: (window.weekday, window.start_time))
+        for previous, window in zip(windows_by_day, windows_by_day[1:]):
+            if previous.weekday == window.weekday and window.start_time < previous.end_time:
+                raise HTTPException(422, f"schedule windows overlap on weekday: {window.weekday}")
+        return windows
+
+
+class ScheduleWindowResponseSchema(ScheduleWindowSchema):
+    id: UUID
+    doctor_id: UUID
+
+    class Config:
+        from_attributes = True
+        arbitrary_types_allowed = True
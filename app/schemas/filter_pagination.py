@@ -23,4 +23,10 @@ OPERATOR_MAP = {
     FilterOperator.LT: operator.lt,
     FilterOperator.GTE: operator.ge,
     FilterOperator.LTE: operator.le,
-}
\ No newline at end of file
+}
+
+class PageInfo(BaseModel):
+    '''pagination details of a filtered page, next_cursor is None on the last page'''
+    total_records: Optional[int] = None
+    total_records_mode: Optional[str] = None
+    next_cursor: Optional[str] = None
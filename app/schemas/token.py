@@ -1,7 +1,17 @@
 from pydantic import BaseModel
+from typing import Optional
+from uuid import UUID
 
 class Token(BaseModel):
     username: str
     user_id: str
     access_token: str
-    refresh_token: str
\ No newline at end of file
+    refresh_token: str
+
+class Principal(BaseModel):
+    '''claims of a verified access token, set on request.state by RBAC middleware'''
+    user_id: UUID
+    role: str
+    token_type: str
+    username: Optional[str] = None
+    email: Optional[str] = None
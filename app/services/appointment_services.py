@@ -5,13 +5,15 @@ from app.models.doctor import Doctor
 from app.models.patients import Patient
 from app.models.appointments import Appointment
 from app.models.users import User
-from app.utils.helper import get_payload
-from celery_app.task import send_mail
+from app.models.mail_outbox import MailOutbox
 from datetime import timedelta, datetime, timezone
 from app.utils.logging import Logging
 from app.services.basic_services import BasicServices
 from app.services.filter_pagination_services import FilterPaginationService
-from sqlalchemy import and_
+from app.utils.booking_admission import booking_admission
+from app.utils.availability_cache import availability_cache
+from sqlalchemy import and_, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
 import uuid
 import pytz
 
@@ -29,94 +31,124 @@ class AppointmentServices(BasicServices):
         super().__init__(db, model)
 
 
-    def book_patient_appointment(self, token, slot_id):
+    def book_patient_appointment(self, principal, slot_id, options=()):
         """
-        Checks slot if available or not and then creates appointment
-        requires: token and slot_id
+        books the slot and creates the appointment in one statement, the slot is claimed by a conditional
+        update (is_booked = false and start_time in the future) and the appointment is inserted from its
+        returned row, so concurrent requests for one slot can not both succeed.
+        the confirmation mail is queued in mail_outbox within the same transaction
+        requires: principal of logged in user and slot_id, options are loader options of the returned appointment
         returns: appointment object
         """
         logger.info(f"book_patient_appointment method called")
+        logger.debug(f"principal received: {principal}")
 
-        try:
-            slot = self.db.query(DoctorSlot).filter(DoctorSlot.id == slot_id).first()
-            if slot is None:
-                logger.error(f"Slot with ID {slot_id} does not exist")
-                raise HTTPException(404, f"Slot with ID {slot_id} does not exist")
-
-            self.validate_slot_for_appointment_booking(slot=slot)
-            
-            payload = get_payload(token)
-            logger.debug(f"payload received: {payload}")
-            
-            user_id = payload.get('user_id')
-            role = payload.get('role')
-            uuid_user_id = uuid.UUID(user_id)   
+        role = principal.role
+        uuid_user_id = principal.user_id
 
-            user = super().get_record_by_model_id(User, uuid_user_id)
-
-            if role != 'patient':
-                logger.error(f"role does not match with 'patient', role: {role}")
-                raise HTTPException(401, "Only 'patients' can access this method")
-
-            logger.info(f"Creating appointment sqlalchemy object")
-            appointment = Appointment(
-                doctor_id = slot.doctor_id,
-                patient_id = user.patient.id,
-                slot_id = slot.id,
-                status = 'booked',
-                created_by = uuid_user_id
-            )
-            logger.debug(f"Appointment object: {appointment}")
+        if role != 'patient':
+            logger.error(f"role does not match with 'patient', role: {role}")
+            raise HTTPException(401, "Only 'patients' can access this method")
 
-        
-            logger.info(f"Attempting to add appointment to database")
-            appointment = super().add_record_object_to_db(appointment)
-            logger.info(f"Appointment added to database")
-
-            logger.info(f"Attempting to set slot object is_booked to True and adding notes")
-            slot.is_booked = True
-            slot.notes = f"Appointment booked by user : {user_id}"
-            logger.info(f"slot object updated")
-
-            super().records_modified(slot, uuid_user_id)
-
-            '''sending mail to user on successful appointment booking'''
-            send_mail.apply_async((
-                user.email,
-                "Appointment booked ",
-                f"Dear {user.first_name}, \nYour appointment is booked with doctor {appointment.doctor.user.first_name} {appointment.doctor.user.last_name}\nAppointment id: {appointment.id} \nTime: {appointment.slot.start_time}   \n\n\nThank you,\nOnline Appointment Booking System",
-                appointment.id
-            ))
-            
-            return appointment
-        except HTTPException:
+        try:
+            # rejects requests for slots known to be taken before the database is used, waits briefly on in-flight claims
+            with booking_admission.admit(slot_id):
+                appointment_id = self.db.scalar(self.book_slot_statement(slot_id, uuid_user_id))
+                if appointment_id is None:
+                    self.db.rollback()
+                    self.raise_booking_failure(slot_id, uuid_user_id)
+                # confirmation mail is committed with the booking and sent by the outbox dispatcher
+                self.db.add(MailOutbox(appointment_id=str(appointment_id), kind="appointment_booked"))
+                self.db.commit()
+            booking_admission.mark_taken(slot_id)
+            logger.info(f"Appointment {appointment_id} booked for slot {slot_id}")
+
+        except IntegrityError:
+            # partial unique index on active appointments per slot
             self.db.rollback()
+            booking_admission.mark_taken(slot_id)
+            logger.warning(f"Slot {slot_id} already has an active appointment")
+            raise HTTPException(409, f"Slot with id {slot_id} is already booked")
+        except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error occured during adding appointment to database: {e}")
             raise HTTPException(500, f"Error occured during adding appointment to database")
 
-    def validate_slot_for_appointment_booking(self, slot):
-        '''function to check if the given slot is available and if the slot time
-        is not in the past'''
-        logger.info(f"validate_slot_for_appointment_booking method called")
+        appointment = super().get_record_by_id(appointment_id, options)
+        availability_cache.invalidate(appointment.doctor_id, appointment.slot.start_time)
 
-        self.check_available_slot(slot)
-        if self.check_slot_time_not_in_past(slot):
-            raise HTTPException(
-                400, "Slot Start time is in the past"
+        return appointment
+
+    def book_slot_statement(self, slot_id, user_id):
+        '''
+        WITH booked_slot AS (UPDATE doctor_slots ... WHERE is_booked = false RETURNING ...)
+        INSERT INTO appointments ... SELECT ... FROM booked_slot RETURNING id
+        no row is returned if the slot is taken, in the past, missing or the user has no patient record,
+        in the last case the caller rolls back the slot update
+        '''
+        current_time = datetime.now(ist_timezone)
+
+        booked_slot = (
+            update(DoctorSlot)
+            .where(
+                DoctorSlot.id == slot_id,
+                DoctorSlot.is_booked == False,
+                DoctorSlot.start_time > current_time
             )
-    
-    def check_available_slot(self, slot):
-        '''checks and raises exception if given slot is not already booked'''
-        logger.info(f"check_available_slot method called")
+            .values(
+                is_booked=True,
+                notes=f"Appointment booked by user : {user_id}",
+                modified_at=current_time,
+                modified_by=user_id
+            )
+            .returning(DoctorSlot.id, DoctorSlot.doctor_id, DoctorSlot.start_time)
+            .cte("booked_slot")
+        )
+        patient_id = select(Patient.id).where(Patient.user_id == user_id).scalar_subquery()
+
+        columns = ['id', 'doctor_id', 'patient_id', 'slot_id', 'slot_start_time', 'status', 'is_mail_sent', 'created_by', 'created_at', 'modified_at']
+        rows = select(
+            literal(uuid.uuid4(), Appointment.id.type),
+            booked_slot.c.doctor_id,
+            patient_id,
+            booked_slot.c.id,
+            booked_slot.c.start_time,
+            literal('booked'),
+            literal(False),
+            literal(user_id, Appointment.created_by.type),
+            literal(current_time, Appointment.created_at.type),
+            literal(current_time, Appointment.modified_at.type),
+        ).where(patient_id.is_not(None))
+
+        return (
+            insert(Appointment)
+            .from_select(columns, rows)
+            .returning(Appointment.id)
+            .add_cte(booked_slot)
+        )
+
+    def raise_booking_failure(self, slot_id, user_id):
+        '''finds out why the slot could not be booked, only runs after a failed booking'''
+        slot = self.db.query(DoctorSlot).filter(DoctorSlot.id == slot_id).first()
+        if slot is None:
+            logger.error(f"Slot with ID {slot_id} does not exist")
+            raise HTTPException(404, f"Slot with ID {slot_id} does not exist")
+
         if slot.is_booked:
-            logger.error(f"Slot is already booked, slot: {slot}")
+            logger.warning(f"Slot is already booked, slot: {slot}")
+            booking_admission.mark_taken(slot.id)
             raise HTTPException(
-                400, f"Unable to book appointment between {slot.start_time} and {slot.end_time}, slot with id {slot.id} is already booked"
+                409, f"Unable to book appointment between {slot.start_time} and {slot.end_time}, slot with id {slot.id} is already booked"
             )
 
+        if self.check_slot_time_not_in_past(slot):
+            raise HTTPException(400, "Slot Start time is in the past")
+
+        logger.error(f"No patient record found for user {user_id}")
+        raise HTTPException(404, f"No patient record found for user {user_id}")
+
     def check_slot_time_not_in_past(self, slot):
         '''function that checks and converts slot timezone for comparision 
         and returns true if the slot time is in the past'''
@@ -130,22 +162,19 @@ class AppointmentServices(BasicServices):
         if slot_start_time < current_time:
             return True
         
-    def cancel_patient_appointment(self, token, appointment_id):
+    def cancel_patient_appointment(self, principal, appointment_id, options=()):
         '''canceles the appointment and updates the appointment slot to avaialble
         if the appointment slot was in the future
         '''
         logger.info(f"cancel_patient_appointment method called")
 
         try:
-            payload = get_payload(token)
-            logger.debug(f"payload received: {payload}")
+            logger.debug(f"principal received: {principal}")
             
-            user_id = payload.get('user_id')
-            # role = payload.get('role')
-            uuid_user_id = uuid.UUID(user_id) 
+            uuid_user_id = principal.user_id
 
             user = super().get_record_by_model_id(User, uuid_user_id)
-            appointment = super().get_record_by_id(appointment_id)
+            appointment = super().get_record_by_id(appointment_id, options)
 
             if not user.patient.id == appointment.patient_id:
                 logger.error(f"Patient trying to cancel other patient's appointments")
@@ -166,7 +195,9 @@ class AppointmentServices(BasicServices):
 
             appointment = super().records_modified(appointment, uuid_user_id)
             slot = super().records_modified(appointment.slot, uuid_user_id)
-            
+            booking_admission.mark_free(slot.id)
+            availability_cache.invalidate(slot.doctor_id, slot.start_time)
+
             return appointment
 
         except HTTPException:
@@ -175,17 +206,15 @@ class AppointmentServices(BasicServices):
             logger.error(f"Error during canceling patient appointment {e}")
             raise HTTPException(f"Error during canceling patient appointment")
 
-    def fetch_user_appointments_history(self, token, filters, sort_by, sort_order, page, limit, allowed_fields, search=None):
-        '''fetches past records of appointment based on the user_id stored in the token and then applies
+    def fetch_user_appointments_history(self, principal, filters, sort_by, sort_order, page, limit, allowed_fields, search=None, cursor=None, count=None, options=()):
+        '''fetches past records of appointment based on the user_id of the logged in principal and then applies
         filter and pagination '''
         logger.info(f"fetch_user_appointments_history method started")
         
-        payload = get_payload(token)
-        logger.debug(f"payload received: {payload}")
+        logger.debug(f"principal received: {principal}")
         
-        user_id = payload.get('user_id')
-        role = payload.get('role')
-        uuid_user_id = uuid.UUID(user_id) 
+        role = principal.role
+        uuid_user_id = principal.user_id
 
         current_time = datetime.now(ist_timezone)
         logger.debug(f"current_time: {current_time}")
@@ -193,39 +222,37 @@ class AppointmentServices(BasicServices):
         records = self.db.query(self.model)
 
         if role == "doctor":
-            records = records.join(Doctor).join(DoctorSlot).filter(
+            records = records.join(Doctor).filter(
                 and_(
                     Doctor.user_id == uuid_user_id,
-                    DoctorSlot.start_time < current_time
+                    Appointment.slot_start_time < current_time
                 )
             )
             logger.info(f"appointments fetched from the database for role: {role}")
 
         if role == "patient":
-            records = records.join(Patient).join(DoctorSlot).filter(
+            records = records.join(Patient).filter(
                 and_(
                     Patient.user_id == uuid_user_id,
-                    DoctorSlot.start_time <= current_time
+                    Appointment.slot_start_time <= current_time
                 )
             )
             logger.info(f"appointments fetched from the database for role: {role}")
 
         obj = FilterPaginationService(self.model, allowed_fields, self.db)
-        records, total_records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records)
+        records, page_info = obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, cursor=cursor, count=count, options=options)
 
-        return records, total_records
+        return records, page_info
 
 
-    def fetch_user_appointments_upcoming(self, token, filters, sort_by, sort_order, page, limit, allowed_fields, search=None):
+    def fetch_user_appointments_upcoming(self, principal, filters, sort_by, sort_order, page, limit, allowed_fields, search=None, cursor=None, count=None, options=()):
         '''fetches appointmetns for the logged in user and applies filter and pagination'''
         logger.info(F"fetch_user_appointments_upcoming method started")
         
-        payload = get_payload(token)
-        logger.debug(f"payload received: {payload}")
+        logger.debug(f"principal received: {principal}")
         
-        user_id = payload.get('user_id')
-        role = payload.get('role')
-        uuid_user_id = uuid.UUID(user_id) 
+        role = principal.role
+        uuid_user_id = principal.user_id
 
         current_time = datetime.now(ist_timezone)
         logger.debug(f"current_time: {current_time}")
@@ -233,32 +260,30 @@ class AppointmentServices(BasicServices):
         records = self.db.query(self.model)
 
         if role == "doctor":
-            records =records.join(Doctor).join(DoctorSlot).filter(
+            records =records.join(Doctor).filter(
                 and_(
                     Doctor.user_id == uuid_user_id,
-                    DoctorSlot.start_time > current_time
+                    Appointment.slot_start_time > current_time
                 )
             )
             logger.info(f"appointments fetched from the database for role: {role}")
 
         obj = FilterPaginationService(self.model, allowed_fields, self.db)
-        records, total_records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records)
+        records, page_info = obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, cursor=cursor, count=count, options=options)
 
-        return records, total_records
+        return records, page_info
         
-    def update_user_appointment_status(self, token, appointment_id, status):
+    def update_user_appointment_status(self, principal, appointment_id, status, options=()):
         '''checks the status of the appointment if already cancelled, raises exception
         if status is set to completed but the time slot is in the future raises exception
         Requires: appointment_id: UUID and status:str'''
         logger.info(f"update_user_appointment_status method started")
 
-        payload = get_payload(token)
-        logger.debug(f"payload received: {payload}")
+        logger.debug(f"principal received: {principal}")
         
-        user_id = payload.get('user_id')
-        uuid_user_id = uuid.UUID(user_id) 
+        uuid_user_id = principal.user_id
 
-        appointment = super().get_record_by_id(appointment_id)
+        appointment = super().get_record_by_id(appointment_id, options)
         logger.debug(f"appointment: {appointment}")
 
         if appointment.status == "cancelled":
@@ -282,20 +307,26 @@ class AppointmentServices(BasicServices):
         appointment = super().records_modified(appointment, uuid_user_id)
         logger.info(f"Changes updated in the database")
 
+        if not appointment.slot.is_booked:
+            booking_admission.mark_free(appointment.slot_id)
+            availability_cache.invalidate(appointment.doctor_id, appointment.slot.start_time)
+
         return appointment
 
-    def fetch_all_appointments(self, filters, sort_by, sort_order, page, limit, allowed_fields, search):
+    def fetch_all_appointments(self, filters, sort_by, sort_order, page, limit, allowed_fields, search, cursor=None, count=None, options=()):
         '''fetches all appointments and applies filter and pagination'''
         logger.info(f"fetch_all_appointments method called")
 
         records = None
         search_filters = None
+        rank = None
         if search:
             logger.debug(f"Search term provided: '{search.strip()}'")
             records, search_filters = super().search_record(search.strip())
+            rank = super().search_rank(search.strip())
 
         obj = FilterPaginationService(self.model, allowed_fields, self.db)
-        records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, search_filters)
+        records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, search_filters, cursor, count, options, rank)
         logger.info(f"Records fetched for {self.model.__name__}")
         return records
     
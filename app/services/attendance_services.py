@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.token import Token
 from app.models.users import User
 from app.models.attendance import Attendance
-from app.utils.helper import get_payload
 from datetime import timedelta, datetime, timezone
 from app.utils.logging import Logging
 from app.services.basic_services import BasicServices
@@ -24,14 +23,11 @@ class AttendanceServices(BasicServices):
         super().__init__(db, model)
 
 
-    def generate_user_attendance(self, token):
+    def generate_user_attendance(self, principal):
         '''add attendance time_in record to the database'''
         logger.info(f"generate_user_attendance method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        uuid_user_id = uuid.UUID(user_id)
+        logger.debug(f"principal received: {principal}")
+        uuid_user_id = principal.user_id
 
         current_date = datetime.now(ist_timezone).date()
         attendance = self.db.query(self.model).filter(and_(
@@ -51,15 +47,12 @@ class AttendanceServices(BasicServices):
 
         return record
 
-    def update_user_timeout(self, token):
-        '''fetches the attendance record of logged in user using token and updates the time_out if 
+    def update_user_timeout(self, principal):
+        '''fetches the attendance record of logged in user using principal and updates the time_out if 
         found none else raises exception'''
         logger.info(f"update_user_timeout method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        uuid_user_id = uuid.UUID(user_id)
+        logger.debug(f"principal received: {principal}")
+        uuid_user_id = principal.user_id
         
         current_time = datetime.now(ist_timezone)
         attendance = self.db.query(self.model).filter(and_(
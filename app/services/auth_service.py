@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.token import Token
 from app.models.users import User
-from app.utils.helper import verify_password, create_token, get_payload
+from app.utils.helper import create_token, get_payload
+from app.utils.password_pool import password_pool
 from datetime import timedelta
 from app.config.config import ACCESS_TOKEN_EXPIRY_MINUTES, REFRESH_TOKEN_EXPIRY_DAYS
 from app.utils.logging import Logging
 from app.services.basic_services import BasicServices
+from sqlalchemy import select
 # from app.exceptions.basic_exceptions import *
 # from app.exceptions.base import AppException
 import uuid
@@ -15,35 +17,36 @@ logger = Logging(__name__).get_logger()
 class AuthServices(BasicServices):
     '''
     authorization services available, such as authenticate user, generate tokens, refresh tokens
+    requires AsyncSession
     '''
     def __init__(self, db, model=None):
         super().__init__(db, model)
 
-    def user_login(self, form_data):
+    async def user_login(self, form_data):
         '''
         validates username and password and create tokens for user
         returns: tokens details in pydantic model.
         '''
         
-        user = self.validate_login_credentials(form_data)
-        record = self.create_tokens(user)
+        user = await self.validate_login_credentials(form_data)
+        record = await self.create_tokens(user)
         return record
 
-    def validate_login_credentials(self, form_data):
+    async def validate_login_credentials(self, form_data):
         
         '''validates username and password and if validated, returns the user object'''
 
         logger.info(f"Attempting login for user: {form_data.username}")
-        user = self.db.query(User).filter(User.username == form_data.username).first()
+        user = (await self.db.scalars(select(User).filter(User.username == form_data.username))).first()
 
-        #Uses utility function to verify entered password and stored bcypt password
-        if user is None or not verify_password(form_data.password, user.hashed_password):
+        #Verifies entered password and stored bcypt password on password pool, off the event loop
+        if user is None or not await password_pool.verify(form_data.password, user.hashed_password):
             logger.warning(f"Invalid login attempt for username: {form_data.username}")
             raise HTTPException(401, f"Invalid login attempt for username: {form_data.username}")
 
         return user
         
-    def create_tokens(self, user):
+    async def create_tokens(self, user):
 
         '''
         Creates user access and refresh token, And saves refresh token in database
@@ -67,7 +70,7 @@ class AuthServices(BasicServices):
             logger.info(f"Token generated successfully for user: {user.username}")
 
             user.refresh_token = refresh_token
-            user = super().records_modified(user, user.id)
+            user = await super().records_modified_async(user, user.id)
             logger.info(f"Refresh token stored in database")
             
             return Token(
@@ -81,7 +84,7 @@ class AuthServices(BasicServices):
             logger.exception(f"Unexpected error during token generation for user: {user.username}: {e}")
             raise HTTPException(500, f"Unexpected error during token generation for user: {user.username}")
 
-    def validate_refresh_token(self, token):
+    async def validate_refresh_token(self, token):
         '''
         Verifies that refresh token is passed in auth header,
         fetches user based on user_id from token, 
@@ -102,7 +105,7 @@ class AuthServices(BasicServices):
                 raise HTTPException()
 
             logger.info(f"Fetching user by user_id of payload")
-            user = super().get_record_by_id(uuid_user_id)
+            user = await super().get_record_by_id_async(uuid_user_id)
 
             logger.info(f"User fetched based on user_id in token")
 
@@ -116,22 +119,22 @@ class AuthServices(BasicServices):
         except Exception as e:
             raise HTTPException()
 
-    def refresh_user_token(self, token):
+    async def refresh_user_token(self, token):
         '''validates refresh token and generates new access and refresh token for user, returns tokens in pydantic model'''
-        user = self.validate_refresh_token(token)
-        record = self.create_tokens(user)
+        user = await self.validate_refresh_token(token)
+        record = await self.create_tokens(user)
         return record
 
-    def revoke_user_tokens(self, token):
+    async def revoke_user_tokens(self, token):
         '''
         validates refresh token and removes refresh_token from database to invalid it
         if refresh_token not found in db it means it is invalidated.
         '''
         try:
-            user = self.validate_refresh_token(token)
+            user = await self.validate_refresh_token(token)
 
             user.refresh_token = None
-            self.db.commit()
+            await self.db.commit()
             logger.info(f"Refresh token invalidated")
 
             return {'message': "Logout successful"}
@@ -139,5 +142,5 @@ class AuthServices(BasicServices):
         except HTTPException:
             raise
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(500, "Some error occured")
\ No newline at end of file
@@ -3,6 +3,7 @@ from fastapi import HTTPException
 from app.utils.logging import Logging
 from app.models.base_model import BaseModel as Base_Model
 from app.services.search_service import SearchService
+from sqlalchemy import select, bindparam
 from uuid import UUID
 from datetime import datetime
 import pytz
@@ -11,6 +12,17 @@ ist_timezone = pytz.timezone('Asia/Kolkata')
 
 logger = Logging(__name__).get_logger()
 
+#(model, loader options) -> select by id statement with the id as bound parameter, built once and reused
+record_statements = {}
+
+def get_record_statement(model, options):
+    key = (model, options)
+    statement = record_statements.get(key)
+    if statement is None:
+        statement = select(model).options(*options).where(model.id == bindparam("record_id"))
+        record_statements[key] = statement
+    return statement
+
 class BasicServices(SearchService):
     def __init__(self, db, model):
         self.db = db
@@ -47,10 +59,25 @@ class BasicServices(SearchService):
             logger.exception(f"Unexpected error while adding records: {e}")
             raise HTTPException(500, f"Error while adding records to database")
 
-    def get_record_by_id(self, request_id: UUID):
-        '''fetches record by request_id and if record not found, raises not found exception'''
+    def get_record_by_id(self, request_id: UUID, options=()):
+        '''
+        fetches record by request_id and if record not found, raises not found exception
+        options are loader options for the query, eg. a profile from app.config.loading_profiles
+        '''
+        logger.debug(f"Fetching {self.model.__name__} with ID {request_id}")
+        statement = get_record_statement(self.model, tuple(options))
+        record = self.db.scalars(statement, {"record_id": request_id}).unique().first()
+        if not record:
+            logger.error(f"{self.model.__name__} ID {request_id} not found")
+            raise HTTPException(404, f"{self.model.__name__} ID {request_id} not found")
+        logger.debug(f"{self.model.__name__} with ID {request_id} fetched successfully")
+        return record
+
+    async def get_record_by_id_async(self, request_id: UUID, options=()):
+        '''async version of get_record_by_id for AsyncSession, options are loader options for the query'''
         logger.debug(f"Fetching {self.model.__name__} with ID {request_id}")
-        record = self.db.query(self.model).filter(self.model.id == request_id).first()
+        statement = get_record_statement(self.model, tuple(options))
+        record = (await self.db.scalars(statement, {"record_id": request_id})).unique().first()
         if not record:
             logger.error(f"{self.model.__name__} ID {request_id} not found")
             raise HTTPException(404, f"{self.model.__name__} ID {request_id} not found")
@@ -122,4 +149,18 @@ class BasicServices(SearchService):
         except Exception as e:
             self.db.rollback()
             logger.exception(f"Error modifying {self.model.__name__} record: {e}")
-            raise HTTPException(500, f"Database Error during modifying {self.model.__name__} record: {e}")
\ No newline at end of file
+            raise HTTPException(500, f"Database Error during modifying {self.model.__name__} record: {e}")
+
+    async def records_modified_async(self, record, user_id):
+        '''async version of records_modified for AsyncSession'''
+        try:
+            logger.debug(f"Modifying record of {self.model.__name__} by user {user_id}")
+            record.modified_at = datetime.now(ist_timezone)
+            record.modified_by = user_id
+            await self.db.commit()
+            logger.info(f"Record in {self.model.__name__} modified by user {user_id}")
+            return record
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(f"Error modifying {self.model.__name__} record: {e}")
+            raise HTTPException(500, f"Database Error during modifying {self.model.__name__} record: {e}")
@@ -2,12 +2,14 @@
 from fastapi import HTTPException
 from app.services.basic_services import BasicServices
 from app.services.filter_pagination_services import FilterPaginationService
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 from pydantic import BaseModel
 from app.schemas.user import UserCreateDBSchema
 from app.schemas.filters import DateFilterSchema
 from app.models.doctor import Doctor
 from app.models.doctor_slots import DoctorSlot
+from app.services.doctor_slots_services import DoctorSlotServices
+from app.config.config import SLOT_GENERATION_DAYS
 from app.utils.logging import Logging
 from datetime import timedelta, datetime
 from app.utils.helper import get_payload
@@ -50,41 +52,20 @@ class DoctorServices(BasicServices):
         
         return new_user
 
-    def create_doctor_available_slots(self, doctor, slot_start_time=10, slot_end_time=18):
+    def create_doctor_available_slots(self, doctor):
         '''
-        generates doctor available slots for 5 days from date of registration
+        generates doctor available slots for SLOT_GENERATION_DAYS days from date of registration
+        with the slot expander, new doctors use the default schedule until they set a template
         '''
-        current_day = datetime.now(ist_timezone).replace(minute=0, second=0)
-        end_day = current_day+timedelta(days=5)
-        start_day = current_day
-        slots = []
-
         logger.info(f"Attempting to create slots for doctor")
-        while start_day<=end_day:
-            slot_start = start_day.replace(hour=slot_start_time)
-            last_slot = start_day.replace(hour=slot_end_time-1)
-            current_time = datetime.now(ist_timezone)
-            while slot_start <= last_slot:
-                if slot_start < current_time:
-                    slot_start+=timedelta(hours=1)
-                    continue
-                slot_end = slot_start+timedelta(hours=1)
-                slot = DoctorSlot(
-                    doctor_id=doctor.id,
-                    start_time=slot_start,
-                    end_time=slot_end
-                )
-                logger.debug(f"Slot created: {slot}")
-                slots.append(slot)
-                slot_start+=timedelta(hours=1)
-            start_day+=timedelta(days=1)
-
-        super().add_records(slots)
-        return slots
+        first_day = datetime.now(ist_timezone).date()
+        obj = DoctorSlotServices(self.db, DoctorSlot)
+        return obj.generate_slots(first_day, first_day + timedelta(days=SLOT_GENERATION_DAYS), doctor_id=doctor.id)
     
-    def fetch_doctors(self, filters, sort_by, sort_order, page, limit, allowed_fields, search):
+    async def fetch_doctors(self, filters, sort_by, sort_order, page, limit, allowed_fields, search, options=(), cursor=None, count=None):
         '''
         fetches all records for doctor model and implements search and filtering based on filter parameters
+        requires AsyncSession, options are loader options for relationships used in the response
         '''
         logger.info(f"fetch_doctors method called")
         
@@ -92,14 +73,16 @@ class DoctorServices(BasicServices):
         #     logger.error(f"role does not match with 'patient', role: {role}")
         #     raise HTTPException(401, "Only 'patients' can access this method")
 
-        records = None
+        records = select(self.model)
         search_filters = None
+        rank = None
         if search:
             logger.debug(f"Search term provided: '{search.strip()}'")
-            records, search_filters = super().search_record(search.strip())
+            records, search_filters = super().search_record(search.strip(), records)
+            rank = super().search_rank(search.strip())
 
         obj = FilterPaginationService(self.model, allowed_fields, self.db)
-        records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, search_filters)
+        records= await obj.apply_filter_pagination_async(filters, sort_by, sort_order, page, limit, records, search_filters, cursor, count, options, rank)
         logger.info(f"Records fetched for {self.model.__name__}")
         return records
 
@@ -1,16 +1,27 @@
 
 from fastapi import HTTPException
-from sqlalchemy import and_
+from sqlalchemy import and_, delete, exists, select, text
 from app.models.doctor_slots import DoctorSlot
 from app.models.doctor import Doctor
+from app.models.doctor_schedule import DoctorScheduleTemplate
+from app.models.appointments import Appointment
 from app.services.basic_services import BasicServices
 from app.schemas.filters import DateFilterSchema
 from app.utils.logging import Logging
-from app.utils.helper import get_payload
+from app.utils.booking_admission import booking_admission
+from app.utils.availability_cache import availability_cache
+from app.schemas.doctor_slots import AvailableSlotResponseSchema
+from app.config.config import (
+    AVAILABILITY_DEFAULT_DAYS, AVAILABILITY_MAX_DAYS, DEFAULT_SCHEDULE_START,
+    DEFAULT_SCHEDULE_END, DEFAULT_SLOT_MINUTES, SLOT_GENERATION_DAYS
+)
 import uuid
-from datetime import datetime
+import pytz
+from datetime import datetime, time, timedelta
 
 
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
 logger = Logging(__name__).get_logger()
 
 class DoctorSlotServices(BasicServices):
@@ -18,43 +29,44 @@ class DoctorSlotServices(BasicServices):
         super().__init__(db, model)
 
 
-    def get_doctor_available_slots(self, token):
+    async def get_doctor_available_slots(self, principal):
         '''
         returns the doctor_slot records for the logged in user if slot is available
+        requires AsyncSession
         '''
         logger.info(f"get_current_patient method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        role = payload.get('role')
+        logger.debug(f"principal received: {principal}")
+        user_id = principal.user_id
+        role = principal.role
         
         if role != 'doctor':
             logger.error(f"role does not match with 'doctor', role: {role}")
             raise HTTPException(401, "Only 'doctors' can access this method")
 
-        slots = self.db.query(DoctorSlot).join(Doctor).filter(
+        slots = (await self.db.scalars(self.available_slots_statement(user_id))).all()
+
+        return slots
+
+    def available_slots_statement(self, user_id):
+        '''returns select() of unbooked slots of the doctor with user_id'''
+        return select(DoctorSlot).join(Doctor).filter(
             and_(
                 Doctor.user_id==user_id,
                 DoctorSlot.is_booked==False
             )
-        ).all()
+        )
 
-        return slots
-
-    def update_doctor_slot(self, token, slot_id, slot_update):
+    def update_doctor_slot(self, principal, slot_id, slot_update):
         '''
         updates the slot object, used in slot booking adds status and notes to slot
         validates that user is updating his own slots only
         returns: updated slot record
         '''
         logger.info(f"update_doctor_slot method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        role = payload.get('role')
-        uuid_user_id = uuid.UUID(user_id)
+        logger.debug(f"principal received: {principal}")
+        user_id = principal.user_id
+        role = principal.role
+        uuid_user_id = principal.user_id
         
         if role != 'doctor':
             logger.error(f"role does not match with 'doctor', role: {role}")
@@ -66,42 +78,199 @@ class DoctorSlotServices(BasicServices):
             logger.error(f"unable to update another doctor's slot, user_id: {user_id}, slot.doctor.user_id: {slot.doctor.user_id}")
             raise HTTPException(401, "Doctor can update their own slots only")
 
-        logger.debug(f"Attempting to update doctor slot, parameter: token:{token}, slot_update: {slot_update}")
+        logger.debug(f"Attempting to update doctor slot, parameter: principal:{principal}, slot_update: {slot_update}")
         for field, value in slot_update.model_dump(exclude_unset=True).items():
             logger.debug(f"field: {field}, value: {value}")
             setattr(slot, field, value)
 
         slot = super().records_modified(slot, uuid_user_id)
+        if slot.is_booked:
+            booking_admission.mark_taken(slot.id)
+        else:
+            booking_admission.mark_free(slot.id)
+        availability_cache.invalidate(slot.doctor_id, slot.start_time)
 
         logger.info(f"Doctor slot updated in database.")
         logger.debug(f" Slot: {slot}")
         return slot
 
-    def fetch_doctor_available_slots(self, token, doctor_id, date_filter:DateFilterSchema):
+    async def fetch_doctor_available_slots(self, token, doctor_id, date_filter:DateFilterSchema):
         '''
-        fetches specified doctor available slots and applies filtering 
-        based on daterange filter parameters
-        returns: list of doctor_slot objects
+        returns unbooked future slots of specified doctor within the date range filter parameters,
+        without end_date AVAILABILITY_DEFAULT_DAYS are returned. slots are served from the per day
+        availability cache, only days missing from the cache are queried, requires AsyncSession
+        returns: list of AvailableSlotResponseSchema
         '''
 
         logger.info(f"fetch_doctor_available_slots method called")
 
-        records = self.db.query(self.model)
-        filters = []
-        filter_field = getattr(self.model, 'doctor_id')
-        filters.append(filter_field == doctor_id)
+        current_time = datetime.now(ist_timezone)
+        start_time = max(self.localize(date_filter.start_date), current_time) if date_filter.start_date else current_time
+        end_time = self.localize(date_filter.end_date) if date_filter.end_date else start_time + timedelta(days=AVAILABILITY_DEFAULT_DAYS)
+
+        if end_time <= start_time:
+            return []
+
+        first_day = availability_cache.day_of(start_time)
+        total_days = (availability_cache.day_of(end_time) - first_day).days + 1
+        if total_days > AVAILABILITY_MAX_DAYS:
+            raise HTTPException(400, f"date range can not be longer than {AVAILABILITY_MAX_DAYS} days")
+        days = [first_day + timedelta(days=day) for day in range(total_days)]
+
+        slots_by_day, missing_days = availability_cache.get_days(doctor_id, days)
+        if missing_days:
+            slots_by_day.update(await self.load_doctor_slot_days(doctor_id, missing_days))
+
+        records = [
+            slot for day in days for slot in slots_by_day[day]
+            if not slot.is_booked and slot.start_time >= start_time and slot.end_time <= end_time
+        ]
+        logger.debug(f"records: {records}, days from cache: {len(days) - len(missing_days)}/{len(days)}")
+        return records
+
+    async def load_doctor_slot_days(self, doctor_id, days):
+        '''
+        loads all slots of doctor from first to last of days in one query and caches them per day
+        returns: {day: list of AvailableSlotResponseSchema}
+        '''
+        records = (await self.db.scalars(self.slot_days_statement(doctor_id, days))).all()
+
+        slots_by_day = {day: [] for day in days}
+        for record in records:
+            day = availability_cache.day_of(record.start_time)
+            if day in slots_by_day:
+                slots_by_day[day].append(AvailableSlotResponseSchema.model_validate(record))
+
+        for day, slots in slots_by_day.items():
+            availability_cache.set_day(doctor_id, day, slots)
+        return slots_by_day
+
+    def slot_days_statement(self, doctor_id, days):
+        '''returns select() of all slots of doctor from the first to the last of days, IST days'''
+        range_start = ist_timezone.localize(datetime.combine(min(days), time.min))
+        range_end = ist_timezone.localize(datetime.combine(max(days) + timedelta(days=1), time.min))
 
-        if date_filter.start_date:
-            start_time:datetime = date_filter.start_date
-            start_filter_field = getattr(self.model, 'start_time')
-            filters.append(start_filter_field >= start_time)
+        return (
+            select(self.model)
+            .filter(
+                self.model.doctor_id == doctor_id,
+                self.model.start_time >= range_start,
+                self.model.start_time < range_end
+            )
+            .order_by(self.model.start_time)
+        )
+
+    def generate_slots(self, first_day, last_day, doctor_id=None):
+        '''
+        expands the weekly schedule templates into slots for every day from first_day to last_day for all doctors,
+        or only doctor_id, in one set based statement. doctors without template get the default schedule.
+        existing slots are skipped by ON CONFLICT on (doctor_id, start_time) and slots starting in the past are not created.
+        days are a timestamp series without time zone, so day + start_time is IST wall clock time and
+        AT TIME ZONE turns it into the instant whatever the session time zone is
+        returns: number of inserted slots
+        '''
+        logger.info(f"generate_slots method called, days: {first_day} - {last_day}, doctor_id: {doctor_id}")
+
+        statement = text("""
+            WITH template AS (
+                SELECT doctor_id, weekday, start_time, end_time, slot_minutes
+                FROM doctor_schedule_templates
+                WHERE CAST(:doctor_id AS uuid) IS NULL OR doctor_id = CAST(:doctor_id AS uuid)
+                UNION ALL
+                SELECT doctors.id, weekday, CAST(:default_start AS time), CAST(:default_end AS time), :default_slot_minutes
+                FROM doctors
+                CROSS JOIN generate_series(0, 6) AS weekday
+                WHERE (CAST(:doctor_id AS uuid) IS NULL OR doctors.id = CAST(:doctor_id AS uuid))
+                AND NOT EXISTS (SELECT 1 FROM doctor_schedule_templates WHERE doctor_schedule_templates.doctor_id = doctors.id)
+            )
+            INSERT INTO doctor_slots (id, doctor_id, start_time, end_time, is_booked, created_at, modified_at)
+            SELECT gen_random_uuid(), template.doctor_id, slot.start_time,
+                slot.start_time + template.slot_minutes * interval '1 minute', false, now(), now()
+            FROM generate_series(CAST(:first_day AS timestamp), CAST(:last_day AS timestamp), interval '1 day') AS day
+            JOIN template ON template.weekday = extract(isodow FROM day) - 1
+            CROSS JOIN LATERAL generate_series(
+                day + template.start_time,
+                day + template.end_time - template.slot_minutes * interval '1 minute',
+                template.slot_minutes * interval '1 minute'
+            ) AS local_start
+            CROSS JOIN LATERAL (SELECT local_start AT TIME ZONE 'Asia/Kolkata' AS start_time) AS slot
+            WHERE slot.start_time > now()
+            ON CONFLICT (doctor_id, start_time) DO NOTHING
+        """)
+
+        result = self.db.execute(statement, {
+            "first_day": first_day,
+            "last_day": last_day,
+            "doctor_id": str(doctor_id) if doctor_id else None,
+            "default_start": DEFAULT_SCHEDULE_START,
+            "default_end": DEFAULT_SCHEDULE_END,
+            "default_slot_minutes": DEFAULT_SLOT_MINUTES,
+        })
+        self.db.commit()
+
+        logger.info(f"{result.rowcount} slots generated")
+        return result.rowcount
+
+    def get_doctor_schedule(self, principal):
+        '''returns schedule template windows of the logged in doctor, empty if the default schedule is used'''
+        logger.info(f"get_doctor_schedule method called")
+        doctor = self.get_principal_doctor(principal)
 
-        if date_filter.end_date:
-            end_time:datetime = date_filter.end_date
-            end_filter_field = getattr(self.model, 'end_time')
-            filters.append(end_filter_field <= end_time)
+        return self.db.query(DoctorScheduleTemplate).filter(
+            DoctorScheduleTemplate.doctor_id == doctor.id
+        ).order_by(DoctorScheduleTemplate.weekday, DoctorScheduleTemplate.start_time).all()
+
+    def replace_doctor_schedule(self, principal, schedule):
+        '''
+        replaces the schedule template of the logged in doctor, an empty schedule switches back to the default schedule.
+        future unbooked slots without appointments are removed and generated again from the new schedule
+        returns: new schedule windows
+        '''
+        logger.info(f"replace_doctor_schedule method called")
+        doctor = self.get_principal_doctor(principal)
+        current_time = datetime.now(ist_timezone)
+
+        try:
+            self.db.query(DoctorScheduleTemplate).filter(DoctorScheduleTemplate.doctor_id == doctor.id).delete()
+            windows = [
+                DoctorScheduleTemplate(doctor_id=doctor.id, modified_by=principal.user_id, **window.model_dump())
+                for window in schedule.windows
+            ]
+            self.db.add_all(windows)
+
+            self.db.execute(delete(DoctorSlot).where(
+                DoctorSlot.doctor_id == doctor.id,
+                DoctorSlot.start_time > current_time,
+                DoctorSlot.is_booked == False,
+                ~exists().where(Appointment.slot_id == DoctorSlot.id)
+            ))
+            self.db.flush()
+        except Exception as e:
+            self.db.rollback()
+            logger.exception(f"Error replacing doctor schedule: {e}")
+            raise HTTPException(500, f"Error replacing doctor schedule")
+
+        first_day = current_time.date()
+        last_day = first_day + timedelta(days=SLOT_GENERATION_DAYS)
+        self.generate_slots(first_day, last_day, doctor_id=doctor.id)
+        availability_cache.invalidate_days(doctor.id, [first_day + timedelta(days=day) for day in range(SLOT_GENERATION_DAYS + 1)])
+
+        logger.info(f"Schedule replaced for doctor {doctor.id}, windows: {len(windows)}")
+        return windows
+
+    def get_principal_doctor(self, principal):
+        '''returns doctor record of the logged in user'''
+        if principal.role != 'doctor':
+            logger.error(f"role does not match with 'doctor', role: {principal.role}")
+            raise HTTPException(401, "Only 'doctors' can access this method")
 
+        doctor = self.db.query(Doctor).filter(Doctor.user_id == principal.user_id).first()
+        if not doctor:
+            raise HTTPException(404, f"Doctor profile not found for user {principal.user_id}")
+        return doctor
 
-        records = records.filter(and_(*filters)).all()
-        logger.debug(f"records: {records}")
-        return records
\ No newline at end of file
+    def localize(self, value):
+        '''naive datetimes from query parameters are taken as IST'''
+        if value.tzinfo is None:
+            return ist_timezone.localize(value)
+        return value
@@ -1,66 +1,241 @@
-from app.schemas.filter_pagination import OPERATOR_MAP
+from app.schemas.filter_pagination import OPERATOR_MAP, PageInfo
 from app.utils.logging import Logging
+from app.utils.cache import LRUCache
+from app.config.config import COUNT_CACHE_SIZE, COUNT_CACHE_TTL_SECONDS, FILTER_SPEC_CACHE_SIZE
+from app.config.sort_parameters import null_sort_values
 from fastapi import HTTPException
-from sqlalchemy import or_
+from sqlalchemy import or_, select, func, tuple_
+from sqlalchemy.orm import Query
+from datetime import datetime
+import base64
+import binascii
+import json
+import uuid
 # from app.exceptions.filter_pagination_exceptions import *
 # from app.exceptions.base import AppException
 
 logger = Logging(__name__).get_logger()
 
+COUNT_MODES = ["exact", "estimate", "none"]
+
+#total_records of recently counted queries, served for count mode 'estimate'
+count_cache = LRUCache(max_size=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL_SECONDS)
+
+#parsed filters strings, see FilterPaginationService.parse_filters
+filter_spec_cache = LRUCache(max_size=FILTER_SPEC_CACHE_SIZE)
+
 class FilterPaginationService:
     def __init__(self, model, allowed_fields, db):
         self.model = model
         self.allowed_fields = allowed_fields
         self.db = db
 
-    def apply_filter_pagination(self, filters, sort_by, sort_order, page, limit, records, search_filters=None):
+    #page rows and total are fetched together with COUNT(*) OVER () when an exact count is needed
+    window_count = True
+
+    def apply_filter_pagination(self, filters, sort_by, sort_order, page, limit, records, search_filters=None, cursor=None, count=None, options=(), rank=None):
+        '''
+        applies filters, sorting and pagination, cursor (next_cursor of previous page) is used in place of page
+        count is 'exact', 'estimate' or 'none', by default exact on first page and estimate on later pages
+        options are loader options applied to the page records
+        rank is the search relevance, records are sorted by it when no sort_by and cursor is given
+        returns: records of the page and PageInfo
+        '''
         logger.info("Starting filter and pagination process")
-        self.verify_filters(filters, sort_by, sort_order, page, limit)
+        self.verify_filters(filters, sort_by, sort_order, page, limit, count)
 
         if not records:
             records = self.db.query(self.model)
 
-        records = self.apply_filter(filters, records, search_filters)
-        records = records.distinct()
-        logger.info(f"Filters applied successfully")
-        records = self.apply_sorting(sort_by, sort_order, records)
-        logger.info(f"Sorting applied successfully")
+        ids = self.build_query(filters, records, search_filters)
 
-        offset = (page - 1) * limit
-        
-        total_records = records.count()
-        paginated_records = records.offset(offset).limit(limit).all()
+        count_mode = self.get_count_mode(count, page, cursor)
+        total_records, count_mode = self.get_cached_count(ids, count_mode)
+        with_total = self.use_window_count(total_records, count_mode, cursor)
+        if total_records is None and count_mode == "exact" and not with_total:
+            total_records = self.db.scalar(self.count_query(ids))
+            self.set_cached_count(ids, total_records)
 
-        logger.debug(f"Filtered {total_records} total records, returning page {page} with limit {limit}")
-        return paginated_records, total_records
+        rank = self.get_rank(rank, sort_by, cursor)
+        page_query = self.build_page_query(ids, sort_by, sort_order, page, limit, cursor, options, with_total, rank)
+        if with_total:
+            rows = self.db.execute(page_query).unique().all()
+            paginated_records, total_records = self.split_window_rows(rows)
+            if not paginated_records and page > 1:
+                # page is past the last record, no row carries the total
+                total_records = self.db.scalar(self.count_query(ids))
+            self.set_cached_count(ids, total_records)
+        else:
+            paginated_records = self.db.scalars(page_query).unique().all()
 
-    def apply_filter(self, filters, records, search_filters):
-        if filters is None:
-            if search_filters:
-                records = records.filter(or_(*search_filters))
-            return records
+        logger.debug(f"Filtered {total_records} total records ({count_mode}), returning page {page} with limit {limit}, cursor: {cursor}")
+        return self.build_page(paginated_records, sort_by, sort_order, limit, total_records, count_mode, rank is not None)
 
-        try:
-            filters = filters.split(",")
-            for filter in filters:
-                field, condition, value = filter.split("-")
-                field, value = field.strip(), value.strip()
-                filter_field = getattr(self.model, field, None)
+    async def apply_filter_pagination_async(self, filters, sort_by, sort_order, page, limit, records=None, search_filters=None, cursor=None, count=None, options=(), rank=None):
+        '''
+        same as apply_filter_pagination for AsyncSession
+        records has to be a select() statement, defaults to select(self.model)
+        '''
+        logger.info("Starting async filter and pagination process")
+        self.verify_filters(filters, sort_by, sort_order, page, limit, count)
+
+        if records is None:
+            records = select(self.model)
+
+        ids = self.build_query(filters, records, search_filters)
+
+        count_mode = self.get_count_mode(count, page, cursor)
+        total_records, count_mode = self.get_cached_count(ids, count_mode)
+        with_total = self.use_window_count(total_records, count_mode, cursor)
+        if total_records is None and count_mode == "exact" and not with_total:
+            total_records = await self.db.scalar(self.count_query(ids))
+            self.set_cached_count(ids, total_records)
+
+        rank = self.get_rank(rank, sort_by, cursor)
+        page_query = self.build_page_query(ids, sort_by, sort_order, page, limit, cursor, options, with_total, rank)
+        if with_total:
+            rows = (await self.db.execute(page_query)).unique().all()
+            paginated_records, total_records = self.split_window_rows(rows)
+            if not paginated_records and page > 1:
+                # page is past the last record, no row carries the total
+                total_records = await self.db.scalar(self.count_query(ids))
+            self.set_cached_count(ids, total_records)
+        else:
+            paginated_records = (await self.db.scalars(page_query)).unique().all()
+
+        logger.debug(f"Filtered {total_records} total records ({count_mode}), returning page {page} with limit {limit}, cursor: {cursor}")
+        return self.build_page(paginated_records, sort_by, sort_order, limit, total_records, count_mode, rank is not None)
+
+    def get_count_mode(self, count, page, cursor):
+        '''returns requested count mode, defaults to exact count on first page only'''
+        if count:
+            return count
+        if page == 1 and not cursor:
+            return "exact"
+        return "estimate"
+
+    def use_window_count(self, total_records, count_mode, cursor):
+        '''
+        window count is used for exact counts of offset pages, with a cursor the window would only count
+        the records after the cursor so the total is counted separately
+        '''
+        return self.window_count and total_records is None and count_mode == "exact" and not cursor
+
+    def get_rank(self, rank, sort_by, cursor):
+        '''
+        relevance order is used only without sort_by and cursor, it can not be encoded in a cursor
+        so ranked pages are paginated by page number
+        '''
+        if sort_by or cursor:
+            return None
+        return rank
+
+    def get_statement(self, records):
+        '''returns select() statement of Query or statement'''
+        if isinstance(records, Query):
+            return records.statement
+        return records
+
+    def count_query(self, ids):
+        return select(func.count()).select_from(self.model).where(self.model.id.in_(ids))
+
+    def get_count_cache_key(self, ids):
+        '''
+        queries with same sql and parameters share the cached count. datetime parameters, such as the current time of
+        upcoming appointments, are floored to COUNT_CACHE_TTL_SECONDS so requests of the same filters share the key
+        '''
+        compiled = ids.compile(dialect=self.db.get_bind().dialect)
+        params = sorted((name, self.get_count_cache_param(value)) for name, value in compiled.params.items())
+        return str(compiled), repr(params)
+
+    def get_count_cache_param(self, value):
+        if isinstance(value, datetime):
+            timestamp = value.timestamp()
+            return timestamp - timestamp % max(COUNT_CACHE_TTL_SECONDS, 1)
+        return value
+
+    def get_cached_count(self, ids, count_mode):
+        '''
+        returns (total_records, count_mode), for 'estimate' a count cached within COUNT_CACHE_TTL_SECONDS is used,
+        without cached count the mode falls back to 'exact'
+        '''
+        if count_mode != "estimate":
+            return None, count_mode
+
+        total_records = count_cache.get(self.get_count_cache_key(ids))
+        if total_records is None:
+            return None, "exact"
+        return total_records, count_mode
+
+    def set_cached_count(self, ids, total_records):
+        count_cache.set(self.get_count_cache_key(ids), total_records)
+
+    def build_page_query(self, ids, sort_by, sort_order, page, limit, cursor, options=(), with_total=False, rank=None):
+        '''
+        selects page records whose id is in the filtered ids, joins used by filters and search stay in the
+        subquery so they can not repeat records of the page or the window count
+        with_total adds COUNT(*) OVER () as second column, it is computed before offset and limit are applied
+        rank sorts the records by search relevance, most relevant first
+        '''
+        columns = [self.model]
+        if with_total:
+            columns.append(func.count().over().label("total_records"))
+
+        records = select(*columns).where(self.model.id.in_(ids)).options(*options)
+        if rank is not None:
+            records = records.order_by(rank.desc(), self.model.id)
+        else:
+            records = self.apply_sorting(sort_by, sort_order, records)
+        logger.info(f"Sorting applied successfully")
+        return self.apply_pagination(page, limit, cursor, sort_by, sort_order, records)
+
+    def split_window_rows(self, rows):
+        '''returns records and total_records from (record, total_records) rows'''
+        if not rows:
+            return [], 0
+        return [row[0] for row in rows], rows[0][1]
+
+    def apply_pagination(self, page, limit, cursor, sort_by, sort_order, records):
+        '''
+        with cursor, keeps only records after the cursor position (keyset pagination) else skips to the page offset
+        one extra record is fetched to find out if there is a next page
+        '''
+        if cursor:
+            records = self.apply_cursor(cursor, sort_by, sort_order, records)
+        else:
+            records = records.offset((page - 1) * limit)
+        return records.limit(limit + 1)
+
+    def build_page(self, records, sort_by, sort_order, limit, total_records, count_mode, ranked=False):
+        '''
+        drops the extra record fetched by apply_pagination and creates next_cursor from last record of page,
+        pages sorted by rank have no next_cursor
+        '''
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            if not ranked:
+                next_cursor = self.encode_cursor(records[-1], sort_by, sort_order)
+        return records, PageInfo(total_records=total_records, total_records_mode=count_mode, next_cursor=next_cursor)
 
-                if filter_field is None:
-                    logger.warning(f"Ignored invalid filter field: {field}")
-                    continue
+    def build_query(self, filters, records, search_filters=None):
+        '''
+        applies filters and search filters, works on Query and select() statements
+        returns: select() of the filtered ids
+        '''
+        records = self.apply_filter(filters, records, search_filters)
+        logger.info(f"Filters applied successfully")
+        return self.get_statement(records).with_only_columns(self.model.id).order_by(None)
 
+    def apply_filter(self, filters, records, search_filters):
+        '''applies the parsed filters and search filters, filter values are bound parameters so the sql shape repeats'''
+        specs = self.parse_filters(filters)
+        try:
+            for filter_field, condition, value in specs:
                 if condition == 'like':
-                    # filter_conditions.append(filter_field.ilike(f"%{value}%"))
                     records = records.filter(filter_field.ilike(f"%{value}%"))
                 else:
-                    op = OPERATOR_MAP.get(condition)
-                    if not op:
-                        logger.warning(f"Unsupported operator: {condition}")
-                        continue
-                    # filter_conditions.append(op(filter_field, value))
-                    records = records.filter(op(filter_field, value))
+                    records = records.filter(OPERATOR_MAP[condition](filter_field, value))
 
             if search_filters:
                 records = records.filter(or_(*search_filters))
@@ -69,34 +244,129 @@ class FilterPaginationService:
             logger.exception(f"Error applying filters: {e}")
             raise HTTPException(500, f"Error applying filters: ")
 
-    def apply_sorting(self, sort_by, sort_order, records):
-        if sort_by is None:
-            return records
+    def parse_filters(self, filters):
+        '''
+        parses the filters string (field-operator-value,...) into (column, operator, value) specs,
+        specs are cached per model, allowed fields and filters string so repeated lists skip parsing and validation
+        invalid fields and operators raise 400, allowed fields missing on the model and unsupported operators are ignored
+        '''
+        if not filters:
+            return ()
+
+        key = (self.model, tuple(self.allowed_fields), filters)
+        specs = filter_spec_cache.get(key)
+        if specs is not None:
+            return specs
+
+        specs = []
+        for filter in filters.split(","):
+            filter_parts = filter.split("-")
+            if len(filter_parts) != 3:
+                raise HTTPException(400, f"filter parameters needs to be in format field-operator-value, input filter: {filter}")
+
+            field, condition, value = filter_parts
+            field, value = field.strip(), value.strip()
+            if field not in self.allowed_fields:
+                raise HTTPException(400, f"invalid field in filter parameter, field:{field}, allowed_fields: {self.allowed_fields}")
+
+            filter_field = getattr(self.model, field, None)
+            if filter_field is None:
+                logger.warning(f"Ignored invalid filter field: {field}")
+                continue
+
+            if condition != 'like' and condition not in OPERATOR_MAP:
+                logger.warning(f"Unsupported operator: {condition}")
+                continue
+            specs.append((filter_field, condition, value))
 
+        specs = tuple(specs)
+        filter_spec_cache.set(key, specs)
+        return specs
+
+    def get_null_sort_value(self, sort_by):
+        '''value NULLs of sort_by sort as, None for fields that are not listed in null_sort_values'''
+        return null_sort_values.get(self.model, {}).get(sort_by)
+
+    def get_sort_field(self, sort_by):
+        '''sort expression of sort_by, nullable fields are coalesced to their null sort value'''
+        sort_field = getattr(self.model, sort_by)
+        null_value = self.get_null_sort_value(sort_by)
+        if null_value is not None:
+            return func.coalesce(sort_field, null_value)
+        return sort_field
+
+    def apply_sorting(self, sort_by, sort_order, records):
+        '''sorts by sort_by and then id, id keeps the order stable for offset and cursor pagination'''
         try:
-            sort_field = getattr(self.model, sort_by)
+            sort_fields = [self.get_sort_field(sort_by), self.model.id] if sort_by else [self.model.id]
             if sort_order == 'desc':
-                return records.order_by(sort_field.desc())
+                return records.order_by(*[field.desc() for field in sort_fields])
             else:
-                return records.order_by(sort_field.asc())
+                return records.order_by(*[field.asc() for field in sort_fields])
         except Exception as e:
             logger.exception(f"Error applying sorting: {e}")
             raise HTTPException(500, "Error applying sorting")
 
-    def verify_filters(self, filters, sort_by, sort_order, page, limit):
-        if filters:
-            filters = filters.split(",")
-            for filter in filters:
-                filter_parts = filter.split("-")
-                if len(filter_parts) != 3:
-                    raise HTTPException(400, f"filter parameters needs to be in format field-operator-value, input filter: {filter}")
+    def apply_cursor(self, cursor, sort_by, sort_order, records):
+        '''
+        filters records positioned after the cursor in (sort_by, id) order. sort_by values have to be non null
+        or listed in null_sort_values, a NULL compares as unknown and would drop the record from the page
+        '''
+        position = self.decode_cursor(cursor, sort_by, sort_order)
+        last_id = self.coerce_cursor_value(self.model.id, position.get("id"))
+
+        if sort_by:
+            value = self.coerce_cursor_value(getattr(self.model, sort_by), position.get("value"))
+            if value is None:
+                value = self.get_null_sort_value(sort_by)
+            keys = tuple_(self.get_sort_field(sort_by), self.model.id)
+            values = (value, last_id)
+        else:
+            keys = self.model.id
+            values = last_id
+
+        if sort_order == 'desc':
+            return records.filter(keys < values)
+        return records.filter(keys > values)
+
+    def encode_cursor(self, record, sort_by, sort_order):
+        '''returns opaque cursor for the position of record'''
+        position = {"sort_by": sort_by, "sort_order": sort_order, "id": record.id}
+        if sort_by:
+            position["value"] = getattr(record, sort_by)
+        return base64.urlsafe_b64encode(json.dumps(position, default=str).encode()).decode()
 
-                field, condition, value = filter_parts
-                if field.strip() not in self.allowed_fields:
-                    raise HTTPException(400, f"invalid field in filter parameter, field:{field}, allowed_fields: {self.allowed_fields}")
+    def decode_cursor(self, cursor, sort_by, sort_order):
+        '''decodes cursor and verifies it was created for the same sort_by and sort_order'''
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, binascii.Error):
+            raise HTTPException(400, f"invalid cursor: {cursor}")
+
+        if not isinstance(position, dict) or position.get("sort_by") != sort_by or position.get("sort_order") != sort_order:
+            raise HTTPException(400, f"cursor does not match sort_by: {sort_by} and sort_order: {sort_order}")
+        return position
 
-                if condition == 'like' and not isinstance(value, str):
-                    raise HTTPException(400, f"like operator requires a string value, input value: {value}")
+    def coerce_cursor_value(self, field, value):
+        '''converts json value of cursor back to the python type of field'''
+        if value is None:
+            return None
+        try:
+            python_type = field.type.python_type
+        except NotImplementedError:
+            return value
+
+        try:
+            if python_type is datetime:
+                return datetime.fromisoformat(value)
+            if python_type is uuid.UUID:
+                return uuid.UUID(value)
+        except (TypeError, ValueError):
+            raise HTTPException(400, f"invalid cursor value: {value}")
+        return value
+
+    def verify_filters(self, filters, sort_by, sort_order, page, limit, count=None):
+        self.parse_filters(filters)
 
         if sort_by and sort_by not in self.allowed_fields:
             raise HTTPException(400, f"invalid field in sort_by parameter, input sort_by: {sort_by}, allowed_fields: {self.allowed_fields}")
@@ -108,4 +378,7 @@ class FilterPaginationService:
             raise HTTPException(400, f"page must be a positive integer, input page: {page}")
 
         if limit < 1 or limit > 100:
-            raise HTTPException(400, f"limit must be an integer between 1 and 100, input limit: {limit}")
\ No newline at end of file
+            raise HTTPException(400, f"limit must be an integer between 1 and 100, input limit: {limit}")
+
+        if count and count not in COUNT_MODES:
+            raise HTTPException(400, f"count must be one of {COUNT_MODES}, input count: {count}")
\ No newline at end of file
@@ -6,7 +6,6 @@ from app.models.doctor import Doctor
 from app.models.users import User
 from app.models.patients import Patient
 from app.utils.logging import Logging
-from app.utils.helper import get_payload
 import uuid
 
 
@@ -39,17 +38,15 @@ class PatientServices(BasicServices):
         
         return new_user
 
-    def get_current_patient(self, token):
+    def get_current_patient(self, principal):
         '''
         fetches current logged in patient
         returns: user object
         '''
         logger.info(f"get_current_patient method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        role = payload.get('role')
+        logger.debug(f"principal received: {principal}")
+        user_id = principal.user_id
+        role = principal.role
         
 
         if role != 'patient':
@@ -61,23 +58,18 @@ class PatientServices(BasicServices):
         return record
 
 
-    def update_current_patient(self, token, user_update:BaseModel):
+    def update_current_patient(self, principal, user_update:BaseModel):
         '''
         fetches current logged in patient and updates user model
-        requires: token and user_update model
+        requires: principal and user_update model
         returns: updated patient's user record
         '''
         logger.info(f"update_current_patient method called")
-        user = self.get_current_patient(token)
-
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        uuid_user_id = uuid.UUID(user_id)
+        user = self.get_current_patient(principal)
+        uuid_user_id = principal.user_id
 
         try:
-            logger.debug(f"Attempting to update patient profile, parameter: token:{token}, user_update: {user_update}")
+            logger.debug(f"Attempting to update patient profile, parameter: principal:{principal}, user_update: {user_update}")
             for field, value in user_update.model_dump(exclude_unset=True).items():
                 if value:
                     setattr(user, field, value)
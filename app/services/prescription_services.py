@@ -9,10 +9,10 @@ from app.models.users import User
 from app.services.filter_pagination_services import FilterPaginationService
 from app.schemas.prescriptions import PrescriptionURLResponseSchema
 from app.utils.logging import Logging
-from app.utils.helper import get_payload
 from botocore.exceptions import NoCredentialsError
 import uuid
-from app.config.aws_config import s3, bucket_name
+from pathlib import PurePosixPath, PureWindowsPath
+from app.utils.storage import storage
 
 logger = Logging(__name__).get_logger()
 
@@ -20,7 +20,7 @@ class PrescriptionServices(BasicServices):
     def __init__(self, db, model):
         super().__init__(db, model)
 
-    def create_patient_prescription(self, token, appointment_id, prescription):
+    def create_patient_prescription(self, principal, appointment_id, prescription, options=()):
         '''
         creates prescription record for appointments
         validates only one prescription is generated for an appointment_id,
@@ -28,11 +28,8 @@ class PrescriptionServices(BasicServices):
         store prescription record to database and prescription file to s3 bucket
         '''
         logger.info(f"create_patient_prescription method called")
-        payload = get_payload(token)
-
-        logger.debug(f"payload received: {payload}")
-        user_id = payload.get('user_id')
-        uuid_user_id = uuid.UUID(user_id)
+        logger.debug(f"principal received: {principal}")
+        uuid_user_id = principal.user_id
 
         user = super().get_record_by_model_id(User, uuid_user_id)
         appointment = super().get_record_by_model_id(Appointment, appointment_id)
@@ -54,10 +51,10 @@ class PrescriptionServices(BasicServices):
                 400, "Can not generate prescription on cancelled appointments"
             )
 
-        file_name = f"prescriptions/{uuid.uuid4()}_{prescription.filename}"
+        file_name = f"prescriptions/{uuid.uuid4()}_{self.get_safe_filename(prescription.filename)}"
         logger.debug(f"filename: {file_name}")
 
-        self.store_prescription_on_aws(prescription, file_name)
+        self.store_prescription_on_storage(prescription, file_name)
 
         new_prescription = Prescription(
             doctor_id = appointment.doctor_id,
@@ -69,33 +66,50 @@ class PrescriptionServices(BasicServices):
         logger.debug(f"New prescription generated, prescription: {new_prescription}")
 
         record = super().add_record_object_to_db(new_prescription)
-        
+        record = super().get_record_by_id(record.id, options)
+
         return record
 
 
-    def store_prescription_on_aws(self, prescription, file_name):
+    def get_safe_filename(self, filename):
+        '''
+        last path component of the client supplied filename, directories and '..' are dropped
+        so the storage key always stays under prescriptions/
+        '''
+        name = PureWindowsPath(PurePosixPath(filename or "").name).name
+        if name in ("", ".", ".."):
+            return "prescription"
+        return name
+
+    def store_prescription_on_storage(self, prescription, file_name):
         '''
-        function to store prescription object to s3 bucket
+        function to store prescription object to object storage,
+        streams the spooled upload file of the request without another copy
         '''
-        logger.info(f"store_prescription_on_aws method started")
+        logger.info(f"store_prescription_on_storage method started")
         try:
-            logger.info(f"Attempting to upload prescription object to s3 bucket")
-            s3.upload_fileobj(prescription.file, bucket_name, file_name)
-            logger.info(f"prescription uploaded to bucket")
+            logger.info(f"Attempting to upload prescription object to {storage.name} storage")
+            prescription.file.seek(0)
+            storage.upload_fileobj(prescription.file, file_name, prescription.content_type)
+            logger.info(f"prescription uploaded to storage")
             return 
 
+        except ValueError as e:
+            logger.error(f"Invalid prescription storage key {file_name}: {e}")
+            raise HTTPException(400, f"Invalid prescription file name")
+
         except NoCredentialsError:
             logger.error(f"NoCredentialsError occured during file upload to s3")
             raise HTTPException(500, f"NoCredentialsError occured during file upload to s3")
 
-    def fetch_patient_prescriptions(self, patient_id):
+    def fetch_patient_prescriptions(self, patient_id, options=()):
         '''
         fetches prescription records for specified patient_id and adds presigned url for each record 
         for accessing prescription file
         '''
         logger.info(f"fetch_patient_prescriptions method called")
 
-        prescriptions = self.db.query(self.model).filter(self.model.patient_id == patient_id).all()
+        prescriptions = self.db.query(self.model).options(*options).filter(self.model.patient_id == patient_id).all()
         logger.debug(f"prescriptions fetched, prescriptions: {prescriptions}")
 
         modified_prescriptions = []
@@ -106,13 +120,13 @@ class PrescriptionServices(BasicServices):
 
         return modified_prescriptions
 
-    def fetch_patient_prescription(self, prescription_id):
+    def fetch_patient_prescription(self, prescription_id, options=()):
         '''
         fetches prescirption of specified id and adds presigned url to return record
         '''
         logger.info(f"fetch_patient_prescription method called")
 
-        prescription = super().get_record_by_id(prescription_id)
+        prescription = super().get_record_by_id(prescription_id, options)
 
         logger.info(f"Attempting to generate url for prescription")
         prescription = self.get_presighned_url(prescription, PrescriptionURLResponseSchema)
@@ -127,18 +141,14 @@ class PrescriptionServices(BasicServices):
         
         prescription_out = pyschema.model_validate(object)
         prescription_data = prescription_out.model_dump()
-        url = s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket_name, 'Key': object.prescription_obj},
-            ExpiresIn = 600
-        )
+        url = storage.presigned_url(object.prescription_obj, expires_in=600)
         logger.debug(f"Url generated : {url}")
         prescription_data['prescription_url'] = url
         prescription = pyschema(**prescription_data)
 
         return prescription
 
-    def fetch_all_prescriptions(self, filters, sort_by, sort_order, page, limit, allowed_fields, search):
+    def fetch_all_prescriptions(self, filters, sort_by, sort_order, page, limit, allowed_fields, search, cursor=None, count=None, options=()):
         '''
         returns all prescription records and applies filter and pagination, also adds presigned url to each record
         '''
@@ -146,12 +156,14 @@ class PrescriptionServices(BasicServices):
 
         records = None
         search_filters = None
+        rank = None
         if search:
             logger.debug(f"Search term provided: '{search.strip()}'")
             records, search_filters = super().search_record(search.strip())
+            rank = super().search_rank(search.strip())
 
         obj = FilterPaginationService(self.model, allowed_fields, self.db)
-        records, total_records= obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, search_filters)
+        records, page_info = obj.apply_filter_pagination(filters, sort_by, sort_order, page, limit, records, search_filters, cursor, count, options, rank)
         logger.info(f"Records fetched for {self.model.__name__}")
 
         modified_prescriptions = []
@@ -160,7 +172,7 @@ class PrescriptionServices(BasicServices):
             new_prescription = self.get_presighned_url(prescription, PrescriptionURLResponseSchema)
             modified_prescriptions.append(new_prescription)
 
-        return modified_prescriptions, total_records
+        return modified_prescriptions, page_info
         
         
         
\ No newline at end of file
@@ -1,8 +1,7 @@
 from app.config.search_parameters import search_parameters
 from app.utils.logging import Logging
 from fastapi import HTTPException
-from sqlalchemy import or_
-from sqlalchemy.orm import aliased
+from sqlalchemy import or_, func, select, bindparam
 from sqlalchemy import String
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
@@ -11,6 +10,9 @@ def is_string_column(column):
 
 logger = Logging(__name__).get_logger()
 
+#model -> (searched string columns, ((relationship, searched string columns of related model), ...)), see get_search_metadata
+search_metadata = {}
+
 # from app.exceptions.search_exceptions import *
 
 class SearchService():
@@ -18,47 +20,93 @@ class SearchService():
         self.db = db
         self.model = model
 
-    def search_record(self, search_param):
+    def search_record(self, search_param, records=None):
+        '''
+        builds ilike filters for search_param, related models are matched with EXISTS (has/any) so records
+        are never repeated by joins and need no DISTINCT. ilike '%term%' uses the pg_trgm GIN indexes
+        records defaults to a Query on self.model, pass a select() statement for AsyncSession
+        returns: records and search filters, combined with or_ by FilterPaginationService
+        '''
         logger.info(f"Starting search for: {search_param}")
+        self_columns, relationships = self.get_search_metadata()
+
+        if records is None:
+            records = self.db.query(self.model)
+        #one bound parameter shared by all columns, the sql is the same for every search term
+        search_param = bindparam("search_pattern", f"%{search_param.strip()}%", type_=String)
+
+        filters = [column.ilike(search_param) for column in self_columns]
+
+        for rel_attr, columns in relationships:
+            rel_filters = [column.ilike(search_param) for column in columns]
+            if rel_attr.property.uselist:
+                filters.append(rel_attr.any(or_(*rel_filters)))
+            else:
+                filters.append(rel_attr.has(or_(*rel_filters)))
+            logger.debug(f"Search filter added for relationship: {rel_attr.key}")
+
+        search_filters = filters
+        return records, search_filters
+
+    def search_rank(self, search_param):
+        '''
+        relevance of a record for search_param, highest pg_trgm word_similarity of its searched columns.
+        related columns are ranked with correlated subqueries, they run only for the matched records
+        returns: expression to sort by, descending
+        '''
+        self_columns, relationships = self.get_search_metadata()
+        term = bindparam("search_term", search_param.strip(), type_=String)
+
+        ranks = [func.coalesce(func.word_similarity(term, column), 0) for column in self_columns]
+
+        for rel_attr, columns in relationships:
+            related_model = rel_attr.property.mapper.class_
+            similarities = [func.coalesce(func.word_similarity(term, column), 0) for column in columns]
+            rank = select(func.max(func.greatest(*similarities, 0))).select_from(related_model).where(
+                rel_attr.property.primaryjoin
+            ).scalar_subquery()
+            ranks.append(func.coalesce(rank, 0))
+
+        return func.greatest(*ranks, 0)
+
+    def get_search_metadata(self):
+        '''
+        resolves the search_parameters of self.model into string columns once per model,
+        relationships without string columns are left out
+        '''
+        metadata = search_metadata.get(self.model)
+        if metadata is not None:
+            return metadata
+
         model_config = search_parameters.get(self.model)
         if not model_config:
             logger.warning(f"No search configuration found for model: {self.model}")
+            raise HTTPException(500, f"Search is not configured for {self.model.__name__}")
 
-        records = self.db.query(self.model)
-        filters = []
-        search_param = f"%{search_param.strip()}%"
+        relationships = tuple(
+            (rel_attr, columns) for rel_attr, columns in self.get_search_relationships(model_config) if columns
+        )
+        metadata = (self.get_search_columns(self.model, model_config['self']), relationships)
+        search_metadata[self.model] = metadata
+        return metadata
 
-        for column in model_config['self']:
-            try:
-                filter_field = getattr(self.model, column)
-                if isinstance(filter_field, InstrumentedAttribute) and is_string_column(filter_field):
-                    filters.append(filter_field.ilike(search_param))
-                    logger.debug(f"Search filter added for self field: {column}")
-            except AttributeError:
-                logger.warning(f"Invalid self field: {column}")
-                raise HTTPException(500, "search column field is invalid: {column}")
+    def get_search_columns(self, model, columns):
+        '''returns string columns of model from columns, other types can not be matched with ilike'''
+        search_columns = []
+        for column in columns:
+            filter_field = getattr(model, column, None)
+            if filter_field is None:
+                logger.warning(f"Invalid search field: {model.__name__}.{column}")
+                raise HTTPException(500, f"search column field is invalid: {column}")
+            if isinstance(filter_field, InstrumentedAttribute) and is_string_column(filter_field):
+                search_columns.append(filter_field)
+        return tuple(search_columns)
 
+    def get_search_relationships(self, model_config):
+        '''yields (relationship attribute, string columns of related model)'''
         for rel_attr_name, rel_fields in model_config['relationships'].items():
-            try:
-                rel_attr = getattr(self.model, rel_attr_name)
-                related_model = rel_attr.property.mapper.class_
-                alias = aliased(related_model)
-                records = records.outerjoin(alias, rel_attr)
-
-                for column in rel_fields:
-                    try:
-                        filter_field = getattr(alias, column)
-                        if isinstance(filter_field, InstrumentedAttribute) and is_string_column(filter_field):
-                            filters.append(filter_field.ilike(search_param))
-                            logger.debug(f"Search filter added for related field: {rel_attr_name}.{column}")
-                    except AttributeError:
-                        logger.warning(f"Invalid related field: {rel_attr_name}.{column}")
-                        HTTPException(500, f"Search parameter relation field is invalild :{rel_attr_name}.{column} ")
-            except AttributeError:
+            rel_attr = getattr(self.model, rel_attr_name, None)
+            if rel_attr is None:
                 logger.warning(f"Invalid relationship attribute: {rel_attr_name}")
-                HTTPException(500, f"Invalid relationship attribute: {rel_attr_name}")
-
-        # records = records.filter(or_(*filters)).distinct()
-        search_filters = filters
-        # logger.info("Search completed successfully")
-        return records, search_filters
+                raise HTTPException(500, f"Invalid relationship attribute: {rel_attr_name}")
+            yield rel_attr, self.get_search_columns(rel_attr.property.mapper.class_, rel_fields)
@@ -0,0 +1,55 @@
+from app.config.config import AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL_SECONDS
+from app.utils.cache import LRUCache
+from app.utils.metrics import metrics
+import pytz
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+
+class AvailabilityCache:
+    '''
+    slots of one doctor for one day (IST), used by GET /doctors/{doctor_id}/available_slots.
+    booked slots are cached as well so a day is complete and the endpoint filters them out.
+    booking, cancellation and slot updates invalidate the day of the slot in this worker,
+    other uvicorn workers see the change after AVAILABILITY_CACHE_TTL_SECONDS
+    '''
+    def __init__(self, max_size, ttl):
+        self.days = LRUCache(max_size=max_size, ttl=ttl)
+
+    def key(self, doctor_id, day):
+        return str(doctor_id), day
+
+    def day_of(self, start_time):
+        '''IST date of slot start_time, naive values are taken as IST'''
+        if start_time.tzinfo is None:
+            start_time = ist_timezone.localize(start_time)
+        return start_time.astimezone(ist_timezone).date()
+
+    def get_days(self, doctor_id, days):
+        '''returns ({day: slots} of cached days, list of days missing from cache)'''
+        cached = {}
+        missing = []
+        for day in days:
+            slots = self.days.get(self.key(doctor_id, day))
+            if slots is None:
+                missing.append(day)
+            else:
+                cached[day] = slots
+
+        metrics.increment("availability_cache_hits", len(cached))
+        metrics.increment("availability_cache_misses", len(missing))
+        return cached, missing
+
+    def set_day(self, doctor_id, day, slots):
+        self.days.set(self.key(doctor_id, day), slots)
+
+    def invalidate(self, doctor_id, start_time):
+        '''drops the cached day that contains a slot starting at start_time'''
+        self.days.delete(self.key(doctor_id, self.day_of(start_time)))
+
+    def invalidate_days(self, doctor_id, days):
+        for day in days:
+            self.days.delete(self.key(doctor_id, day))
+
+
+availability_cache = AvailabilityCache(AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL_SECONDS)
@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+from threading import Lock
+import time
+from fastapi import HTTPException
+from app.config.config import (
+    BOOKING_ADMISSION, BOOKING_ADMISSION_REDIS_URL, BOOKING_CLAIM_TTL_SECONDS, BOOKING_CLAIM_WAIT_MS,
+    BOOKING_TAKEN_TTL_SECONDS, BOOKING_ADMISSION_MAX_SLOTS
+)
+from app.utils.cache import LRUCache
+from app.utils.logging import Logging
+from app.utils.metrics import metrics
+
+logger = Logging(__name__).get_logger()
+
+class BookingAdmission:
+    '''
+    admission check in front of appointment booking, a slot known to be taken is rejected with 409 before any
+    database work. a request finding the slot claimed by another request waits up to BOOKING_CLAIM_WAIT_MS for the
+    claim and then books through the database anyway, the claim holder can still fail (no patient, slot in the past,
+    database error, crash) and leave the slot free. the conditional update in the database decides every race
+    '''
+    #seconds between checks while waiting for a claim
+    claim_poll_interval = 0.005
+
+    @contextmanager
+    def admit(self, slot_id):
+        '''holds the in-flight claim of slot_id while the block books it when it can get it, raises 409 if slot is taken'''
+        key = str(slot_id)
+        if self.is_taken(key):
+            metrics.increment("booking_admission_rejected_taken")
+            raise HTTPException(409, f"Slot with id {slot_id} is already booked")
+
+        claimed = self.claim(key) or self.wait_for_claim(slot_id, key)
+        metrics.increment("booking_admission_admitted" if claimed else "booking_admission_admitted_unclaimed")
+        try:
+            yield
+        finally:
+            if claimed:
+                self.release(key)
+
+    def wait_for_claim(self, slot_id, key):
+        '''
+        waits for the claim of another request, raises 409 as soon as that request marks the slot taken
+        returns: True if the claim was taken over, False after BOOKING_CLAIM_WAIT_MS
+        '''
+        metrics.increment("booking_admission_claim_waits")
+        deadline = time.monotonic() + BOOKING_CLAIM_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            time.sleep(self.claim_poll_interval)
+            if self.is_taken(key):
+                metrics.increment("booking_admission_rejected_taken")
+                raise HTTPException(409, f"Slot with id {slot_id} is already booked")
+            if self.claim(key):
+                return True
+        return False
+
+    def claim(self, key):
+        return True
+
+    def release(self, key):
+        pass
+
+    def is_taken(self, key):
+        return False
+
+    def mark_taken(self, slot_id):
+        pass
+
+    def mark_free(self, slot_id):
+        pass
+
+
+class InProcessBookingAdmission(BookingAdmission):
+    '''
+    claims and taken marks kept in the worker process, every uvicorn worker admits one request per slot.
+    a slot freed on another worker stays marked taken here until BOOKING_TAKEN_TTL_SECONDS
+    '''
+    def __init__(self, taken_ttl, max_slots):
+        self.taken = LRUCache(max_size=max_slots, ttl=taken_ttl)
+        self.claims = set()
+        self.lock = Lock()
+
+    def claim(self, key):
+        with self.lock:
+            if key in self.claims:
+                return False
+            self.claims.add(key)
+            return True
+
+    def release(self, key):
+        with self.lock:
+            self.claims.discard(key)
+
+    def is_taken(self, key):
+        return self.taken.get(key, False)
+
+    def mark_taken(self, slot_id):
+        self.taken.set(str(slot_id), True)
+
+    def mark_free(self, slot_id):
+        self.taken.delete(str(slot_id))
+
+
+class RedisBookingAdmission(BookingAdmission):
+    '''
+    claims and taken marks shared by all workers through redis, claims expire after BOOKING_CLAIM_TTL_SECONDS
+    in case a worker dies while booking. redis errors admit the request, booking then relies on the database only
+    '''
+    def __init__(self, url, claim_ttl, taken_ttl):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.1, socket_connect_timeout=0.1)
+        self.claim_ttl = claim_ttl
+        self.taken_ttl = taken_ttl
+
+    def claim(self, key):
+        try:
+            return bool(self.redis.set(f"booking:claim:{key}", 1, nx=True, ex=self.claim_ttl))
+        except Exception as e:
+            logger.warning(f"Booking admission claim failed, admitting request: {e}")
+            return True
+
+    def release(self, key):
+        try:
+            self.redis.delete(f"booking:claim:{key}")
+        except Exception as e:
+            logger.warning(f"Booking admission release failed, claim expires in {self.claim_ttl}s: {e}")
+
+    def is_taken(self, key):
+        try:
+            return bool(self.redis.exists(f"booking:taken:{key}"))
+        except Exception as e:
+            logger.warning(f"Booking admission taken check failed, admitting request: {e}")
+            return False
+
+    def mark_taken(self, slot_id):
+        try:
+            self.redis.set(f"booking:taken:{slot_id}", 1, ex=self.taken_ttl)
+        except Exception as e:
+            logger.warning(f"Unable to mark slot {slot_id} taken: {e}")
+
+    def mark_free(self, slot_id):
+        try:
+            self.redis.delete(f"booking:taken:{slot_id}")
+        except Exception as e:
+            logger.warning(f"Unable to mark slot {slot_id} free: {e}")
+
+
+def get_booking_admission():
+    '''returns admission for BOOKING_ADMISSION: 'off', 'memory' or 'redis' '''
+    if BOOKING_ADMISSION == "memory":
+        return InProcessBookingAdmission(BOOKING_TAKEN_TTL_SECONDS, BOOKING_ADMISSION_MAX_SLOTS)
+    if BOOKING_ADMISSION == "redis":
+        return RedisBookingAdmission(BOOKING_ADMISSION_REDIS_URL, BOOKING_CLAIM_TTL_SECONDS, BOOKING_TAKEN_TTL_SECONDS)
+    return BookingAdmission()
+
+
+booking_admission = get_booking_admission()
@@ -1,14 +1,20 @@
 from passlib.context import CryptContext
 from datetime import datetime, timezone, timedelta
 import jwt
-from app.config.config import SECRET_KEY, TOKEN_ALGORITHM
+from pydantic import ValidationError
+from app.config.config import SECRET_KEY, TOKEN_ALGORITHM, TOKEN_CACHE_SIZE
 from app.models.users import User
+from app.schemas.token import Principal
+from app.utils.cache import LRUCache
 from app.utils.logging import Logging
 
 
 logger = Logging(__name__).get_logger()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+#verified token payloads, entries expire together with the token
+token_cache = LRUCache(max_size=TOKEN_CACHE_SIZE)
+
 def create_password_hash(pwd) -> str:
     return pwd_context.hash(pwd)
 
@@ -23,5 +29,27 @@ def create_token(user_data, expiry: timedelta, token_type:str = "access"):
     return token
 
 def get_payload(token):
-    payload = jwt.decode(token, SECRET_KEY, algorithms=TOKEN_ALGORITHM)
-    return payload
\ No newline at end of file
+    '''verifies token and returns its payload, verified payloads are cached until token expiry'''
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=TOKEN_ALGORITHM)
+        token_cache.set(token, payload, expires_at=payload.get('exp'))
+    return dict(payload)
+
+def get_principal(token) -> Principal:
+    '''
+    verifies token and returns its claims as Principal
+    a signed token with missing or malformed claims raises InvalidTokenError like an invalid signature
+    '''
+    payload = get_payload(token)
+    try:
+        return Principal(
+            user_id=payload.get('user_id'),
+            role=payload.get('role'),
+            token_type=payload.get('type'),
+            username=payload.get('username'),
+            email=payload.get('email')
+        )
+    except ValidationError as e:
+        logger.debug(f"Token claims rejected: {e}")
+        raise jwt.InvalidTokenError("Invalid token claims")
\ No newline at end of file
@@ -0,0 +1,283 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from email.message import EmailMessage
+from threading import Lock, Thread
+import asyncio
+import concurrent.futures
+import smtplib
+import time
+from app.config.config import (
+    EMAIL, PASSWORD, MAIL_TRANSPORT, MAIL_SMTP_HOST, MAIL_SMTP_PORT, MAIL_SMTP_SSL, MAIL_SMTP_LOGIN,
+    MAIL_SMTP_TIMEOUT_SECONDS, MAIL_SMTP_MAX_MESSAGES, MAIL_SMTP_IDLE_SECONDS, MAIL_SINK_DELAY_MS
+)
+from app.utils.logging import Logging
+from app.utils.metrics import metrics
+
+logger = Logging(__name__).get_logger()
+
+
+def build_message(to_mail, subject, body):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = EMAIL
+    msg["To"] = to_mail
+    msg.set_content(body)
+    return msg
+
+
+class MailTransport(ABC):
+    '''
+    delivers EmailMessage objects, subclasses implement deliver().
+    send() records mail_send_seconds, mail_sent and mail_send_failures for every transport
+    '''
+    name = "base"
+
+    def send(self, msg):
+        start = time.perf_counter()
+        try:
+            self.deliver(msg)
+        except Exception:
+            metrics.increment("mail_send_failures")
+            raise
+        metrics.observe("mail_send_seconds", time.perf_counter() - start)
+        metrics.increment("mail_sent")
+
+    @abstractmethod
+    def deliver(self, msg):
+        raise NotImplementedError
+
+    def is_connection_error(self, error):
+        '''true when error means the server can not be reached or refuses the login, so the next sends fail too'''
+        return False
+
+    def close(self):
+        pass
+
+
+class PersistentConnectionTransport(MailTransport):
+    '''
+    keeps one logged in connection open between sends, so a batch of mails pays for a single TLS handshake and login.
+    the connection is reopened after max_messages, after idle_seconds without use and once after the server dropped it.
+    every process holds its own connection, smtp_sends_per_connection is recorded when a connection is closed
+    '''
+    def __init__(self, host, port, username, password, use_ssl, login, timeout, max_messages, idle_seconds):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.login = login
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self.sent = 0
+        self.last_used = 0.0
+
+    def is_stale(self, connected):
+        return (
+            not connected
+            or self.sent >= self.max_messages
+            or time.monotonic() - self.last_used > self.idle_seconds
+        )
+
+    def connection_opened(self, start):
+        self.sent = 0
+        metrics.increment("smtp_connections_opened")
+        metrics.observe("smtp_connect_seconds", time.perf_counter() - start)
+        logger.info(f"{self.name} connection opened to {self.host}:{self.port}")
+
+    def connection_closed(self):
+        metrics.observe("smtp_sends_per_connection", self.sent)
+
+    def message_sent(self):
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+
+class SMTPTransport(PersistentConnectionTransport):
+    '''blocking smtplib client, SMTP_SSL or plain SMTP for local sinks'''
+    name = "smtp"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.smtp = None
+        self.lock = Lock()
+
+    def connect(self):
+        self.close_connection()
+        start = time.perf_counter()
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.login:
+            try:
+                smtp.login(self.username, self.password)
+            except smtplib.SMTPException:
+                smtp.close()
+                raise
+        #set after login, a connection refusing the login is not reused by the next send
+        self.smtp = smtp
+        self.connection_opened(start)
+
+    def close_connection(self):
+        if self.smtp is None:
+            return
+        self.connection_closed()
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.debug(f"SMTP quit failed: {e}")
+        self.smtp = None
+
+    def deliver(self, msg):
+        with self.lock:
+            if self.is_stale(self.smtp is not None):
+                self.connect()
+            try:
+                self.smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                logger.warning(f"SMTP connection dropped, reconnecting")
+                self.smtp = None
+                self.connect()
+                self.smtp.send_message(msg)
+            self.message_sent()
+
+    def is_connection_error(self, error):
+        if isinstance(error, (smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError, smtplib.SMTPServerDisconnected)):
+            return True
+        #smtplib errors are OSErrors as well, the remaining ones are about the message
+        return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+    def close(self):
+        with self.lock:
+            self.close_connection()
+
+
+class AsyncSMTPTransport(PersistentConnectionTransport):
+    '''
+    aiosmtplib client on an event loop thread owned by the transport, started on first use so it is created
+    in the celery worker process and not in the parent. async code can await send_async() on its own loop
+    requires: aiosmtplib (requirements-optional.txt)
+    '''
+    name = "async_smtp"
+
+    def __init__(self, *args, **kwargs):
+        import aiosmtplib
+
+        super().__init__(*args, **kwargs)
+        self.aiosmtplib = aiosmtplib
+        self.smtp = None
+        self.loop = None
+        self.loop_lock = Lock()
+        self.send_lock = None
+
+    def get_loop(self):
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.send_lock = asyncio.Lock()
+                Thread(target=self.loop.run_forever, name="async-smtp-transport", daemon=True).start()
+            return self.loop
+
+    async def connect(self):
+        await self.close_connection()
+        start = time.perf_counter()
+        smtp = self.aiosmtplib.SMTP(
+            hostname=self.host, port=self.port, use_tls=self.use_ssl, start_tls=False, timeout=self.timeout
+        )
+        await smtp.connect()
+        if self.login:
+            try:
+                await smtp.login(self.username, self.password)
+            except self.aiosmtplib.SMTPException:
+                smtp.close()
+                raise
+        self.smtp = smtp
+        self.connection_opened(start)
+
+    async def close_connection(self):
+        if self.smtp is None:
+            return
+        self.connection_closed()
+        try:
+            await self.smtp.quit()
+        except (self.aiosmtplib.SMTPException, OSError) as e:
+            logger.debug(f"SMTP quit failed: {e}")
+        self.smtp = None
+
+    async def send_async(self, msg):
+        async with self.send_lock:
+            if self.is_stale(self.smtp is not None and self.smtp.is_connected):
+                await self.connect()
+            try:
+                await self.smtp.send_message(msg)
+            except self.aiosmtplib.SMTPServerDisconnected:
+                logger.warning(f"SMTP connection dropped, reconnecting")
+                self.smtp = None
+                await self.connect()
+                await self.smtp.send_message(msg)
+            except asyncio.CancelledError:
+                #the server may be in the middle of a transaction, the connection can not be reused
+                self.abort_connection()
+                raise
+            self.message_sent()
+
+    def abort_connection(self):
+        if self.smtp is None:
+            return
+        self.connection_closed()
+        self.smtp.close()
+        self.smtp = None
+
+    def is_connection_error(self, error):
+        #connect, disconnect and timeout errors of aiosmtplib are OSErrors, so is the timeout of deliver()
+        return isinstance(error, (OSError, self.aiosmtplib.SMTPAuthenticationError))
+
+    def deliver(self, msg):
+        future = asyncio.run_coroutine_threadsafe(self.send_async(msg), self.get_loop())
+        try:
+            future.result(self.timeout * 2)
+        except concurrent.futures.TimeoutError:
+            #stops the send on the loop, otherwise it could still deliver a mail that is retried as failed
+            future.cancel()
+            raise
+
+    def close(self):
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close_connection(), self.loop).result(self.timeout)
+
+
+class SinkTransport(MailTransport):
+    '''
+    in-process sink for load tests, no network. keeps the last messages for inspection
+    and waits delay_ms per message to stand in for the server round trip
+    '''
+    name = "sink"
+
+    def __init__(self, delay_ms=0, keep=1000):
+        self.delay = delay_ms / 1000
+        self.messages = deque(maxlen=keep)
+        self.lock = Lock()
+
+    def deliver(self, msg):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.messages.append(msg)
+
+
+def get_mail_transport():
+    '''returns transport for MAIL_TRANSPORT: 'smtp', 'async_smtp' or 'sink' '''
+    if MAIL_TRANSPORT == "sink":
+        return SinkTransport(MAIL_SINK_DELAY_MS)
+
+    options = dict(
+        host=MAIL_SMTP_HOST, port=MAIL_SMTP_PORT, username=EMAIL, password=PASSWORD, use_ssl=MAIL_SMTP_SSL,
+        login=MAIL_SMTP_LOGIN, timeout=MAIL_SMTP_TIMEOUT_SECONDS, max_messages=MAIL_SMTP_MAX_MESSAGES,
+        idle_seconds=MAIL_SMTP_IDLE_SECONDS
+    )
+    if MAIL_TRANSPORT == "async_smtp":
+        return AsyncSMTPTransport(**options)
+    return SMTPTransport(**options)
+
+
+mail_transport = get_mail_transport()
@@ -0,0 +1,102 @@
+import json
+from threading import Lock
+from app.config.config import METRICS_REDIS_URL, METRICS_PUSH_TTL_SECONDS
+from app.utils.logging import Logging
+
+logger = Logging(__name__).get_logger()
+
+
+class Metrics:
+    '''
+    in-process metrics registry with counters, gauges and timing summaries
+    every uvicorn worker and celery process keeps its own values
+    '''
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+        self.timings = {}
+        self.lock = Lock()
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def register_gauge(self, name, callback):
+        '''registers a callback that returns the current gauge value when metrics are read'''
+        with self.lock:
+            self.gauge_callbacks[name] = callback
+
+    def observe(self, name, value):
+        '''adds value to timing summary of name'''
+        with self.lock:
+            timing = self.timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["sum"] += value
+            timing["max"] = max(timing["max"], value)
+
+    def snapshot(self):
+        '''returns current values of all metrics'''
+        with self.lock:
+            gauges = dict(self.gauges)
+            callbacks = dict(self.gauge_callbacks)
+            counters = dict(self.counters)
+            timings = {
+                name: {**timing, "avg": timing["sum"] / timing["count"] if timing["count"] else 0.0}
+                for name, timing in self.timings.items()
+            }
+
+        for name, callback in callbacks.items():
+            gauges[name] = callback()
+
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+
+class MetricsPublisher:
+    '''
+    shares snapshots of processes without an http endpoint, such as celery workers, through redis.
+    every process writes its snapshot under its own key which expires after METRICS_PUSH_TTL_SECONDS,
+    so stopped processes drop out. redis errors are logged and ignored
+    '''
+    key_prefix = "metrics:process:"
+
+    def __init__(self, url, ttl):
+        self.url = url
+        self.ttl = ttl
+        self.redis = None
+
+    def get_redis(self):
+        '''connects on first use, so forked processes do not share the parent's connection'''
+        if self.redis is None:
+            import redis
+            self.redis = redis.Redis.from_url(self.url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self.redis
+
+    def publish(self, process_name, snapshot):
+        try:
+            self.get_redis().set(f"{self.key_prefix}{process_name}", json.dumps(snapshot), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Unable to publish metrics of {process_name}: {e}")
+
+    def read_all(self):
+        '''returns published snapshots by process name'''
+        try:
+            client = self.get_redis()
+            keys = list(client.scan_iter(match=f"{self.key_prefix}*", count=100))
+            values = client.mget(keys) if keys else []
+        except Exception as e:
+            logger.warning(f"Unable to read published metrics: {e}")
+            return {}
+
+        return {
+            key.decode()[len(self.key_prefix):]: json.loads(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+
+metrics = Metrics()
+metrics_publisher = MetricsPublisher(METRICS_REDIS_URL, METRICS_PUSH_TTL_SECONDS)
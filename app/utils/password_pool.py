@@ -0,0 +1,42 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.config.config import PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_QUEUE
+from app.utils.helper import create_password_hash, verify_password
+from app.utils.logging import Logging
+
+
+logger = Logging(__name__).get_logger()
+
+class PasswordHashingPool:
+    '''
+    runs bcrypt hashing and verification on a dedicated, size limited thread pool so
+    the event loop is not blocked, bcrypt releases the GIL so the workers run in parallel.
+    when workers and queue are full, requests are rejected with 503 instead of waiting
+    '''
+    def __init__(self, workers: int, max_queue: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password_pool")
+        self.capacity = workers + max_queue
+        self.pending = 0
+
+    async def run(self, func, *args):
+        '''runs func on the pool, raises 503 if pool is saturated'''
+        # pending is only changed from the event loop thread, no lock required
+        if self.pending >= self.capacity:
+            logger.warning(f"Password pool saturated, pending: {self.pending}, capacity: {self.capacity}")
+            raise HTTPException(503, "Server is busy, please try again", headers={"Retry-After": "1"})
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self.run(create_password_hash, password)
+
+    async def verify(self, current_password, correct_password):
+        return await self.run(verify_password, current_password, correct_password)
+
+
+password_pool = PasswordHashingPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_QUEUE)
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class QueryCounter:
+    '''
+    counts statements sent to the database through engine while the context is open
+    pass async_engine.sync_engine for async engines
+
+    usage:
+        with QueryCounter(engine) as counter:
+            ...
+        counter.count, counter.statements, counter.parameters
+    '''
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self.parameters = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self.before_cursor_execute)
+        return False
+
+
+@contextmanager
+def assert_query_count(engine, expected):
+    '''
+    fails if the block sends a different number of statements than expected, used to check that an
+    endpoint serializes a page with a fixed number of queries
+
+    usage:
+        with assert_query_count(engine, 1):
+            client.get("/appointments/")
+    '''
+    with QueryCounter(engine) as counter:
+        yield counter
+    assert counter.count == expected, f"expected {expected} queries, got {counter.count}:\n" + "\n".join(counter.statements)
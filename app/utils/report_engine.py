@@ -0,0 +1,474 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+import csv
+import io
+import tempfile
+import time
+import uuid
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from sqlalchemy import DateTime, Integer, String, func, select
+from sqlalchemy.orm import aliased
+from app.config.config import REPORT_FETCH_SIZE, REPORT_SPOOL_MAX_MB
+from app.models.appointments import Appointment
+from app.models.doctor import Doctor
+from app.models.patients import Patient
+from app.models.users import User
+from app.utils.logging import Logging
+from app.utils.metrics import metrics
+from app.utils.storage import storage, MB
+import pytz
+
+logger = Logging(__name__).get_logger()
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+doctor_user = aliased(User)
+patient_user = aliased(User)
+
+
+class ReportPeriod:
+    '''
+    date range stage: first_day to last_day inclusive, in IST.
+    name is 'daily', 'weekly', 'monthly' or 'custom' and is used in titles and file names
+    '''
+    def __init__(self, name, first_day, last_day):
+        if last_day < first_day:
+            raise ValueError(f"Report period ends before it starts: {first_day} to {last_day}")
+        self.name = name
+        self.first_day = first_day
+        self.last_day = last_day
+
+    @classmethod
+    def daily(cls, day):
+        return cls("daily", day, day)
+
+    @classmethod
+    def weekly(cls, day):
+        '''monday to sunday week of day'''
+        week_start = day - timedelta(days=day.weekday())
+        return cls("weekly", week_start, week_start + timedelta(days=6))
+
+    @classmethod
+    def monthly(cls, day):
+        '''calendar month of day'''
+        month_start = day.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return cls("monthly", month_start, next_month - timedelta(days=1))
+
+    @classmethod
+    def custom(cls, first_day, last_day):
+        return cls("custom", first_day, last_day)
+
+    def bounds(self):
+        '''IST start of first_day and start of the day after last_day'''
+        start_time = ist_timezone.localize(datetime.combine(self.first_day, datetime.min.time()))
+        end_time = ist_timezone.localize(datetime.combine(self.last_day + timedelta(days=1), datetime.min.time()))
+        return start_time, end_time
+
+    @property
+    def label(self):
+        if self.first_day == self.last_day:
+            return f"{self.first_day}"
+        return f"{self.first_day}_to_{self.last_day}"
+
+    @property
+    def description(self):
+        if self.name == "daily":
+            return f"Date: {self.first_day.strftime('%Y-%m-%d')}"
+        if self.name == "weekly":
+            return f"Week: {self.first_day.strftime('%Y-%m-%d')} to {self.last_day.strftime('%Y-%m-%d')}"
+        if self.name == "monthly":
+            return f"Month: {self.first_day.strftime('%Y-%m')}"
+        return f"Period: {self.first_day.strftime('%Y-%m-%d')} to {self.last_day.strftime('%Y-%m-%d')}"
+
+    @property
+    def time_format(self):
+        return '%H:%M' if self.first_day == self.last_day else '%Y-%m-%d %H:%M'
+
+
+#periods the report tasks can be asked for by name, custom periods are built from explicit dates
+report_periods = {
+    "daily": ReportPeriod.daily,
+    "weekly": ReportPeriod.weekly,
+    "monthly": ReportPeriod.monthly,
+}
+
+
+def status_count(status):
+    return func.count().filter(Appointment.status == status)
+
+
+class ReportDataset(ABC):
+    '''
+    aggregation stage: the select of a report over a period, aggregation is done in the query.
+    subclasses implement statement() and pdf_line(), file_name is the report name in file names
+    '''
+    name = None
+    file_name = None
+    title = None
+
+    @abstractmethod
+    def statement(self, start_time, end_time):
+        raise NotImplementedError
+
+    def header(self, session, start_time, end_time):
+        '''extra lines drawn under the period in the pdf'''
+        return []
+
+    @abstractmethod
+    def pdf_line(self, i, row, period):
+        raise NotImplementedError
+
+
+class AppointmentsDataset(ReportDataset):
+    '''one row per appointment, ordered by slot time'''
+    name = "appointments"
+    file_name = "appointment"
+    title = "Appointment Report"
+
+    def statement(self, start_time, end_time):
+        '''
+        slot_start_time is the appointment's copy of the slot start, so doctor_slots is not joined
+        and only the partitions of the period are scanned
+        '''
+        return (
+            select(
+                Appointment.slot_start_time,
+                Appointment.status,
+                func.concat_ws(' ', doctor_user.first_name, doctor_user.last_name, type_=String).label("doctor_name"),
+                Doctor.speciality,
+                func.concat_ws(' ', patient_user.first_name, patient_user.last_name, type_=String).label("patient_name"),
+            )
+            .join(Doctor, Doctor.id == Appointment.doctor_id)
+            .join(doctor_user, doctor_user.id == Doctor.user_id)
+            .join(Patient, Patient.id == Appointment.patient_id)
+            .join(patient_user, patient_user.id == Patient.user_id)
+            .where(Appointment.slot_start_time >= start_time, Appointment.slot_start_time < end_time)
+            .order_by(Appointment.slot_start_time)
+        )
+
+    def header(self, session, start_time, end_time):
+        total_appointments = session.scalar(
+            select(func.count()).select_from(Appointment).where(
+                Appointment.slot_start_time >= start_time,
+                Appointment.slot_start_time < end_time
+            )
+        )
+        return [f"Total Appointments: {total_appointments}"]
+
+    def pdf_line(self, i, row, period):
+        slot_time = row.slot_start_time.astimezone(ist_timezone).strftime(period.time_format)
+        return f"{i}. {slot_time} - Dr. {row.doctor_name} with {row.patient_name}"
+
+
+class DoctorSummaryDataset(ReportDataset):
+    '''appointments per doctor and status'''
+    name = "doctors"
+    file_name = "doctor"
+    title = "Doctor Appointment Summary"
+
+    def statement(self, start_time, end_time):
+        return (
+            select(
+                Doctor.id.label("doctor_id"),
+                func.concat_ws(' ', User.first_name, User.last_name, type_=String).label("doctor_name"),
+                Doctor.speciality,
+                func.count().label("appointments"),
+                status_count("booked").label("booked"),
+                status_count("completed").label("completed"),
+                status_count("cancelled").label("cancelled"),
+            )
+            .select_from(Appointment)
+            .join(Doctor, Doctor.id == Appointment.doctor_id)
+            .join(User, User.id == Doctor.user_id)
+            .where(Appointment.slot_start_time >= start_time, Appointment.slot_start_time < end_time)
+            .group_by(Doctor.id, User.first_name, User.last_name, Doctor.speciality)
+            .order_by(func.count().desc(), Doctor.id)
+        )
+
+    def pdf_line(self, i, row, period):
+        return (
+            f"{i}. Dr. {row.doctor_name} ({row.speciality}): {row.appointments} appointments, "
+            f"{row.completed} completed, {row.cancelled} cancelled"
+        )
+
+
+class SpecialitySummaryDataset(ReportDataset):
+    '''appointments per speciality and status'''
+    name = "specialities"
+    file_name = "speciality"
+    title = "Speciality Appointment Summary"
+
+    def statement(self, start_time, end_time):
+        return (
+            select(
+                Doctor.speciality,
+                func.count(Appointment.doctor_id.distinct()).label("doctors"),
+                func.count().label("appointments"),
+                status_count("booked").label("booked"),
+                status_count("completed").label("completed"),
+                status_count("cancelled").label("cancelled"),
+            )
+            .select_from(Appointment)
+            .join(Doctor, Doctor.id == Appointment.doctor_id)
+            .where(Appointment.slot_start_time >= start_time, Appointment.slot_start_time < end_time)
+            .group_by(Doctor.speciality)
+            .order_by(func.count().desc(), Doctor.speciality)
+        )
+
+    def pdf_line(self, i, row, period):
+        return (
+            f"{i}. {row.speciality}: {row.doctors} doctors, {row.appointments} appointments, "
+            f"{row.completed} completed, {row.cancelled} cancelled"
+        )
+
+
+report_datasets = {dataset.name: dataset for dataset in [AppointmentsDataset(), DoctorSummaryDataset(), SpecialitySummaryDataset()]}
+
+
+class Report:
+    '''what the writers of one report need: period, dataset, selected columns and pdf header lines'''
+    def __init__(self, period, dataset, columns, header):
+        self.period = period
+        self.dataset = dataset
+        self.columns = columns
+        self.header = header
+
+    @property
+    def title(self):
+        return f"{self.period.name.title()} {self.dataset.title}"
+
+    @property
+    def column_names(self):
+        return [column.key for column in self.columns]
+
+
+def plain_value(value):
+    '''values as written to csv and arrow, uuids as strings and datetimes in IST'''
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.astimezone(ist_timezone)
+    return value
+
+
+class ReportWriter(ABC):
+    '''
+    output format stage: receives the rows of one report one at a time and writes them to the binary file object.
+    subclasses implement write() and close(), close() finishes the output but leaves file open for the upload
+    '''
+    extension = None
+    content_type = None
+
+    def __init__(self, file, report):
+        self.file = file
+        self.report = report
+
+    @abstractmethod
+    def write(self, row):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError
+
+
+class PDFWriter(ReportWriter):
+    '''
+    reportlab canvas, one line per row. finished pages are compressed,
+    reportlab keeps the page streams until save()
+    '''
+    extension = "pdf"
+    content_type = "application/pdf"
+
+    def __init__(self, file, report):
+        super().__init__(file, report)
+        self.pdf = canvas.Canvas(file, pagesize=A4, pageCompression=1)
+        self.width, self.height = A4
+        self.written = 0
+
+        self.pdf.setFont("Helvetica-Bold", 16)
+        self.pdf.drawString(50, self.height - 50, report.title)
+
+        self.pdf.setFont("Helvetica", 12)
+        self.y = self.height - 100
+        for line in [report.period.description] + report.header:
+            self.pdf.drawString(50, self.y, line)
+            self.y -= 20
+        self.y -= 10
+
+    def write(self, row):
+        self.written += 1
+        self.pdf.drawString(50, self.y, self.report.dataset.pdf_line(self.written, row, self.report.period))
+        self.y -= 20
+        if self.y < 100:
+            self.pdf.showPage()
+            self.pdf.setFont("Helvetica", 12)
+            self.y = self.height - 50
+
+    def close(self):
+        self.pdf.save()
+
+
+class CSVWriter(ReportWriter):
+    '''header row of column names, rows are written as they arrive'''
+    extension = "csv"
+    content_type = "text/csv"
+
+    def __init__(self, file, report):
+        super().__init__(file, report)
+        self.text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(report.column_names)
+
+    def write(self, row):
+        self.writer.writerow([plain_value(value) for value in row])
+
+    def close(self):
+        #detach so closing the wrapper does not close the spooled file
+        self.text.flush()
+        self.text.detach()
+
+
+class ArrowBatchWriter(ReportWriter):
+    '''
+    buffers REPORT_FETCH_SIZE rows and writes them as one record batch, the schema comes from the column types
+    of the statement so every batch has the same schema even when a column is all NULL.
+    subclasses open self.writer with the schema
+    requires: pyarrow (requirements-optional.txt)
+    '''
+    def __init__(self, file, report):
+        import pyarrow
+
+        super().__init__(file, report)
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([
+            (column.key, self.arrow_type(column.type)) for column in report.columns
+        ])
+        self.rows = []
+        self.writer = None
+
+    def arrow_type(self, column_type):
+        if isinstance(column_type, DateTime):
+            return self.pa.timestamp("us", tz="Asia/Kolkata")
+        if isinstance(column_type, Integer):
+            return self.pa.int64()
+        return self.pa.string()
+
+    def write(self, row):
+        self.rows.append([plain_value(value) for value in row])
+        if len(self.rows) >= REPORT_FETCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = list(zip(*self.rows))
+        self.writer.write_batch(self.pa.record_batch(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetWriter(ArrowBatchWriter):
+    '''parquet file, one row group per batch'''
+    extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+
+    def __init__(self, file, report):
+        super().__init__(file, report)
+        import pyarrow.parquet
+
+        self.writer = pyarrow.parquet.ParquetWriter(file, self.schema)
+
+
+class ArrowWriter(ArrowBatchWriter):
+    '''arrow ipc file'''
+    extension = "arrow"
+    content_type = "application/vnd.apache.arrow.file"
+
+    def __init__(self, file, report):
+        super().__init__(file, report)
+        self.writer = self.pa.ipc.new_file(file, self.schema)
+
+
+report_writers = {writer.extension: writer for writer in [PDFWriter, CSVWriter, ParquetWriter, ArrowWriter]}
+
+
+def stream_rows(session, statement):
+    '''
+    yields rows through a server side cursor, REPORT_FETCH_SIZE rows are held at a time
+    so memory does not grow with the number of rows
+    '''
+    result = session.execute(statement.execution_options(yield_per=REPORT_FETCH_SIZE))
+    for row in result:
+        yield row
+
+
+def report_file_name(period, dataset, extension):
+    return f"{period.name}_{dataset.file_name}_report_{period.label}.{extension}"
+
+
+def generate_report(session, period, dataset_name, formats):
+    '''
+    runs the query of the dataset once over the period and streams every row into one writer per format.
+    outputs are built in spooled temp files, kept in memory up to REPORT_SPOOL_MAX_MB, uploaded to storage
+    under reports/ and closed, which removes any file spilled to disk
+    returns: list of storage keys
+    '''
+    for extension in formats:
+        if extension not in report_writers:
+            raise ValueError(f"Unknown report format: {extension}")
+    dataset = report_datasets[dataset_name]
+
+    start = time.perf_counter()
+    start_time, end_time = period.bounds()
+    statement = dataset.statement(start_time, end_time)
+    report = Report(period, dataset, list(statement.selected_columns), dataset.header(session, start_time, end_time))
+
+    writers = []
+    written = 0
+    try:
+        for extension in formats:
+            file = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_MB * MB)
+            try:
+                writers.append(report_writers[extension](file, report))
+            except Exception:
+                file.close()
+                raise
+        try:
+            for row in stream_rows(session, statement):
+                for writer in writers:
+                    writer.write(row)
+                written += 1
+        finally:
+            for writer in writers:
+                writer.close()
+        metrics.observe("report_generation_seconds", time.perf_counter() - start)
+        metrics.increment("report_rows_written", written)
+        logger.info(f"{report.title} generated, rows: {written}, formats: {', '.join(formats)}")
+
+        keys = []
+        for writer in writers:
+            key = "reports/" + report_file_name(period, dataset, writer.extension)
+            writer.file.seek(0)
+            storage.upload_fileobj(writer.file, key, writer.content_type)
+            keys.append(key)
+        return keys
+    finally:
+        for writer in writers:
+            writer.file.close()
+
+
+def parse_report_date(value):
+    '''date, datetime or 'YYYY-MM-DD' string, celery task arguments arrive as strings'''
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
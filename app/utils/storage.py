@@ -0,0 +1,131 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+import os
+import shutil
+import tempfile
+import time
+from app.config.config import (
+    STORAGE_BACKEND, STORAGE_LOCAL_ROOT, STORAGE_LOCAL_BASE_URL, STORAGE_MULTIPART_THRESHOLD_MB,
+    STORAGE_MULTIPART_CHUNK_MB, STORAGE_MAX_CONCURRENCY
+)
+from app.utils.logging import Logging
+from app.utils.metrics import metrics
+
+logger = Logging(__name__).get_logger()
+
+MB = 1024 * 1024
+
+
+def file_size(fileobj):
+    '''size of a seekable file object from its current position, the position is left unchanged'''
+    position = fileobj.tell()
+    size = fileobj.seek(0, os.SEEK_END) - position
+    fileobj.seek(position)
+    return size
+
+
+class ObjectStorage(ABC):
+    '''
+    stores file objects under keys, subclasses implement put() and presigned_url().
+    upload_fileobj() records storage_upload_seconds, storage_upload_bytes and storage_upload_failures for every backend
+    '''
+    name = "base"
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        '''reads fileobj from its current position to the end, nothing is written to local disk on the way'''
+        size = file_size(fileobj)
+        start = time.perf_counter()
+        try:
+            self.put(fileobj, key, content_type)
+        except Exception:
+            metrics.increment("storage_upload_failures")
+            raise
+        metrics.observe("storage_upload_seconds", time.perf_counter() - start)
+        metrics.observe("storage_upload_bytes", size)
+        logger.debug(f"{self.name} upload of {key} done, bytes: {size}")
+
+    @abstractmethod
+    def put(self, fileobj, key, content_type):
+        raise NotImplementedError
+
+    @abstractmethod
+    def presigned_url(self, key, expires_in=600):
+        raise NotImplementedError
+
+
+class S3Storage(ObjectStorage):
+    '''
+    boto3 managed transfer, files above STORAGE_MULTIPART_THRESHOLD_MB are sent as multipart uploads
+    of STORAGE_MULTIPART_CHUNK_MB parts by STORAGE_MAX_CONCURRENCY threads.
+    works against MinIO and other S3 compatible servers through STORAGE_S3_ENDPOINT_URL
+    '''
+    name = "s3"
+
+    def __init__(self, client, bucket, threshold_mb, chunk_mb, max_concurrency):
+        from boto3.s3.transfer import TransferConfig
+
+        self.client = client
+        self.bucket = bucket
+        self.transfer_config = TransferConfig(
+            multipart_threshold=threshold_mb * MB,
+            multipart_chunksize=chunk_mb * MB,
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1
+        )
+
+    def put(self, fileobj, key, content_type):
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def presigned_url(self, key, expires_in=600):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=expires_in
+        )
+
+
+class LocalStorage(ObjectStorage):
+    '''
+    files under root for development and offline benchmarks. objects are written to a temp file
+    next to the target and renamed, so readers never see a partial object
+    '''
+    name = "local"
+
+    def __init__(self, root, base_url=None):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/") if base_url else None
+
+    def path(self, key):
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Storage key outside of storage root: {key}")
+        return path
+
+    def put(self, fileobj, key, content_type):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".upload-", delete=False) as tmp:
+            try:
+                shutil.copyfileobj(fileobj, tmp, STORAGE_MULTIPART_CHUNK_MB * MB)
+            except Exception:
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+
+    def presigned_url(self, key, expires_in=600):
+        if self.base_url:
+            return f"{self.base_url}/{key}"
+        return self.path(key).as_uri()
+
+
+def get_storage(backend=STORAGE_BACKEND):
+    '''returns storage for backend: 's3' or 'local' '''
+    if backend == "local":
+        return LocalStorage(STORAGE_LOCAL_ROOT, STORAGE_LOCAL_BASE_URL)
+
+    from app.config.aws_config import s3, bucket_name
+    return S3Storage(s3, bucket_name, STORAGE_MULTIPART_THRESHOLD_MB, STORAGE_MULTIPART_CHUNK_MB, STORAGE_MAX_CONCURRENCY)
+
+
+storage = get_storage()
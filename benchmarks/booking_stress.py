@@ -0,0 +1,95 @@
+'''
+fires parallel POST /appointments/book requests for one new slot at a running API server
+and checks that exactly one appointment was created for the slot
+needs a doctor and patients in the database in DB_URL and the same SECRET_KEY as the server
+
+usage: python -m benchmarks.booking_stress [--url http://localhost:8000] [--requests 300]
+'''
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app.db.session import local_session
+from app.models.appointments import Appointment
+from app.models.doctor import Doctor
+from app.models.doctor_slots import DoctorSlot
+from app.models.patients import Patient
+from app.models.users import User
+from app.utils.helper import create_token
+import pytz
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+
+def create_slot(db):
+    '''creates a free slot one week ahead for the first doctor'''
+    doctor = db.query(Doctor).first()
+    start_time = datetime.now(ist_timezone).replace(second=0, microsecond=0) + timedelta(days=7)
+    slot = DoctorSlot(doctor_id=doctor.id, start_time=start_time, end_time=start_time + timedelta(minutes=30), is_booked=False)
+    db.add(slot)
+    db.commit()
+    return slot.id
+
+
+def patient_tokens(db, total):
+    '''access tokens of up to total patients, reused round robin when there are fewer patients'''
+    user_ids = [user_id for (user_id,) in db.query(User.id).join(Patient, Patient.user_id == User.id).limit(total)]
+    tokens = [create_token({'user_id': str(user_id), 'role': 'patient'}, expiry=timedelta(minutes=30)) for user_id in user_ids]
+    return [tokens[i % len(tokens)] for i in range(total)]
+
+
+def book(url, slot_id, token, barrier):
+    '''waits for all threads and sends one booking request, returns (status, latency ms)'''
+    request = urllib.request.Request(
+        f"{url}/appointments/book?slot_id={slot_id}",
+        method="POST",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    barrier.wait()
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - start) * 1000
+
+
+def main(url, total):
+    db = local_session()
+    try:
+        slot_id = create_slot(db)
+        tokens = patient_tokens(db, total)
+    finally:
+        db.close()
+
+    print(f"booking slot {slot_id} with {total} parallel requests")
+    barrier = threading.Barrier(total)
+    with ThreadPoolExecutor(max_workers=total) as executor:
+        results = list(executor.map(lambda token: book(url, slot_id, token, barrier), tokens))
+
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    print(f"statuses: {dict(statuses)}")
+    print(f"latency ms: p50 {latencies[len(latencies) // 2]:.1f}, max {latencies[-1]:.1f}")
+
+    db = local_session()
+    try:
+        active = db.query(Appointment).filter(Appointment.slot_id == str(slot_id), Appointment.status != 'cancelled').count()
+    finally:
+        db.close()
+
+    print(f"active appointments for slot: {active}")
+    assert active == 1 and statuses[200] == 1, "slot was not booked exactly once"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    main(args.url, args.requests)
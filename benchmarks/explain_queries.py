@@ -0,0 +1,205 @@
+'''
+runs EXPLAIN ANALYZE on the statements the services send and fails if any of them reads a table with at least
+--min-rows rows through a sequential scan. statements come from the service methods themselves: sync service calls
+run with the statements they send recorded, statements of async services and the booking are taken from the
+service and FilterPaginationService methods building them. everything runs in one transaction that is rolled back.
+runs against the database in DB_URL, --seed inserts the pagination benchmark dataset plus attendances and prescriptions first,
+prescriptions get presigned urls, so use STORAGE_BACKEND=local without object storage credentials
+
+usage: STORAGE_BACKEND=local python -m benchmarks.explain_queries [--seed] [--appointments 1000000] [--min-rows 1000]
+'''
+import argparse
+import sys
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from app.config.loading_profiles import loading_profiles
+from app.db.database import engine
+from app.models.appointments import Appointment
+from app.models.attendance import Attendance
+from app.models.doctor import Doctor
+from app.models.doctor_schedule import DoctorScheduleTemplate
+from app.models.doctor_slots import DoctorSlot
+from app.models.patients import Patient
+from app.models.prescriptions import Prescription
+from app.models.users import User
+from app.schemas.token import Principal
+from app.services.appointment_services import AppointmentServices
+from app.services.attendance_services import AttendanceServices
+from app.services.doctor_slots_services import DoctorSlotServices
+from app.services.filter_pagination_services import FilterPaginationService
+from app.services.patient_services import PatientServices
+from app.services.prescription_services import PrescriptionServices
+from app.services.search_service import SearchService
+from app.utils.query_counter import QueryCounter
+from app.utils.report_engine import report_datasets
+from benchmarks.pagination_benchmark import seed
+import pytz
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+#allowed_fields of the list endpoints
+APPOINTMENT_FIELDS = ['doctor_id', 'patient_id', 'slot_id', 'status']
+PRESCRIPTION_FIELDS = ['doctor_id', 'patient_id', 'appointment_id']
+DOCTOR_FIELDS = ['speciality', 'id', 'next_free_slot', 'free_slots_week']
+
+#statements recorded from service calls that can be explained, savepoints are left out
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+SEED_STATEMENTS = [
+    '''
+    INSERT INTO attendances (id, user_id, date, time_in, time_out, created_at, modified_at)
+    SELECT gen_random_uuid(), users.id, day::date, day + interval '9 hours',
+        CASE WHEN day::date = current_date AND users.username LIKE '%1' THEN NULL ELSE day + interval '17 hours' END,
+        now(), now()
+    FROM users
+    CROSS JOIN generate_series(current_date - interval '89 days', current_date, interval '1 day') AS day
+    WHERE users.username LIKE 'bench%'
+    ''',
+    '''
+    INSERT INTO prescriptions (id, doctor_id, patient_id, appointment_id, prescription_obj, stored_on_cloud, created_at, modified_at)
+    SELECT gen_random_uuid(), doctor_id, patient_id, id, 'benchmark', false, now(), now()
+    FROM appointments WHERE status = 'completed'
+    ''',
+    'ANALYZE',
+]
+
+
+def seeded_rows(session):
+    '''returns ids of the seeded rows used as service parameters'''
+    doctor_user_id = session.scalar(select(User.id).where(User.username == 'benchdoctor1'))
+    patient_user_id = session.scalar(select(User.id).where(User.username == 'benchpatient1'))
+    doctor_id = session.scalar(select(Doctor.id).where(Doctor.user_id == str(doctor_user_id)))
+    patient_id = session.scalar(select(Patient.id).where(Patient.user_id == str(patient_user_id)))
+    slot_id = session.scalar(select(DoctorSlot.id).where(DoctorSlot.doctor_id == str(doctor_id), DoctorSlot.is_booked == False).limit(1))
+    return {
+        "doctor_user_id": doctor_user_id, "patient_user_id": patient_user_id,
+        "doctor_id": doctor_id, "patient_id": patient_id, "slot_id": slot_id,
+    }
+
+
+def service_calls(session, rows):
+    '''returns name -> function calling a sync service method the way its endpoint does'''
+    patient = Principal(user_id=rows["patient_user_id"], role="patient", token_type="access")
+    doctor = Principal(user_id=rows["doctor_user_id"], role="doctor", token_type="access")
+    appointments = AppointmentServices(session, Appointment)
+    prescriptions = PrescriptionServices(session, Prescription)
+    appointment_options = loading_profiles['appointment']
+    prescription_options = loading_profiles['prescription']
+
+    return {
+        "appointments": lambda: appointments.fetch_all_appointments(None, None, 'asc', 1, 20, APPOINTMENT_FIELDS, None, options=appointment_options),
+        "appointment search": lambda: appointments.fetch_all_appointments(None, None, 'asc', 1, 20, APPOINTMENT_FIELDS, "benchdoctor12", options=appointment_options),
+        "patient history": lambda: appointments.fetch_user_appointments_history(patient, None, None, 'asc', 1, 20, APPOINTMENT_FIELDS, options=appointment_options),
+        "doctor history": lambda: appointments.fetch_user_appointments_history(doctor, None, None, 'asc', 1, 20, APPOINTMENT_FIELDS, options=appointment_options),
+        "doctor upcoming": lambda: appointments.fetch_user_appointments_upcoming(doctor, None, None, 'asc', 1, 20, APPOINTMENT_FIELDS, options=appointment_options),
+        "prescriptions": lambda: prescriptions.fetch_all_prescriptions(None, None, 'asc', 1, 20, PRESCRIPTION_FIELDS, None, options=prescription_options),
+        "patient prescriptions": lambda: prescriptions.fetch_patient_prescriptions(rows["patient_id"], prescription_options),
+        "current patient": lambda: PatientServices(session, Patient).get_current_patient(patient),
+        "doctor schedule": lambda: DoctorSlotServices(session, DoctorScheduleTemplate).get_doctor_schedule(doctor),
+        "attendance time out": lambda: AttendanceServices(session, Attendance).update_user_timeout(patient),
+    }
+
+
+def service_statements(session, rows):
+    '''returns name -> statement built by the service methods, for async services and the booking'''
+    doctors = FilterPaginationService(Doctor, DOCTOR_FIELDS, session)
+    search = SearchService(session, Doctor)
+    search_records, search_filters = search.search_record("benchdoctor12", select(Doctor))
+    search_ids = doctors.build_query(None, search_records, search_filters)
+    doctor_ids = doctors.build_query(None, select(Doctor))
+    slots = DoctorSlotServices(session, DoctorSlot)
+
+    today = datetime.now(ist_timezone).date()
+    day_start = ist_timezone.localize(datetime.combine(today, datetime.min.time()))
+
+    return {
+        "doctor search": doctors.build_page_query(search_ids, None, 'asc', 1, 20, None, with_total=True, rank=search.search_rank("benchdoctor12")),
+        "doctors by free slot": doctors.build_page_query(doctor_ids, 'next_free_slot', 'asc', 1, 20, None, with_total=True),
+        "doctors count": doctors.count_query(doctor_ids),
+        "doctor free slots": slots.available_slots_statement(rows["doctor_user_id"]),
+        "doctor slots of days": slots.slot_days_statement(rows["doctor_id"], [today + timedelta(days=day) for day in range(7)]),
+        "book slot": AppointmentServices(session, Appointment).book_slot_statement(rows["slot_id"], rows["patient_user_id"]),
+        "daily report": report_datasets["appointments"].statement(day_start, day_start + timedelta(days=1)),
+        "daily doctor summary": report_datasets["doctors"].statement(day_start, day_start + timedelta(days=1)),
+    }
+
+
+def recorded_plans(conn, calls):
+    '''calls every service method and yields (name, plan) of each statement it sent, numbered when it sent several'''
+    for name, call in calls.items():
+        with QueryCounter(engine) as counter:
+            try:
+                call()
+            except HTTPException as e:
+                print(f"{name}: {e.status_code} {e.detail}, explaining the statements sent before")
+
+        recorded = [
+            (statement, parameters) for statement, parameters in zip(counter.statements, counter.parameters)
+            if statement.lstrip().split(None, 1)[0].upper() in EXPLAINABLE
+        ]
+        for number, (statement, parameters) in enumerate(recorded, 1):
+            label = name if len(recorded) == 1 else f"{name} #{number}"
+            yield label, explain_sql(conn, statement, parameters)
+
+
+def seq_scans(plan):
+    '''yields (relation, rows) of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan'''
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"], plan.get("Actual Rows", 0)
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    result = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}").scalar()
+    return result[0]["Plan"]
+
+
+def explain_sql(conn, statement, parameters):
+    '''explains a statement recorded from the driver with its driver parameters'''
+    result = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters).scalar()
+    return result[0]["Plan"]
+
+
+def main(min_rows):
+    failed = []
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            table_rows = dict(conn.execute(text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")).all())
+            session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            rows = seeded_rows(session)
+
+            plans = list(recorded_plans(conn, service_calls(session, rows)))
+            plans += [(name, explain(conn, statement)) for name, statement in service_statements(session, rows).items()]
+        finally:
+            transaction.rollback()
+
+    print(f"{'query':<30} {'ms':>8}  sequential scans")
+    for name, plan in plans:
+        scans = [relation for relation, _ in seq_scans(plan) if table_rows.get(relation, 0) >= min_rows]
+        print(f"{name:<30} {plan['Actual Total Time']:>8.2f}  {', '.join(scans) or '-'}")
+        if scans:
+            failed.append(name)
+
+    if failed:
+        print(f"sequential scans on tables with at least {min_rows} rows: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--appointments", type=int, default=1000000)
+    parser.add_argument("--min-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.appointments)
+        with engine.begin() as conn:
+            for statement in SEED_STATEMENTS:
+                conn.execute(text(statement))
+    main(args.min_rows)
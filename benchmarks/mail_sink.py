@@ -0,0 +1,47 @@
+'''
+local SMTP server that accepts and drops every mail, prints the received count and rate every second
+point the workers at it to load test booking plus notification without a real mail server:
+MAIL_TRANSPORT=smtp (or async_smtp) MAIL_SMTP_HOST=localhost MAIL_SMTP_PORT=8025 MAIL_SMTP_SSL=false MAIL_SMTP_LOGIN=false
+requires: aiosmtpd (requirements-dev.txt)
+
+usage: python -m benchmarks.mail_sink [--port 8025]
+'''
+import argparse
+import time
+from aiosmtpd.controller import Controller
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        self.sessions.add(id(session))
+        return "250 OK"
+
+
+def main(port):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="localhost", port=port)
+    controller.start()
+    print(f"mail sink listening on localhost:{port}")
+    try:
+        previous = 0
+        while True:
+            time.sleep(1)
+            received = handler.received
+            print(f"received: {received}, per second: {received - previous}, connections: {len(handler.sessions)}")
+            previous = received
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    main(args.port)
@@ -0,0 +1,90 @@
+'''
+books --bookings new slots through AppointmentServices and drains the mail outbox in this process,
+prints booking and mail throughput with the mail metrics. run offline with MAIL_TRANSPORT=sink
+(MAIL_SINK_DELAY_MS for a simulated server) or against benchmarks/mail_sink.py
+needs the doctors and patients seeded by benchmarks.pagination_benchmark --seed in DB_URL
+
+usage: MAIL_TRANSPORT=sink python -m benchmarks.notification_throughput [--bookings 1000] [--threads 8]
+'''
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.session import local_session
+from app.models.appointments import Appointment
+from app.models.patients import Patient
+from app.models.users import User
+from app.schemas.token import Principal
+from app.services.appointment_services import AppointmentServices
+from app.utils.mailer import mail_transport
+from app.utils.metrics import metrics
+from celery_app.mail_outbox import dispatch_mail_outbox
+
+CREATE_SLOTS = '''
+    INSERT INTO doctor_slots (id, doctor_id, start_time, end_time, is_booked, notes, created_at, modified_at)
+    SELECT gen_random_uuid(), doctor.id, slot.start_time, slot.start_time + interval '1 minute', false, 'notification benchmark', now(), now()
+    FROM (SELECT doctors.id FROM doctors WHERE speciality = 'benchmark' ORDER BY id LIMIT 1) AS doctor
+    CROSS JOIN LATERAL (
+        SELECT date_trunc('minute', now()) + interval '400 days' + i * interval '1 minute' AS start_time
+        FROM generate_series(1, :bookings) AS i
+    ) AS slot
+    ON CONFLICT (doctor_id, start_time) DO NOTHING
+    RETURNING id
+'''
+
+
+def patient_principals(db, total):
+    '''principals of benchmark patients, reused round robin'''
+    user_ids = [user_id for (user_id,) in db.query(User.id).join(Patient, Patient.user_id == User.id)
+                .filter(User.username.like('benchpatient%')).limit(total)]
+    principals = [Principal(user_id=user_id, role='patient', token_type='access') for user_id in user_ids]
+    return [principals[i % len(principals)] for i in range(total)]
+
+
+def book(principal, slot_id):
+    db = local_session()
+    try:
+        AppointmentServices(db, Appointment).book_patient_appointment(principal, slot_id)
+    finally:
+        db.close()
+
+
+def main(bookings, threads):
+    with engine.begin() as conn:
+        slot_ids = [slot_id for (slot_id,) in conn.execute(text(CREATE_SLOTS), {"bookings": bookings})]
+    db = local_session()
+    try:
+        principals = patient_principals(db, len(slot_ids))
+    finally:
+        db.close()
+
+    print(f"transport: {mail_transport.name}, bookings: {len(slot_ids)}, threads: {threads}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(book, principals, slot_ids))
+    booking_seconds = time.perf_counter() - start
+    print(f"booked {len(slot_ids)} in {booking_seconds:.2f}s, {len(slot_ids) / booking_seconds:.0f} per second")
+
+    start = time.perf_counter()
+    dispatch_mail_outbox()
+    dispatch_seconds = time.perf_counter() - start
+    mail_transport.close()
+
+    snapshot = metrics.snapshot()
+    sent = snapshot["counters"].get("mail_outbox_sent", 0)
+    print(f"sent {sent} mails in {dispatch_seconds:.2f}s, {sent / dispatch_seconds:.0f} per second")
+    for name, timing in snapshot["timings"].items():
+        if name.startswith(("mail_", "smtp_")):
+            print(f"{name}: avg {timing['avg']:.4f}, max {timing['max']:.4f}, count {timing['count']}")
+    for name, value in snapshot["gauges"].items():
+        if name.startswith("mail_"):
+            print(f"{name}: {value:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    main(args.bookings, args.threads)
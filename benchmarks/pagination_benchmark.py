@@ -0,0 +1,162 @@
+'''
+compares round trips and latency of FilterPaginationService with a separate count query
+and with the total fetched by COUNT(*) OVER () in the page query
+runs against the database in DB_URL, --seed inserts benchmark doctors, patients, slots and appointments first
+
+usage: python -m benchmarks.pagination_benchmark [--seed] [--appointments 1000000] [--iterations 20]
+'''
+import argparse
+import statistics
+import time
+from datetime import datetime
+from sqlalchemy import text
+from app.config.config import PARTITION_MONTHS_AHEAD
+from app.db.database import engine
+from app.db.session import local_session
+from app.models.appointments import Appointment
+from app.models.doctor_slots import DoctorSlot
+from app.models.patients import Patient
+from app.models.users import User
+from app.services.filter_pagination_services import FilterPaginationService
+from app.services.search_service import SearchService
+from app.utils.query_counter import QueryCounter
+from celery_app.partition_maintenance import add_months, create_month_partitions
+import pytz
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+ALLOWED_FIELDS = ['status', 'created_at', 'id', 'doctor_id', 'patient_id']
+
+SEED_STATEMENTS = [
+    '''
+    INSERT INTO users (id, username, hashed_password, first_name, email, phone, role, created_at, modified_at)
+    SELECT gen_random_uuid(), 'benchdoctor' || i, 'benchmark', 'Bench', 'benchdoctor' || i || '@bench.local',
+        (9000000000 + i)::text, 'doctor', now(), now()
+    FROM generate_series(1, :doctors) AS i
+    ''',
+    '''
+    INSERT INTO users (id, username, hashed_password, first_name, email, phone, role, created_at, modified_at)
+    SELECT gen_random_uuid(), 'benchpatient' || i, 'benchmark', 'Bench', 'benchpatient' || i || '@bench.local',
+        (8000000000 + i)::text, 'patient', now(), now()
+    FROM generate_series(1, :patients) AS i
+    ''',
+    '''
+    INSERT INTO doctors (id, user_id, speciality, created_at, modified_at)
+    SELECT gen_random_uuid(), id, 'benchmark', now(), now() FROM users WHERE username LIKE 'benchdoctor%'
+    ''',
+    '''
+    INSERT INTO patients (id, user_id, created_at, modified_at)
+    SELECT gen_random_uuid(), id, now(), now() FROM users WHERE username LIKE 'benchpatient%'
+    ''',
+    '''
+    INSERT INTO doctor_slots (id, doctor_id, start_time, end_time, is_booked, notes, created_at, modified_at)
+    SELECT gen_random_uuid(), d.ids[1 + i % d.total],
+        CAST(:window_start AS timestamptz) + (i - 1) * (CAST(:window_end AS timestamptz) - CAST(:window_start AS timestamptz)) / :appointments,
+        CAST(:window_start AS timestamptz) + (i - 1) * (CAST(:window_end AS timestamptz) - CAST(:window_start AS timestamptz)) / :appointments + interval '30 minutes',
+        true, 'benchmark', now(), now()
+    FROM generate_series(1, :appointments) AS i,
+        (SELECT array_agg(id) AS ids, count(*) AS total FROM doctors WHERE speciality = 'benchmark') AS d
+    ''',
+    '''
+    INSERT INTO appointments (id, doctor_id, patient_id, slot_id, slot_start_time, status, is_mail_sent, created_at, modified_at)
+    SELECT gen_random_uuid(), s.doctor_id, p.ids[1 + s.n % p.total], s.id, s.start_time,
+        (ARRAY['booked', 'cancelled', 'completed'])[1 + s.n % 3], true, now() - s.n * interval '1 second', now()
+    FROM (SELECT id, doctor_id, start_time, row_number() OVER () AS n FROM doctor_slots WHERE notes = 'benchmark') AS s,
+        (SELECT array_agg(patients.id) AS ids, count(*) AS total FROM patients
+            JOIN users ON users.id = patients.user_id WHERE users.username LIKE 'benchpatient%') AS p
+    ''',
+    'ANALYZE',
+]
+
+
+def seed_months():
+    '''
+    months of the seeded slots, PARTITION_MONTHS_AHEAD months before and after the current month. slots outside of
+    them would land in the default partitions, where they make create_partitions fail for their months later on
+    '''
+    current_month = datetime.now(ist_timezone).date().replace(day=1)
+    return [add_months(current_month, offset) for offset in range(-PARTITION_MONTHS_AHEAD, PARTITION_MONTHS_AHEAD + 1)]
+
+
+def seed(appointments):
+    '''
+    inserts benchmark rows with set based statements, 100 doctors and 1000 patients share the appointments.
+    partitions of the seeded months are created first, the slots are spread evenly over those months
+    '''
+    months = seed_months()
+    print(f"seeding {appointments} appointments from {months[0]} to {months[-1]}")
+    session = local_session()
+    try:
+        create_month_partitions(session, months)
+    finally:
+        session.close()
+
+    parameters = {
+        "doctors": 100, "patients": 1000, "appointments": appointments,
+        "window_start": ist_timezone.localize(datetime.combine(months[0], datetime.min.time())),
+        "window_end": ist_timezone.localize(datetime.combine(add_months(months[-1], 1), datetime.min.time())),
+    }
+    with engine.begin() as conn:
+        for statement in SEED_STATEMENTS:
+            conn.execute(text(statement), parameters)
+
+
+def scenarios(db):
+    '''returns name -> function building the unfiltered records of list endpoints'''
+    patient_user_id = db.query(User.id).filter(User.username == 'benchpatient1').scalar()
+
+    def all_appointments():
+        return db.query(Appointment), None
+
+    def patient_history():
+        records = db.query(Appointment).join(Patient).join(DoctorSlot).filter(
+            Patient.user_id == patient_user_id,
+            DoctorSlot.start_time <= datetime.now()
+        )
+        return records, None
+
+    def search():
+        return SearchService(db, Appointment).search_record("book")
+
+    return {"all": all_appointments, "history": patient_history, "search": search}
+
+
+def run(db, build_records, window_count, page, count, iterations):
+    '''returns round trips of one call and latencies of all calls in ms'''
+    FilterPaginationService.window_count = window_count
+    obj = FilterPaginationService(Appointment, ALLOWED_FIELDS, db)
+    latencies = []
+    for _ in range(iterations):
+        records, search_filters = build_records()
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            obj.apply_filter_pagination(None, 'created_at', 'desc', page, 20, records, search_filters, count=count)
+            latencies.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()
+    return counter.count, latencies
+
+
+def main(iterations):
+    db = local_session()
+    try:
+        print(f"{'scenario':<10} {'page':>5} {'count':<8} {'mode':<14} {'round trips':>11} {'mean ms':>9} {'p95 ms':>9}")
+        for name, build_records in scenarios(db).items():
+            for page, count in [(1, "exact"), (500, "exact"), (1, "none")]:
+                for mode, window_count in [("separate", False), ("window", True)]:
+                    round_trips, latencies = run(db, build_records, window_count, page, count, iterations)
+                    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+                    print(f"{name:<10} {page:>5} {count:<8} {mode:<14} {round_trips:>11} {statistics.mean(latencies):>9.1f} {p95:>9.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--appointments", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.appointments)
+    main(args.iterations)
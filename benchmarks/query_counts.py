@@ -0,0 +1,60 @@
+'''
+checks that list and detail endpoints load a page with a fixed number of queries
+requests go through main.app with RBAC bypassed, records are read from the database in DB_URL
+so it needs at least one patient with appointments and one prescription
+
+usage: python -m benchmarks.query_counts
+'''
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.config.settings import settings
+from app.db.database import engine, async_engine
+from app.db.session import local_session
+from app.models.patients import Patient
+from app.models.prescriptions import Prescription
+from app.models.users import User
+from app.utils.helper import create_token
+from app.utils.query_counter import assert_query_count
+from main import app
+
+settings.TESTING = True
+
+#(path, expected queries) per endpoint, expected counts do not depend on the page size
+def endpoints(db):
+    prescription = db.query(Prescription).first()
+    return [
+        ("/appointments/?limit=20", 1),
+        ("/appointments/?limit=20&page=2&count=estimate", 1),
+        ("/appointments/?limit=20&count=none", 1),
+        ("/appointments/me/history?limit=20", 1),
+        ("/appointments/me/upcoming?limit=20", 1),
+        ("/prescriptions/?limit=20", 1),
+        (f"/prescriptions/patient/{prescription.patient_id}", 1),
+        (f"/prescriptions/{prescription.id}", 1),
+        ("/doctors/?limit=20", 1),
+        ("/doctors/slots?limit=20", 2),
+    ]
+
+
+def main():
+    db = local_session()
+    try:
+        patient_user = db.query(User).join(Patient, Patient.user_id == User.id).first()
+        token = create_token({'user_id': str(patient_user.id), 'role': 'patient'}, expiry=timedelta(minutes=30))
+        paths = endpoints(db)
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    for path, expected in paths:
+        # doctors endpoints use the async engine
+        target = async_engine.sync_engine if path.startswith("/doctors") else engine
+        with assert_query_count(target, expected) as counter:
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, f"{path}: {response.status_code} {response.text}"
+        print(f"{path:<60} queries: {counter.count}")
+
+
+if __name__ == "__main__":
+    main()
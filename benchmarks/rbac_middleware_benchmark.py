@@ -0,0 +1,106 @@
+'''
+compares requests/sec of RBACMiddleware (BaseHTTPMiddleware) and RBACASGIMiddleware wrapped around main.app
+requests are sent in-process through the ASGI interface, RBAC rules are built in memory so no database is needed
+
+usage: python -m benchmarks.rbac_middleware_benchmark [requests] [concurrency]
+'''
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+os.environ.setdefault("DB_URL", "postgresql://localhost/benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("TOKEN_ALGORITHM", "HS256")
+
+from main import app
+from app.middleware.rbacmiddleware import RBACMiddleware, RBACASGIMiddleware
+from app.middleware.rbac_rules import rbac_rules
+from app.utils.helper import create_token
+
+
+@app.get("/benchmark/ping")
+async def benchmark_ping():
+    return {"ping": "pong"}
+
+# benchmark wraps main.app itself, so the middleware added in main.py is removed from its stack
+app.user_middleware = [middleware for middleware in app.user_middleware if middleware.cls is not RBACASGIMiddleware]
+app.middleware_stack = None
+
+rbac_rules.build([
+    ("/benchmark/ping", ["GET"], ["patient"]),
+    ("/appointments/", ["GET"], ["nurse"]),
+])
+
+token = create_token({'user_id': str(uuid.uuid4()), 'role': 'patient'}, expiry=timedelta(minutes=30))
+
+CASES = {
+    "allowed": "/benchmark/ping",
+    "forbidden": "/appointments/",
+    "bypass": "/openapi.json",
+}
+
+
+async def call(asgi_app, path):
+    '''sends one GET request to asgi app and returns the response status'''
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"host", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await asgi_app(scope, receive, send)
+    return status.get("code")
+
+
+async def run_case(asgi_app, path, total, concurrency):
+    '''sends total requests with fixed concurrency, returns requests per second'''
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            return await call(asgi_app, path)
+
+    await asyncio.gather(*(limited() for _ in range(min(total, 100))))
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(limited() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, set(statuses)
+
+
+async def main(total, concurrency):
+    middlewares = {
+        "BaseHTTPMiddleware": RBACMiddleware(app),
+        "ASGI": RBACASGIMiddleware(app),
+    }
+    print(f"requests: {total}, concurrency: {concurrency}")
+    for case, path in CASES.items():
+        for name, asgi_app in middlewares.items():
+            rps, statuses = await run_case(asgi_app, path, total, concurrency)
+            print(f"{case:<10} {name:<20} {rps:>10.0f} req/s  status: {sorted(statuses)}")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(total, concurrency))
@@ -0,0 +1,80 @@
+'''
+checks that a 10:00 - 11:00 schedule template produces exactly one slot at 10:00+05:30, whatever the time zone
+of the database session is. for every time zone the template is added to one doctor, the doctor's slots of the day
+are cleared and generate_slots runs in a transaction that is rolled back, nothing is left in the database
+needs at least one doctor in DB_URL
+
+usage: python -m benchmarks.slot_timezone_check [--days-ahead 30]
+'''
+import argparse
+import sys
+from datetime import datetime, time, timedelta
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+from app.db.database import engine
+from app.models.doctor import Doctor
+from app.models.doctor_schedule import DoctorScheduleTemplate
+from app.models.doctor_slots import DoctorSlot
+from app.services.doctor_slots_services import DoctorSlotServices
+import pytz
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+SESSION_TIME_ZONES = ["UTC", "Asia/Kolkata", "America/New_York", "Pacific/Kiritimati"]
+
+
+def generated_slots(session_time_zone, day):
+    '''start times of the slots generated for day from a 10:00 - 11:00 template'''
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text(f"SET LOCAL TIME ZONE '{session_time_zone}'"))
+            session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            doctor_id = session.scalar(select(Doctor.id).order_by(Doctor.id).limit(1))
+            day_start = ist_timezone.localize(datetime.combine(day, time.min))
+
+            session.execute(delete(DoctorScheduleTemplate).where(DoctorScheduleTemplate.doctor_id == str(doctor_id)))
+            session.execute(delete(DoctorSlot).where(
+                DoctorSlot.doctor_id == str(doctor_id),
+                DoctorSlot.start_time >= day_start - timedelta(days=1),
+                DoctorSlot.start_time < day_start + timedelta(days=2)
+            ))
+            session.add(DoctorScheduleTemplate(
+                doctor_id=str(doctor_id), weekday=day.weekday(), start_time=time(10), end_time=time(11), slot_minutes=60
+            ))
+            session.flush()
+
+            DoctorSlotServices(session, DoctorSlot).generate_slots(day, day, doctor_id=doctor_id)
+            return session.scalars(
+                select(DoctorSlot.start_time).where(
+                    DoctorSlot.doctor_id == str(doctor_id),
+                    DoctorSlot.start_time >= day_start - timedelta(days=1),
+                    DoctorSlot.start_time < day_start + timedelta(days=2)
+                )
+            ).all()
+        finally:
+            transaction.rollback()
+
+
+def main(days_ahead):
+    day = datetime.now(ist_timezone).date() + timedelta(days=days_ahead)
+    expected = ist_timezone.localize(datetime.combine(day, time(10)))
+
+    failed = []
+    for session_time_zone in SESSION_TIME_ZONES:
+        start_times = generated_slots(session_time_zone, day)
+        ok = start_times == [expected]
+        print(f"{session_time_zone:<20} {'ok' if ok else 'wrong'}  {', '.join(str(value.astimezone(ist_timezone)) for value in start_times) or '-'}")
+        if not ok:
+            failed.append(session_time_zone)
+
+    if failed:
+        print(f"expected one slot at {expected}, session time zones with wrong slots: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days-ahead", type=int, default=30)
+    args = parser.parse_args()
+    main(args.days_ahead)
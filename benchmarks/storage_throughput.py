@@ -0,0 +1,61 @@
+'''
+uploads --objects spooled files of --size-mb through the configured storage backend and prints upload throughput
+with the storage metrics, then checks that no temp files were left behind in the temp directory.
+run offline with STORAGE_BACKEND=local, or against MinIO with STORAGE_S3_ENDPOINT_URL=http://localhost:9000
+(bucket yash-jogi-prescription-bkt, ACCESS_KEY and SECRET_ACCESS_KEY of the MinIO user)
+
+usage: STORAGE_BACKEND=local python -m benchmarks.storage_throughput [--objects 50] [--size-mb 20] [--threads 4]
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.config.config import REPORT_SPOOL_MAX_MB
+from app.utils.metrics import metrics
+from app.utils.storage import storage, MB
+
+
+def upload(size_mb, block):
+    '''writes size_mb into a spooled file like the report writers do and uploads it'''
+    key = f"benchmarks/{uuid.uuid4()}.bin"
+    with tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_MB * MB) as file:
+        for _ in range(size_mb):
+            file.write(block)
+        file.seek(0)
+        storage.upload_fileobj(file, key, "application/octet-stream")
+    return key
+
+
+def main(objects, size_mb, threads):
+    block = os.urandom(MB)
+    temp_files = set(os.listdir(tempfile.gettempdir()))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        keys = list(executor.map(lambda _: upload(size_mb, block), range(objects)))
+    seconds = time.perf_counter() - start
+
+    print(f"{storage.name}: uploaded {len(keys)} objects of {size_mb} MB in {seconds:.2f}s, {len(keys) * size_mb / seconds:.1f} MB/s")
+    for name, timing in metrics.snapshot()["timings"].items():
+        if name.startswith("storage_"):
+            print(f"{name}: avg {timing['avg']:.4f}, max {timing['max']:.4f}, count {timing['count']}")
+
+    left = set(os.listdir(tempfile.gettempdir())) - temp_files
+    if storage.name == "local":
+        #partial objects of LocalStorage are written next to the target
+        left |= {str(path) for path in storage.root.rglob(".upload-*")}
+    if left:
+        print(f"temp files left behind: {', '.join(sorted(left))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    main(args.objects, args.size_mb, args.threads)
@@ -1,13 +1,15 @@
-
 from celery_app.task import c_app
 from celery import shared_task
+from sqlalchemy import text
 from datetime import datetime, timedelta
 from app.db.session import local_session
-from app.models.doctor import Doctor
 from app.models.doctor_slots import DoctorSlot
+from app.services.doctor_slots_services import DoctorSlotServices
 from app.utils.logging import Logging
-from sqlalchemy.orm import joinedload
+from app.utils.metrics import metrics
+from app.config.config import SLOT_GENERATION_DAYS
 import pytz
+import time
 
 logger = Logging(__name__).get_logger()
 ist = pytz.timezone("Asia/Kolkata")
@@ -15,55 +17,80 @@ ist = pytz.timezone("Asia/Kolkata")
 
 @c_app.task(name="celery_app.doctor_slots.generate_future_doctor_slots")
 def generate_future_doctor_slots():
+    '''
+    generates slots of all doctors from their schedule templates for today and next SLOT_GENERATION_DAYS days,
+    one INSERT ... SELECT over generate_series, slots that already exist are skipped
+    '''
     session = local_session()
+    start = time.perf_counter()
     try:
-        logger.info("Generating doctor slots for next 5 days...")
-
-        doctors = session.query(Doctor).options(joinedload(Doctor.available_slots)).all()
-        current_day = datetime.now(ist).replace(minute=0, second=0, microsecond=0)
-        max_day = current_day + timedelta(days=5)
+        logger.info(f"Generating doctor slots for next {SLOT_GENERATION_DAYS} days...")
 
-        for doctor in doctors:
-            # Get the latest slot
-            latest_slot = (
-                session.query(DoctorSlot)
-                .filter(DoctorSlot.doctor_id == doctor.id)
-                .order_by(DoctorSlot.start_time.desc())
-                .first()
-            )
+        current_day = datetime.now(ist).date()
+        max_day = current_day + timedelta(days=SLOT_GENERATION_DAYS)
 
-            # Determine the starting date
-            last_slot_day = latest_slot.start_time if latest_slot else current_day - timedelta(days=1)
-            slot_start_day = max(last_slot_day + timedelta(days=1), current_day)
+        obj = DoctorSlotServices(session, DoctorSlot)
+        inserted = obj.generate_slots(current_day, max_day)
 
-            while slot_start_day.date() <= max_day.date():
-                slot_hour = slot_start_day.replace(hour=10)
-                slot_end_hour = slot_start_day.replace(hour=18)
+        elapsed = time.perf_counter() - start
+        metrics.observe("slot_generation_seconds", elapsed)
+        metrics.increment("slot_generation_rows_inserted", inserted)
+        logger.info(f"All future doctor slots generated successfully, inserted: {inserted}, seconds: {elapsed:.2f}")
+    except Exception as e:
+        session.rollback()
+        metrics.increment("slot_generation_failures")
+        logger.error(f"Error during doctor slot generation: {e}")
+    finally:
+        session.close()
 
-                while slot_hour < slot_end_hour:
-                    # Check if this slot already exists (avoid duplication)
-                    existing_slot = session.query(DoctorSlot).filter(
-                        DoctorSlot.doctor_id == doctor.id,
-                        DoctorSlot.start_time == slot_hour
-                    ).first()
 
-                    if not existing_slot:
-                        new_slot = DoctorSlot(
-                            doctor_id=doctor.id,
-                            start_time=slot_hour,
-                            end_time=slot_hour + timedelta(hours=1)
-                        )
-                        session.add(new_slot)
-                        logger.debug(f"Created slot: {slot_hour} for Doctor: {doctor.id}")
+@c_app.task(name="celery_app.doctor_slots.refresh_doctor_search")
+def refresh_doctor_search():
+    '''
+    rebuilds all doctor_search documents, triggers and the queue keep them current on changes
+    but next_free_slot and free_slots_week also change as slots pass and a new week starts
+    '''
+    session = local_session()
+    start = time.perf_counter()
+    try:
+        session.execute(text("SELECT refresh_doctor_search(NULL)"))
+        session.commit()
 
-                    slot_hour += timedelta(hours=1)
+        elapsed = time.perf_counter() - start
+        metrics.observe("doctor_search_refresh_seconds", elapsed)
+        logger.info(f"Doctor search documents refreshed, seconds: {elapsed:.2f}")
+    except Exception as e:
+        session.rollback()
+        metrics.increment("doctor_search_refresh_failures")
+        logger.error(f"Error during doctor search refresh: {e}")
+    finally:
+        session.close()
 
-                slot_start_day += timedelta(days=1)
 
+@c_app.task(name="celery_app.doctor_slots.refresh_queued_doctor_search")
+def refresh_queued_doctor_search():
+    '''
+    refreshes the doctor_search rows of doctors queued by slot inserts, bookings, cancellations and deletes.
+    queued rows are deleted and refreshed in one transaction, rows queued meanwhile wait for the next run
+    '''
+    session = local_session()
+    start = time.perf_counter()
+    try:
+        refreshed = session.execute(text("""
+            WITH queued AS (DELETE FROM doctor_search_queue RETURNING doctor_id),
+            doctors AS (SELECT ARRAY(SELECT DISTINCT doctor_id FROM queued) AS doctor_ids)
+            SELECT cardinality(doctor_ids), refresh_doctor_search(doctor_ids) FROM doctors
+        """)).scalar()
         session.commit()
-        logger.info("All future doctor slots generated successfully.")
+
+        elapsed = time.perf_counter() - start
+        metrics.observe("doctor_search_queue_refresh_seconds", elapsed)
+        metrics.increment("doctor_search_queue_doctors_refreshed", refreshed)
+        if refreshed:
+            logger.info(f"Doctor search documents of {refreshed} queued doctors refreshed, seconds: {elapsed:.2f}")
     except Exception as e:
         session.rollback()
-        logger.error(f"Error during doctor slot generation: {e}")
+        metrics.increment("doctor_search_refresh_failures")
+        logger.error(f"Error during queued doctor search refresh: {e}")
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -0,0 +1,152 @@
+from celery_app.task import c_app
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from app.config.config import MAIL_OUTBOX_BATCH_SIZE, MAIL_OUTBOX_MAX_ATTEMPTS, MAIL_OUTBOX_RETRY_SECONDS
+from app.config.loading_profiles import loading_profiles
+from app.db.session import local_session
+from app.models.appointments import Appointment
+from app.models.mail_outbox import MailOutbox
+from app.utils.logging import Logging
+from app.utils.mailer import build_message, mail_transport
+from app.utils.metrics import metrics
+import pytz
+import time
+
+logger = Logging(__name__).get_logger()
+ist = pytz.timezone("Asia/Kolkata")
+
+
+def appointment_booked_mail(appointment):
+    '''returns (to_mail, subject, body) of the booking confirmation'''
+    return (
+        appointment.patient.user.email,
+        "Appointment booked ",
+        f"Dear {appointment.patient.user.first_name}, \nYour appointment is booked with doctor {appointment.doctor.user.first_name} {appointment.doctor.user.last_name}\nAppointment id: {appointment.id} \nTime: {appointment.slot.start_time}   \n\n\nThank you,\nOnline Appointment Booking System",
+    )
+
+#outbox kind -> function returning (to_mail, subject, body) for the appointment of the mail
+mail_builders = {
+    "appointment_booked": appointment_booked_mail,
+}
+
+
+def retry_at(attempts, current_time):
+    '''exponential backoff from MAIL_OUTBOX_RETRY_SECONDS'''
+    return current_time + timedelta(seconds=MAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1))
+
+
+#connection failures in a row of this worker process, dispatching pauses until paused_until after each one
+connection_backoff = {"failures": 0, "paused_until": None}
+
+
+def dispatch_batch(session):
+    '''
+    sends one batch of due pending mails, rows are locked with SKIP LOCKED so parallel dispatchers take different mails.
+    appointments of the batch are loaded in one query, sent mails and their appointments are updated in bulk.
+    a connection error of the transport stops the batch, the mails not sent yet are left as they are
+    returns: number of mails in the batch, 0 when the batch was stopped
+    '''
+    current_time = datetime.now(ist)
+    mails = session.scalars(
+        select(MailOutbox)
+        .where(MailOutbox.status == "pending", MailOutbox.next_attempt_at <= current_time)
+        .order_by(MailOutbox.next_attempt_at)
+        .limit(MAIL_OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not mails:
+        session.commit()
+        return 0
+    # wait of the oldest due mail in this batch
+    metrics.set_gauge("mail_outbox_queue_lag_seconds", (current_time - mails[0].next_attempt_at).total_seconds())
+
+    appointments = session.scalars(
+        select(Appointment)
+        .options(*loading_profiles['appointment'])
+        .where(Appointment.id.in_([mail.appointment_id for mail in mails]))
+    ).unique().all()
+    appointments = {str(appointment.id): appointment for appointment in appointments}
+
+    sent = []
+    connection_error = None
+    for mail in mails:
+        appointment = appointments.get(str(mail.appointment_id))
+        try:
+            if appointment is None:
+                raise LookupError(f"appointment {mail.appointment_id} not found")
+            mail_transport.send(build_message(*mail_builders[mail.kind](appointment)))
+            sent.append(mail)
+            metrics.observe("mail_delivery_latency_seconds", (datetime.now(ist) - mail.queued_at).total_seconds())
+        except Exception as e:
+            if mail_transport.is_connection_error(e):
+                connection_error = e
+                break
+            mail.attempts += 1
+            mail.last_error = str(e)[:500]
+            if mail.attempts >= MAIL_OUTBOX_MAX_ATTEMPTS or appointment is None:
+                mail.status = "failed"
+                metrics.increment("mail_outbox_failed")
+                logger.error(f"Mail {mail.id} failed after {mail.attempts} attempts: {e}")
+            else:
+                mail.next_attempt_at = retry_at(mail.attempts, current_time)
+                metrics.increment("mail_outbox_retried")
+                logger.warning(f"Mail {mail.id} failed, retrying at {mail.next_attempt_at}: {e}")
+
+    if sent:
+        session.execute(
+            update(MailOutbox)
+            .where(MailOutbox.id.in_([mail.id for mail in sent]))
+            .values(status="sent", sent_at=current_time, last_error=None, attempts=MailOutbox.attempts + 1),
+            execution_options={"synchronize_session": False}
+        )
+        session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_([mail.appointment_id for mail in sent]))
+            .values(is_mail_sent=True, modified_at=current_time),
+            execution_options={"synchronize_session": False}
+        )
+    session.commit()
+
+    metrics.increment("mail_outbox_sent", len(sent))
+    if connection_error is not None:
+        back_off(connection_error, current_time)
+        return 0
+    connection_backoff["failures"] = 0
+    return len(mails)
+
+
+def back_off(error, current_time):
+    '''pauses dispatching of this worker process with the retry backoff of the mails, at most MAIL_OUTBOX_MAX_ATTEMPTS steps'''
+    connection_backoff["failures"] += 1
+    connection_backoff["paused_until"] = retry_at(min(connection_backoff["failures"], MAIL_OUTBOX_MAX_ATTEMPTS), current_time)
+    metrics.increment("mail_outbox_connection_failures")
+    logger.error(f"Mail transport connection failed, dispatching paused until {connection_backoff['paused_until']}: {error}")
+
+
+@c_app.task(name="celery_app.mail_outbox.dispatch_mail_outbox")
+def dispatch_mail_outbox():
+    '''drains due outbox mails batch by batch through the worker's mail transport'''
+    paused_until = connection_backoff["paused_until"]
+    if paused_until is not None and datetime.now(ist) < paused_until:
+        logger.debug(f"Mail outbox dispatch paused until {paused_until}")
+        return
+
+    session = local_session()
+    start = time.perf_counter()
+    total = 0
+    try:
+        while True:
+            count = dispatch_batch(session)
+            total += count
+            if count < MAIL_OUTBOX_BATCH_SIZE:
+                break
+
+        metrics.observe("mail_outbox_dispatch_seconds", time.perf_counter() - start)
+        if total:
+            logger.info(f"Mail outbox dispatched {total} mails in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        session.rollback()
+        metrics.increment("mail_outbox_dispatch_failures")
+        logger.error(f"Error during mail outbox dispatch: {e}")
+    finally:
+        session.close()
@@ -0,0 +1,122 @@
+from celery_app.task import c_app
+from datetime import date, datetime
+from sqlalchemy import text
+from app.db.session import local_session
+from app.utils.logging import Logging
+from app.utils.metrics import metrics
+from app.config.config import PARTITION_MONTHS_AHEAD, PARTITION_RETENTION_MONTHS
+import pytz
+import time
+
+logger = Logging(__name__).get_logger()
+ist = pytz.timezone("Asia/Kolkata")
+
+# appointments reference doctor_slots, so appointments partitions are detached first
+PARTITIONED_TABLES = ["doctor_slots", "appointments"]
+ARCHIVE_SCHEMA = "archive"
+
+
+def add_months(month, count):
+    '''first day of the month count months after month'''
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def create_partitions(session, current_month):
+    '''creates missing monthly partitions from the current month up to PARTITION_MONTHS_AHEAD, returns number created'''
+    return create_month_partitions(session, [add_months(current_month, offset) for offset in range(PARTITION_MONTHS_AHEAD + 1)])
+
+
+def create_month_partitions(session, months):
+    '''creates missing partitions of every partitioned table for the first days of months, returns number created'''
+    created = 0
+    for table in PARTITIONED_TABLES:
+        for month in months:
+            name = partition_name(table, month)
+            if session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                continue
+
+            # fails when the default partition already holds rows of this month, the month is left to the default partition.
+            # bounds are IST midnight with explicit offset, the session time zone would shift them otherwise
+            try:
+                with session.begin_nested():
+                    session.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{month} 00:00+05:30') TO ('{add_months(month, 1)} 00:00+05:30')"
+                    ))
+                created += 1
+                logger.info(f"Partition {name} created")
+            except Exception as e:
+                metrics.increment("partition_create_failures")
+                logger.error(f"Unable to create partition {name}: {e}")
+    session.commit()
+    return created
+
+
+def archive_partitions(session, current_month):
+    '''
+    detaches monthly partitions older than PARTITION_RETENTION_MONTHS and moves them to the archive schema,
+    the detached appointments partition loses its foreign key to doctor_slots so the slots partition can be detached as well
+    returns number of archived partitions
+    '''
+    oldest_kept = add_months(current_month, -PARTITION_RETENTION_MONTHS)
+    session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+    archived = 0
+    for table in reversed(PARTITIONED_TABLES):
+        partitions = session.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table AND child.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+        """), {"table": table}).scalars().all()
+
+        for name in sorted(partitions):
+            month = date(int(name[-7:-3]), int(name[-2:]), 1)
+            if month >= oldest_kept:
+                continue
+
+            session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            foreign_keys = session.execute(text("""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = CAST(:name AS regclass) AND confrelid = CAST('doctor_slots' AS regclass) AND contype = 'f'
+            """), {"name": name}).scalars().all()
+            for foreign_key in foreign_keys:
+                session.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{foreign_key}"'))
+            session.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            session.commit()
+
+            archived += 1
+            logger.info(f"Partition {name} detached and moved to schema {ARCHIVE_SCHEMA}")
+    return archived
+
+
+@c_app.task(name="celery_app.partition_maintenance.maintain_partitions")
+def maintain_partitions():
+    '''
+    keeps monthly partitions of doctor_slots and appointments ahead of slot generation
+    and archives partitions older than PARTITION_RETENTION_MONTHS
+    '''
+    session = local_session()
+    start = time.perf_counter()
+    try:
+        current_month = datetime.now(ist).date().replace(day=1)
+        created = create_partitions(session, current_month)
+        archived = archive_partitions(session, current_month)
+
+        metrics.increment("partitions_created", created)
+        metrics.increment("partitions_archived", archived)
+        metrics.observe("partition_maintenance_seconds", time.perf_counter() - start)
+        logger.info(f"Partition maintenance done, created: {created}, archived: {archived}")
+    except Exception as e:
+        session.rollback()
+        metrics.increment("partition_maintenance_failures")
+        logger.error(f"Error during partition maintenance: {e}")
+    finally:
+        session.close()
+
@@ -1,134 +1,67 @@
 from app.db.session import local_session
-from app.models.appointments import Appointment
-from app.models.doctor_slots import DoctorSlot
-from app.models.doctor import Doctor
-from app.models.patients import Patient
+from app.config.config import REPORT_DATASETS, REPORT_FORMATS
+from app.utils.report_engine import ReportPeriod, report_periods, generate_report, parse_report_date
 from celery_app.task import c_app
 from app.utils.logging import Logging
 from datetime import datetime, timedelta
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from app.config.aws_config import s3, bucket_name
-from botocore.exceptions import NoCredentialsError
-import os
 import pytz
 
 ist_timezone = pytz.timezone('Asia/Kolkata')
 
 logging = Logging(__name__).get_logger()
 
+
+def run_reports(period, datasets=None, formats=None):
+    '''generates every dataset of the period in every format, files go straight to storage under reports/'''
+    datasets = datasets or REPORT_DATASETS
+    formats = formats or REPORT_FORMATS
+    session = local_session()
+    try:
+        for dataset in datasets:
+            keys = generate_report(session, period, dataset, formats)
+            logging.debug(f"Reports uploaded: {keys}")
+    finally:
+        session.close()
+
+
 @c_app.task(name="celery_app.report_task.generate_daily_appointment_report")
 def generate_daily_appointment_report():
     try:
         logging.info("Started generate_daily_appointment_report method")
-        output_dir = "app/reports"
-        os.makedirs(output_dir, exist_ok=True)
-
-        today = datetime.now(ist_timezone).date()
-        filename = f"daily_appointment_report_{today}.pdf"
-        file_path = os.path.join(output_dir, filename)
-
-        pdf = canvas.Canvas(file_path, pagesize=A4)
-        width, height = A4
-
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(50, height - 50, "Daily Appointment Report")
-
-        pdf.setFont("Helvetica", 12)
-
-        session = local_session()
-        start_time = datetime.combine(today, datetime.min.time())
-        end_time = datetime.combine(today, datetime.max.time())
-
-        appointments = session.query(Appointment).join(DoctorSlot).filter(DoctorSlot.start_time >= start_time, DoctorSlot.end_time <= end_time).all()
-        total_appointments = len(appointments)
-
-        pdf.drawString(50, height - 100, f"Date: {today.strftime('%Y-%m-%d')}")
-        pdf.drawString(50, height - 120, f"Total Appointments: {total_appointments}")
-
-        y = height - 150
-        for i, appt in enumerate(appointments, start=1):
-            doctor_name = appt.doctor.user.first_name + " " + (appt.doctor.user.last_name or "")
-            patient_name = appt.patient.user.first_name + " " + (appt.patient.user.last_name or "")
-            pdf.drawString(50, y, f"{i}. {appt.slot.start_time.strftime('%H:%M')} - Dr. {doctor_name} with {patient_name}")
-            y -= 20
-            if y < 100:
-                pdf.showPage()
-                pdf.setFont("Helvetica", 12)
-                y = height - 50
-
-        pdf.save()
-        logging.info("Daily appointment report generated successfully.")
-        logging.debug(f"File saved at: {file_path}")
-
-        try:
-            logging.info(f"Attempting to upload report object to s3 bucket")
-            with open(file_path, "rb") as f:
-                s3.upload_fileobj(f, bucket_name, 'reports/'+filename)
-        except NoCredentialsError:
-            logging.error(f"NoCredentialsError occured during file upload to s3")
-
+        run_reports(ReportPeriod.daily(datetime.now(ist_timezone).date()))
     except Exception as e:
         logging.exception("Error during daily appointment report generation.")
-    finally:
-        session.close()
 
 @c_app.task(name="celery_app.report_task.generate_weekly_appointment_report")
 def generate_weekly_appointment_report():
     try:
         logging.info("Started generate_weekly_appointment_report method")
-        output_dir = "app/reports"
-        os.makedirs(output_dir, exist_ok=True)
-
-        today = datetime.now(ist_timezone).date()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-
-        filename = f"weekly_appointment_report_{week_start}_to_{week_end}.pdf"
-        file_path = os.path.join(output_dir, filename)
-
-        pdf = canvas.Canvas(file_path, pagesize=A4)
-        width, height = A4
-
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(50, height - 50, "Weekly Appointment Report")
-
-        pdf.setFont("Helvetica", 12)
-
-        session = local_session()
-        start_time = datetime.combine(week_start, datetime.min.time())
-        end_time = datetime.combine(week_end, datetime.max.time())
-
-        appointments = session.query(Appointment).join(DoctorSlot).filter(DoctorSlot.start_time >= start_time, DoctorSlot.end_time <= end_time).all()
-        total_appointments = len(appointments)
-
-        pdf.drawString(50, height - 100, f"Week: {week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}")
-        pdf.drawString(50, height - 120, f"Total Appointments: {total_appointments}")
-
-        y = height - 150
-        for i, appt in enumerate(appointments, start=1):
-            doctor_name = appt.doctor.user.first_name + " " + (appt.doctor.user.last_name or "")
-            patient_name = appt.patient.user.first_name + " " + (appt.patient.user.last_name or "")
-            pdf.drawString(50, y, f"{i}. {appt.slot.start_time.strftime('%Y-%m-%d %H:%M')} - Dr. {doctor_name} with {patient_name}")
-            y -= 20
-            if y < 100:
-                pdf.showPage()
-                pdf.setFont("Helvetica", 12)
-                y = height - 50
-
-        pdf.save()
-        logging.info("Weekly appointment report generated successfully.")
-        logging.debug(f"File saved at: {file_path}")
-
-        try:
-            logging.info(f"Attempting to upload report object to s3 bucket")
-            with open(file_path, "rb") as f:
-                s3.upload_fileobj(f, bucket_name, 'reports/'+filename)
-        except NoCredentialsError:
-            logging.error(f"NoCredentialsError occured during file upload to s3")
-            
-
+        run_reports(ReportPeriod.weekly(datetime.now(ist_timezone).date()))
     except Exception as e:
         logging.exception("Error during weekly appointment report generation.")
-    finally:
-        session.close()
+
+@c_app.task(name="celery_app.report_task.generate_monthly_appointment_report")
+def generate_monthly_appointment_report():
+    '''reports the previous calendar month, scheduled on the first of the month'''
+    try:
+        logging.info("Started generate_monthly_appointment_report method")
+        run_reports(ReportPeriod.monthly(datetime.now(ist_timezone).date().replace(day=1) - timedelta(days=1)))
+    except Exception as e:
+        logging.exception("Error during monthly appointment report generation.")
+
+@c_app.task(name="celery_app.report_task.generate_appointment_report")
+def generate_appointment_report(period="custom", day=None, start_date=None, end_date=None, datasets=None, formats=None):
+    '''
+    on demand reports. period 'daily', 'weekly' or 'monthly' reports the period containing day (default today),
+    'custom' reports start_date to end_date inclusive. dates are 'YYYY-MM-DD', datasets and formats default to
+    REPORT_DATASETS and REPORT_FORMATS
+    '''
+    try:
+        logging.info(f"Started generate_appointment_report method, period: {period}")
+        if period == "custom":
+            report_period = ReportPeriod.custom(parse_report_date(start_date), parse_report_date(end_date))
+        else:
+            report_period = report_periods[period](parse_report_date(day) if day else datetime.now(ist_timezone).date())
+        run_reports(report_period, datasets, formats)
+    except Exception as e:
+        logging.exception(f"Error during {period} appointment report generation.")
@@ -1,11 +1,15 @@
+import os
+import socket
 from celery import Celery
-import smtplib
-from email.message import EmailMessage
 from app.models.appointments import Appointment
-from app.config.config import EMAIL, PASSWORD
+from app.config.config import MAIL_OUTBOX_INTERVAL_SECONDS, DOCTOR_SEARCH_QUEUE_INTERVAL_SECONDS
 from app.utils.logging import Logging
 from celery.schedules import crontab
+from celery.signals import worker_process_init, task_postrun
 from app.db.session import local_session
+from app.db.database import engine
+from app.utils.metrics import metrics, metrics_publisher
+from app.utils.mailer import build_message, mail_transport
 
 logger = Logging(__name__).get_logger()
 
@@ -24,41 +28,77 @@ c_app.conf.beat_schedule={
         'schedule': crontab(hour=8, minute=0, day_of_week=5),
         # 'schedule': 60.0,
     },
+    'generate-monthly-report': {
+        'task': 'celery_app.report_task.generate_monthly_appointment_report',
+        'schedule': crontab(hour=8, minute=0, day_of_month=1)
+    },
     'generate-future-doctor-slots': {
         'task': 'celery_app.doctor_slots.generate_future_doctor_slots',
         'schedule': crontab(hour=8, minute=0)
+    },
+    'refresh-doctor-search': {
+        'task': 'celery_app.doctor_slots.refresh_doctor_search',
+        'schedule': crontab(minute=0)
+    },
+    'refresh-queued-doctor-search': {
+        'task': 'celery_app.doctor_slots.refresh_queued_doctor_search',
+        'schedule': float(DOCTOR_SEARCH_QUEUE_INTERVAL_SECONDS)
+    },
+    'dispatch-mail-outbox': {
+        'task': 'celery_app.mail_outbox.dispatch_mail_outbox',
+        'schedule': float(MAIL_OUTBOX_INTERVAL_SECONDS)
+    },
+    'maintain-partitions': {
+        'task': 'celery_app.partition_maintenance.maintain_partitions',
+        'schedule': crontab(hour=2, minute=0)
     }
 }
 
-EMAIL_ADDRESS = EMAIL
-EMAIL_PASSWORD = PASSWORD
+@worker_process_init.connect
+def reset_engine_after_fork(**kwargs):
+    '''
+    prefork workers inherit the parent's connection pool, connections can not be shared across processes
+    so every worker starts with a new pool, close=False leaves the parent's connections untouched
+    '''
+    engine.dispose(close=False)
+    logger.info(f"DB engine pool recreated for celery worker process")
+
+@task_postrun.connect
+def publish_metrics(task=None, **kwargs):
+    '''
+    logs the metrics of the worker process after every task and publishes them for GET /metrics,
+    mail and db pool metrics are only recorded in the workers
+    '''
+    snapshot = metrics.snapshot()
+    logger.info(f"worker metrics after {task.name if task else None}: {snapshot}")
+    metrics_publisher.publish(f"celery:{socket.gethostname()}:{os.getpid()}", snapshot)
 
 @c_app.task
 def send_mail(to_mail, subject, body, appointment_id):
+    '''
+    sends one mail and marks the appointment mailed, kept for tasks queued before the mail outbox,
+    new mails go through celery_app.mail_outbox.dispatch_mail_outbox
+    '''
     logger.info(f"send_mail method started")
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = EMAIL_ADDRESS
-    msg["To"] = to_mail
-    msg.set_content(body)
-    logger.debug(f"mail parameter: Subject:{subject}, from: {EMAIL_ADDRESS}, to: {to_mail}, body: {body}")
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        smtp.send_message(msg)
-
+    logger.debug(f"mail parameter: Subject:{subject}, to: {to_mail}, body: {body}")
+    mail_transport.send(build_message(to_mail, subject, body))
     logger.info(f"Send_mail task completed")
 
+    session = local_session()
     try:
         logger.info(f"Fetching appointment object from database")
-        session = local_session()
-        appointment = session.query(Appointment).filter(id==appointment_id).first()
+        appointment = session.query(Appointment).filter(Appointment.id == appointment_id).first()
         appointment.is_mail_sent = True
         session.commit()
         logger.info(f"mail sent status updated in the database")
 
     except Exception as e:
-        logger.error(f"Error during updating is_mail_sent field in database")
+        session.rollback()
+        logger.error(f"Error during updating is_mail_sent field in database: {e}")
+    finally:
+        session.close()
 
 from celery_app import report_task
 from celery_app import doctor_slots
+from celery_app import partition_maintenance
+from celery_app import mail_outbox
@@ -10,6 +10,7 @@ session = Session()
 
 get_update_patient_profile = Endpoint(endpoint="/patients/me", methods=["GET", "PATCH"], roles=["patient"])
 get_update_doctor_slots = Endpoint(endpoint="/doctor_slots/me", methods=["GET", "PATCH"], roles=["doctor"])
+get_update_doctor_schedule = Endpoint(endpoint="/doctor_slots/me/schedule", methods=["GET", "PUT"], roles=["doctor"])
 get_available_doctors = Endpoint(endpoint="/doctors/available", methods=["GET"], roles=["patient"])
 get_doctors = Endpoint(endpoint="/doctors/", methods=["GET"], roles=["patient", "doctor", "nurse"])
 get_doctor_available_slot_by_id = Endpoint(endpoint="/doctors/*/available_slots", methods=["GET"], roles=["patient"])
@@ -25,6 +26,7 @@ get_prescription =  Endpoint(endpoint="/prescriptions/*", methods=["GET"], roles
 get_all_prescriptions =  Endpoint(endpoint="/prescriptions/", methods=["GET"], roles=["nurse"])
 mark_attendance_timein =  Endpoint(endpoint="/attendances/time_in", methods=["POST"], roles=["nurse", "doctor"])
 mark_attendance_timeout =  Endpoint(endpoint="/attendances/time_out", methods=["POST"], roles=["nurse", "doctor"])
+get_metrics =  Endpoint(endpoint="/metrics", methods=["GET"], roles=["admin"])
 
 
 
@@ -32,5 +34,6 @@ mark_attendance_timeout =  Endpoint(endpoint="/attendances/time_out", methods=["
 # session.add()
 # session.commit()
 print("endpoint updated")
+print("send SIGHUP to running API workers to reload RBAC rules")
 
 session.close()
\ No newline at end of file
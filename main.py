@@ -4,12 +4,21 @@ from app.db.database import engine
 from app.models import *
 from app.api.route import get_all_router
 from fastapi.openapi.utils import get_openapi
-from app.middleware.rbacmiddleware import RBACMiddleware
+from app.middleware.rbacmiddleware import RBACASGIMiddleware
+from app.middleware.rbac_rules import rbac_rules
+from starlette.concurrency import run_in_threadpool
 
 app = FastAPI()
 app.include_router(get_all_router())
 
 
+@app.on_event("startup")
+async def load_rbac_rules():
+    '''loads RBAC rules once per worker, send SIGHUP to the worker to reload them'''
+    await run_in_threadpool(rbac_rules.load)
+    rbac_rules.install_reload_signal()
+
+
 # Add Bearer token support in Swagger UI
 def custom_openapi():
     if app.openapi_schema:
@@ -34,4 +43,4 @@ def custom_openapi():
     return app.openapi_schema
 
 app.openapi = custom_openapi
-app.add_middleware(RBACMiddleware)
\ No newline at end of file
+app.add_middleware(RBACASGIMiddleware)
\ No newline at end of file